@@ -6,6 +6,7 @@ function that monitors theatre venues and sends email alerts.
 """
 
 import os
+import tempfile
 
 
 class Config:  # pylint: disable=too-few-public-methods
@@ -27,12 +28,84 @@ class Config:  # pylint: disable=too-few-public-methods
         """Initialize configuration from environment variables."""
         self.email_recipient = os.getenv("EMAIL_RECIPIENT", "")
         self.email_recipient_2 = os.getenv("EMAIL_RECIPIENT_2", "")
+        # JSON list of subscribers; replaces the recipients above when set
+        self.subscribers_file = os.getenv("SUBSCRIBERS_FILE", "")
+        self.mailjet_retries = int(os.getenv("MAILJET_RETRIES", "3"))
+        self.mailjet_backoff_seconds = float(os.getenv("MAILJET_BACKOFF_SECONDS", "1"))
+        # send | notice | skip a recipient's report when it has not changed
+        self.unchanged_reports = os.getenv("UNCHANGED_REPORTS", "send")
+        # a report identical to one sent this recently is never sent again
+        self.duplicate_send_window_seconds = float(
+            os.getenv("DUPLICATE_SEND_WINDOW_SECONDS", str(6 * 3600))
+        )
         self.email_sender = os.getenv("EMAIL_SENDER", "")
         self.mailjet_api_key = os.getenv("MAILJET_API_KEY", "")
         self.mailjet_secret = os.getenv("MAILJET_SECRET_KEY", "")
         # future use maybe sometime somewhere
         self.google_places_api_key = os.getenv("GOOGLE_PLACES_API_KEY", "")
         self.search_radius_miles = int(os.getenv("SEARCH_RADIUS_MILES", "50"))
+        # "lat,lon" the radius is measured from; no distance filter when unset
+        self.home_location = os.getenv("HOME_LOCATION", "")
+        # local | nominatim (local data, then OpenStreetMap through geopy)
+        self.geocoder = os.getenv("GEOCODER", "local")
+        # JSON object: venue URL or name -> "lat,lon"
+        self.venue_locations_file = os.getenv("VENUE_LOCATIONS_FILE", "")
+        # scraping; the query template can point at a local stand-in server
+        self.wos_query_url_template = os.getenv("WOS_QUERY_URL_TEMPLATE", "")
+        # broad searches (e.g. "Sondheim") replacing the one per show
+        self.search_queries = [
+            query.strip()
+            for query in os.getenv("SEARCH_QUERIES", "").split(",")
+            if query.strip()
+        ]
+        self.fetch_concurrency = int(os.getenv("FETCH_CONCURRENCY", "8"))
+        self.http_connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+        self.http_read_timeout = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+        self.http_retries = int(os.getenv("HTTP_RETRIES", "3"))
+        self.http_backoff_factor = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+        # per-host request rate cap (0: no cap) and longest Retry-After honoured
+        self.rate_limit_rps = float(os.getenv("RATE_LIMIT_RPS", "10"))
+        self.rate_limit_max_wait_seconds = float(
+            os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "60")
+        )
+        # html.parser | lxml | lxml-targeted (default)
+        self.html_parser = os.getenv("HTML_PARSER", "")
+        self.info_page_streaming = os.getenv("INFO_PAGE_STREAMING", "1") == "1"
+        # worker processes parsing pages (0: parse in the fetch threads),
+        # and pages sent to a worker at a time
+        self.parse_workers = int(os.getenv("PARSE_WORKERS", "0"))
+        self.parse_chunk_size = int(os.getenv("PARSE_CHUNK_SIZE", "8"))
+        # local state kept between invocations (caches, snapshots, ...)
+        self.state_dir = os.getenv("WOS_STATE_DIR") or os.path.join(
+            tempfile.gettempdir(), "theatre_alert"
+        )
+        # time budget of a run when the invocation context does not give one
+        self.run_budget_seconds = float(os.getenv("RUN_BUDGET_SECONDS", "0"))
+        self.run_deadline_margin_seconds = float(
+            os.getenv("RUN_DEADLINE_MARGIN_SECONDS", "5")
+        )
+        # incremental runs: reuse snapshots, report only what changed
+        self.incremental_runs = os.getenv("INCREMENTAL_RUNS", "0") == "1"
+        self.snapshot_ttl_seconds = float(
+            os.getenv("SNAPSHOT_TTL_SECONDS", str(12 * 3600))
+        )
+        # refresh snapshots by production phase (closed: never, far future:
+        # weekly, else daily); SNAPSHOT_TTL_SECONDS when dates are unknown
+        self.lifecycle_refresh = os.getenv("LIFECYCLE_REFRESH", "1") == "1"
+        # append every run's productions to the history store
+        self.history_enabled = os.getenv("HISTORY_ENABLED", "1") == "1"
+        # rendered production fragments kept between runs (0: no cache)
+        self.render_cache_entries = int(os.getenv("RENDER_CACHE_ENTRIES", "4096"))
+        # full | delta | both
+        self.report_mode = os.getenv("REPORT_MODE", "full")
+        self.http_cache_enabled = os.getenv("HTTP_CACHE_ENABLED", "1") == "1"
+        self.http_cache_dir = os.getenv("HTTP_CACHE_DIR") or self.state_dir
+        self.http_cache_ttl_seconds = float(os.getenv("HTTP_CACHE_TTL_SECONDS", "3600"))
+        self.http_cache_max_bytes = int(
+            os.getenv("HTTP_CACHE_MAX_BYTES", str(50 * 1024 * 1024))
+        )
+        # comma-separated: cprofile, tracemalloc; reported in the response
+        self.run_profile = os.getenv("RUN_PROFILE", "")
 
     def _validate(self) -> bool:
         """
@@ -45,11 +118,12 @@ class Config:  # pylint: disable=too-few-public-methods
             ValueError: If any required environment variable is missing
         """
         required_fields = [
-            "email_recipient",
             "email_sender",
             "mailjet_api_key",
             "mailjet_secret",
         ]
+        if not self.subscribers_file:
+            required_fields.insert(0, "email_recipient")
 
         for field in required_fields:
             if not getattr(self, field):
@@ -59,6 +133,15 @@ class Config:  # pylint: disable=too-few-public-methods
 
         return True
 
+    def load(self) -> "Config":
+        """
+        Load environment variables without validating the email settings.
+
+        Used by the scraping code, which does not need Mailjet credentials.
+        """
+        self._load()
+        return self
+
     def load_and_validate(self) -> "Config":
         """
         Load environment variables and validate required fields.
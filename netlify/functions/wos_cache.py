@@ -0,0 +1,137 @@
+"""
+persistent conditional-GET cache for fetched pages,
+kept in a single SQLite file so it survives between invocations
+"""
+
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional
+
+from .wos_sqlite import SQLiteStore
+
+CACHE_FILE_NAME = "http_cache.sqlite3"
+CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        url TEXT PRIMARY KEY,
+        body BLOB NOT NULL,
+        etag TEXT NOT NULL,
+        last_modified TEXT NOT NULL,
+        stored_at REAL NOT NULL,
+        last_access REAL NOT NULL,
+        size INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+"""
+# served fresh from disk / downloaded in full / confirmed by a 304
+CACHE_OUTCOMES = ("hits", "misses", "revalidations")
+
+
+class CacheEntry(NamedTuple):
+    """A cached response body with its validators."""
+
+    body: str
+    etag: str
+    last_modified: str
+    stored_at: float
+
+
+class HttpCache(SQLiteStore):
+    """
+    On-disk page cache keyed by URL.
+
+    Entries younger than `ttl_seconds` are served without a request; older
+    entries are revalidated with If-None-Match / If-Modified-Since. Once the
+    stored (compressed) bodies exceed `max_bytes`, the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float, max_bytes: int):
+        super().__init__(directory, CACHE_FILE_NAME, CACHE_SCHEMA)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._counts = dict.fromkeys(CACHE_OUTCOMES, 0)
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """
+        Returns the cached entry for `url` (marking it as recently used), or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM entries WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url)
+            )
+            self._conn.commit()
+        body, etag, last_modified, stored_at = row
+        return CacheEntry(
+            zlib.decompress(body).decode("utf-8"), etag, last_modified, stored_at
+        )
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """True if the entry can be served without revalidation."""
+        return time.time() - entry.stored_at < self.ttl_seconds
+
+    def store(self, url: str, body: str, etag: str = "", last_modified: str = ""):
+        """
+        Stores a response body with its validators, evicting LRU entries if needed.
+        """
+        compressed = zlib.compress(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, compressed, etag, last_modified, now, now, len(compressed)),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Restarts the TTL of an entry after a 304 Not Modified."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET stored_at = ? WHERE url = ?", (time.time(), url)
+            )
+            self._conn.commit()
+
+    def total_bytes(self) -> int:
+        """Size of all stored (compressed) bodies."""
+        with self._lock:
+            return self._total_bytes()
+
+    def record(self, outcome: str) -> None:
+        """Counts a lookup outcome: one of CACHE_OUTCOMES."""
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss and revalidation counts since the last reset."""
+        with self._lock:
+            return dict(self._counts)
+
+    def reset_stats(self) -> None:
+        """Zeroes the counters, e.g. at the start of a run."""
+        with self._lock:
+            self._counts = dict.fromkeys(CACHE_OUTCOMES, 0)
+
+    def _total_bytes(self) -> int:
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return total
+
+    def _evict(self) -> None:
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT url, size FROM entries ORDER BY last_access ASC"
+        ).fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+            total -= size
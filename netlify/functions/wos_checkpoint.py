@@ -0,0 +1,61 @@
+"""
+run checkpoint: which shows a time-limited run did not get to,
+so the next invocation can resume with them
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Sequence
+
+CHECKPOINT_FILE_NAME = "checkpoint.json"
+
+
+class RunCheckpoint:
+    """
+    JSON file in the state directory holding the shows left pending by the
+    last run and the shows that had productions, which are searched first.
+    """
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, CHECKPOINT_FILE_NAME)
+
+    def load(self) -> Dict[str, List[str]]:
+        """Returns {"pending": [...], "productive": [...]}, empty if no checkpoint."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        return {
+            "pending": list(data.get("pending", [])),
+            "productive": list(data.get("productive", [])),
+        }
+
+    def prioritize(self, shows: Sequence[str]) -> List[str]:
+        """
+        Orders `shows` for processing: shows pending from the last run first,
+        then shows that had productions, then the rest, each in their order.
+        """
+        data = self.load()
+        ordered: List[str] = []
+        for group in (data["pending"], data["productive"], shows):
+            for show in group:
+                if show in shows and show not in ordered:
+                    ordered.append(show)
+        return ordered
+
+    def save(self, pending: Sequence[str], productive: Sequence[str]) -> None:
+        """Atomically replaces the checkpoint."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "pending": list(pending),
+                    "productive": list(productive),
+                    "saved_at": time.time(),
+                },
+                f,
+            )
+        os.replace(temp_path, self.path)
@@ -1,5 +1,5 @@
 # constants for wos_sondheim_alert
-from typing import List
+from typing import List, Tuple
 
 SHOWS: List[str] = [
     "Saturday Night",
@@ -57,4 +57,35 @@ HTML_SHOW_TEMPLATE: str = """
     </div>
 """
 
+# incremental runs: (change kind, section title) in report order
+DELTA_SECTIONS: List[Tuple[str, str]] = [
+    ("new", "New Productions"),
+    ("changed", "Changed Dates"),
+    ("closed", "Closed Runs"),
+]
+
+HTML_DELTA_HEADING_TEMPLATE: str = """
+    <h1 style="color:#2d3436; font-family:'Segoe UI', Arial, sans-serif; border-bottom:3px solid #e67e22; padding-bottom:8px;">{title}</h1>
+"""
+
+HTML_FULL_LISTING_HEADING: str = HTML_DELTA_HEADING_TEMPLATE.format(
+    title="All Productions"
+)
+
+HTML_NO_CHANGES: str = """
+    <p style="font-family:'Segoe UI', Arial, sans-serif; color:#2d3436;">No changes since the last run.</p>
+"""
+
+HTML_PARTIAL_NOTICE_TEMPLATE: str = """
+    <p style="font-family:'Segoe UI', Arial, sans-serif; color:#c0392b; background:#fdecea; border:2px solid #c0392b; border-radius:8px; padding:12px;">Partial report: the run reached its time limit before these shows were checked: {pending}. They will be checked first next time.</p>
+"""
+
+HTML_UNCHANGED_NOTICE: str = """
+    <p style="font-family:'Segoe UI', Arial, sans-serif; color:#2d3436;">No changes since your last report.</p>
+"""
+
+HTML_FETCH_ERRORS_TEMPLATE: str = """
+    <p style="font-family:'Segoe UI', Arial, sans-serif; color:#c0392b; background:#fdecea; border:2px solid #c0392b; border-radius:8px; padding:12px;">Incomplete report: the search page could not be fetched for {shows}.</p>
+"""
+
 QUERY_URL_TEMPLATE: str = "https://www.whatsonstage.com/?s={show_name}"
@@ -0,0 +1,285 @@
+"""
+venue locations and distances: venues are resolved to coordinates through
+a persistent geocode cache in front of a pluggable resolver (local venue
+data, optionally OpenStreetMap through geopy), and the distances of all
+venues to all subscriber locations are computed in one haversine pass,
+vectorised with NumPy (a plain Python pass is kept for builds without it)
+"""
+
+import json
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import Config
+from .wos_models import NOT_AVAILABLE, normalize_text
+from .wos_sqlite import SQLiteStore
+
+EARTH_RADIUS_MILES = 3958.8
+GEOCODE_CACHE_FILE_NAME = "geocode.sqlite3"
+GEOCODE_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS venues (
+        key TEXT PRIMARY KEY,
+        latitude REAL,
+        longitude REAL,
+        resolved_at REAL NOT NULL
+    );
+"""
+# venues no resolver knew are looked up again after this long
+GEOCODE_MISS_TTL_SECONDS = 7 * 24 * 3600
+GEOCODERS = ("local", "nominatim")
+
+# (latitude, longitude) in degrees
+Coordinates = Tuple[float, float]
+# (venue name, venue URL) -> coordinates, None when unknown
+Resolver = Callable[[str, str], Optional[Coordinates]]
+
+
+def parse_location(value) -> Coordinates:
+    """
+    Reads a location given as "lat,lon" or [lat, lon].
+
+    Raises:
+        ValueError: for anything else, or coordinates out of range.
+    """
+    parts = value.split(",") if isinstance(value, str) else value
+    try:
+        latitude, longitude = (float(part) for part in parts)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid location {value!r}, expected 'lat,lon'") from e
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError(f"Location out of range: {value!r}")
+    return latitude, longitude
+
+
+def venue_key(venue_name: str, venue_url: str) -> str:
+    """Cache key of a venue: its URL, else its name; "" if neither is known."""
+    if venue_url and venue_url != NOT_AVAILABLE:
+        return venue_url.strip().lower()
+    name = normalize_text(venue_name).lower()
+    return f"name:{name}" if name else ""
+
+
+class LocalResolver:
+    """
+    Venue coordinates from a JSON object mapping venue URLs or names to
+    "lat,lon" or [lat, lon] (VENUE_LOCATIONS_FILE).
+    """
+
+    def __init__(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._locations: Dict[str, Coordinates] = {
+            key.strip().lower(): parse_location(value) for key, value in data.items()
+        }
+
+    def __call__(self, venue_name: str, venue_url: str) -> Optional[Coordinates]:
+        return self._locations.get(
+            (venue_url or "").strip().lower()
+        ) or self._locations.get(normalize_text(venue_name).lower())
+
+
+class NominatimResolver:
+    """
+    OpenStreetMap lookups by venue name through geopy, at most one per
+    second as the Nominatim usage policy asks; failures resolve to None.
+    """
+
+    def __init__(self, user_agent: str = "sondheim-alert"):
+        from geopy.extra.rate_limiter import RateLimiter
+        from geopy.geocoders import Nominatim
+
+        self._geocode = RateLimiter(
+            Nominatim(user_agent=user_agent).geocode,
+            min_delay_seconds=1,
+            swallow_exceptions=True,
+            return_value_on_exception=None,
+        )
+
+    def __call__(self, venue_name: str, venue_url: str) -> Optional[Coordinates]:
+        name = normalize_text(venue_name)
+        location = self._geocode(name) if name else None
+        return (location.latitude, location.longitude) if location else None
+
+
+def chain_resolvers(resolvers: Sequence[Resolver]) -> Resolver:
+    """A resolver asking each of `resolvers` in turn."""
+
+    def resolve(venue_name: str, venue_url: str) -> Optional[Coordinates]:
+        for resolver in resolvers:
+            location = resolver(venue_name, venue_url)
+            if location:
+                return location
+        return None
+
+    return resolve
+
+
+class GeocodeCache(SQLiteStore):
+    """
+    Venue coordinates, kept between runs; venues that could
+    not be resolved are cached too, without coordinates.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__(directory, GEOCODE_CACHE_FILE_NAME, GEOCODE_CACHE_SCHEMA)
+
+    def get(self, key: str) -> Optional[Tuple[Optional[Coordinates], float]]:
+        """(coordinates or None if unresolved, resolved_at), None if not cached."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latitude, longitude, resolved_at FROM venues WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        latitude, longitude, resolved_at = row
+        return (None if latitude is None else (latitude, longitude)), resolved_at
+
+    def put(self, key: str, location: Optional[Coordinates]) -> None:
+        latitude, longitude = location or (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO venues VALUES (?, ?, ?, ?)",
+                (key, latitude, longitude, time.time()),
+            )
+            self._conn.commit()
+
+
+class Geocoder:
+    """Venue coordinates from the cache, asking the resolver on a miss."""
+
+    def __init__(self, cache: GeocodeCache, resolver: Resolver):
+        self.cache = cache
+        self.resolver = resolver
+        # cache misses left unresolved because `resolve` was False
+        self.deferred = 0
+
+    def locate(
+        self, venue_name: str, venue_url: str, resolve: bool = True
+    ) -> Optional[Coordinates]:
+        """A venue's coordinates; with `resolve` False, from the cache only."""
+        key = venue_key(venue_name, venue_url)
+        if not key:
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            location, resolved_at = cached
+            if location or time.time() - resolved_at < GEOCODE_MISS_TTL_SECONDS:
+                return location
+        if not resolve:
+            self.deferred += 1
+            return None
+        location = self.resolver(venue_name, venue_url)
+        self.cache.put(key, location)
+        return location
+
+    def close(self) -> None:
+        self.cache.close()
+
+
+def make_geocoder() -> Geocoder:
+    """
+    The geocoder configured by GEOCODER and VENUE_LOCATIONS_FILE: local
+    venue data only, or local data then Nominatim.
+
+    Raises:
+        ValueError: for an unknown GEOCODER.
+    """
+    config = Config().load()
+    if config.geocoder not in GEOCODERS:
+        raise ValueError(
+            f"Unknown GEOCODER {config.geocoder!r}, expected one of {GEOCODERS}"
+        )
+    resolvers: List[Resolver] = []
+    if config.venue_locations_file:
+        resolvers.append(LocalResolver(config.venue_locations_file))
+    if config.geocoder == "nominatim":
+        resolvers.append(NominatimResolver())
+    return Geocoder(GeocodeCache(config.state_dir), chain_resolvers(resolvers))
+
+
+def _numpy():
+    """NumPy, or None if the build lacks it (distances are then computed in Python)."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def haversine_miles(
+    points: Sequence[Coordinates], origins: Sequence[Coordinates]
+) -> List[List[float]]:
+    """Great-circle distances in miles: one row per point, one column per origin."""
+    if not points or not origins:
+        return [[] for _ in points]
+    np = _numpy()
+    if np is not None:
+        point_array = np.radians(np.asarray(points, dtype=float))[:, None, :]
+        origin_array = np.radians(np.asarray(origins, dtype=float))[None, :, :]
+        delta = origin_array - point_array
+        a = (
+            np.sin(delta[..., 0] / 2) ** 2
+            + np.cos(point_array[..., 0])
+            * np.cos(origin_array[..., 0])
+            * np.sin(delta[..., 1] / 2) ** 2
+        )
+        return (2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))).tolist()
+    rows = []
+    for latitude, longitude in points:
+        phi = math.radians(latitude)
+        row = []
+        for origin_latitude, origin_longitude in origins:
+            origin_phi = math.radians(origin_latitude)
+            a = (
+                math.sin((origin_phi - phi) / 2) ** 2
+                + math.cos(phi)
+                * math.cos(origin_phi)
+                * math.sin(math.radians(origin_longitude - longitude) / 2) ** 2
+            )
+            row.append(2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a)))
+        rows.append(row)
+    return rows
+
+
+class VenueDistances:
+    """
+    Distances of a run's venues to a set of origins (subscriber locations),
+    each venue located once and all distances computed in one pass.
+
+    Once `deadline` (a time.monotonic() value) has passed, venues are only
+    looked up in the geocode cache; `skipped` counts the ones not cached.
+    """
+
+    def __init__(
+        self,
+        venues: Iterable[Tuple[str, str]],
+        origins: Sequence[Coordinates],
+        geocoder: Geocoder,
+        deadline: Optional[float] = None,
+    ):
+        self.origins = list(dict.fromkeys(origins))
+        located: Dict[str, Coordinates] = {}
+        seen = {""}
+        deferred = geocoder.deferred
+        for venue_name, venue_url in venues:
+            key = venue_key(venue_name, venue_url)
+            if key not in seen:
+                seen.add(key)
+                resolve = deadline is None or time.monotonic() < deadline
+                location = geocoder.locate(venue_name, venue_url, resolve)
+                if location:
+                    located[key] = location
+        self.skipped = geocoder.deferred - deferred
+        matrix = haversine_miles(list(located.values()), self.origins)
+        self._column = {origin: index for index, origin in enumerate(self.origins)}
+        self._miles = dict(zip(located, matrix))
+        self.located = len(located)
+
+    def miles(
+        self, venue_name: str, venue_url: str, origin: Coordinates
+    ) -> Optional[float]:
+        """Distance of a venue to one of the origins, None if not located."""
+        row = self._miles.get(venue_key(venue_name, venue_url))
+        return None if row is None else row[self._column[origin]]
@@ -0,0 +1,192 @@
+"""
+history of all runs: every run's productions are appended to an indexed
+SQLite store, which answers queries over time (upcoming openings, a show's
+past runs, busiest venues) and can stand in for a scrape when a report is
+only re-sent
+"""
+
+import json
+import time
+from datetime import date
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from .wos_lifecycle import ProductionDates
+from .wos_models import STATUS_ERROR, ShowDetails
+from .wos_sqlite import SQLiteStore
+
+HISTORY_FILE_NAME = "history.sqlite3"
+HISTORY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id TEXT PRIMARY KEY,
+        run_date TEXT NOT NULL,
+        recorded_at REAL NOT NULL,
+        pending TEXT NOT NULL,
+        errors TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS productions (
+        id INTEGER PRIMARY KEY,
+        run_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        show_name TEXT NOT NULL,
+        info_url TEXT NOT NULL,
+        venue_name TEXT NOT NULL,
+        first_preview TEXT,
+        opening_night TEXT,
+        closing_night TEXT,
+        status TEXT NOT NULL,
+        record TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS productions_run
+        ON productions (run_id, position);
+    CREATE INDEX IF NOT EXISTS productions_url ON productions (info_url, id);
+    CREATE INDEX IF NOT EXISTS productions_show
+        ON productions (show_name, opening_night);
+    CREATE INDEX IF NOT EXISTS productions_venue ON productions (venue_name);
+    CREATE INDEX IF NOT EXISTS productions_opening
+        ON productions (opening_night);
+    CREATE INDEX IF NOT EXISTS productions_closing
+        ON productions (closing_night);
+"""
+
+# the latest record of each production: queries look at what a production
+# was last seen as, not at every run that saw it
+_LATEST = (
+    "id IN (SELECT MAX(id) FROM productions GROUP BY info_url)"
+    f" AND status != '{STATUS_ERROR}'"
+)
+
+
+class StoredRun(NamedTuple):
+    """A run as recorded: its productions in report order."""
+
+    run_id: str
+    run_date: str
+    recorded_at: float
+    details: List[ShowDetails]
+    pending: List[str]
+    errors: List[str]
+
+
+def _iso(value: Optional[date]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class HistoryStore(SQLiteStore):
+    """
+    Production history. Dates are stored as ISO strings, so
+    that range queries on the indexed columns compare correctly.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__(directory, HISTORY_FILE_NAME, HISTORY_SCHEMA)
+
+    def record_run(
+        self,
+        run_id: str,
+        details: Iterable[ShowDetails],
+        pending: Iterable[str] = (),
+        errors: Iterable[str] = (),
+        run_date: Optional[date] = None,
+    ) -> None:
+        """
+        Appends a run, dated `run_date` (defaults to today); recording the
+        same run_id again replaces it.
+        """
+        rows = []
+        for position, record in enumerate(details):
+            dates = ProductionDates.from_fields(record.fields())
+            rows.append(
+                (
+                    run_id,
+                    position,
+                    record.show_name,
+                    record.info_url,
+                    record.norm_venue_name,
+                    _iso(dates.first_preview),
+                    _iso(dates.opening_night),
+                    _iso(dates.closing_night),
+                    record.status,
+                    json.dumps(record.to_dict(), ensure_ascii=False),
+                )
+            )
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM productions WHERE run_id = ?", (run_id,)
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)",
+                    (
+                        run_id,
+                        (run_date or date.today()).isoformat(),
+                        time.time(),
+                        json.dumps(list(pending)),
+                        json.dumps(list(errors)),
+                    ),
+                )
+                self._conn.executemany(
+                    "INSERT INTO productions (run_id, position, show_name, info_url,"
+                    " venue_name, first_preview, opening_night, closing_night, status,"
+                    " record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    def latest_run(self) -> Optional[StoredRun]:
+        """The most recently recorded run, None if there is none."""
+        with self._lock:
+            run = self._conn.execute(
+                "SELECT * FROM runs ORDER BY recorded_at DESC LIMIT 1"
+            ).fetchone()
+            if run is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT record FROM productions WHERE run_id = ? ORDER BY position",
+                (run[0],),
+            ).fetchall()
+        return StoredRun(
+            run[0],
+            run[1],
+            run[2],
+            [ShowDetails.from_dict(json.loads(row[0])) for row in rows],
+            json.loads(run[3]),
+            json.loads(run[4]),
+        )
+
+    def openings(self, start: date, end: date) -> List[ShowDetails]:
+        """Productions opening between `start` and `end` (inclusive)."""
+        return self._records(
+            f"""SELECT record FROM productions WHERE {_LATEST}
+            AND opening_night BETWEEN ? AND ? ORDER BY opening_night""",
+            (start.isoformat(), end.isoformat()),
+        )
+
+    def show_runs(self, show_name: str, since: date) -> List[ShowDetails]:
+        """
+        Productions of a show still running on or after `since`; those
+        without a closing night by their first preview or opening night.
+        """
+        return self._records(
+            f"""SELECT record FROM productions WHERE {_LATEST} AND show_name = ?
+            AND COALESCE(closing_night, opening_night, first_preview) >= ?
+            ORDER BY COALESCE(first_preview, opening_night)""",
+            (show_name, since.isoformat()),
+        )
+
+    def venue_counts(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Venues by number of productions, most first."""
+        with self._lock:
+            return [
+                (venue, count)
+                for venue, count in self._conn.execute(
+                    f"""SELECT venue_name, COUNT(*) AS productions
+                    FROM productions WHERE {_LATEST} AND venue_name != ''
+                    GROUP BY venue_name ORDER BY productions DESC, venue_name
+                    LIMIT ?""",
+                    (limit,),
+                )
+            ]
+
+    def _records(self, query: str, parameters: tuple) -> List[ShowDetails]:
+        with self._lock:
+            rows = self._conn.execute(query, parameters).fetchall()
+        return [ShowDetails.from_dict(json.loads(row[0])) for row in rows]
@@ -0,0 +1,15 @@
+"""
+answers queries over the run history without scraping (upcoming openings,
+a show's runs, busiest venues, the latest report), deployed as its own
+function next to wos_sondheim_alert
+"""
+
+from .wos_sondheim_alert import query_handler
+
+
+def handler(event, context):
+    """
+    Netlify serverless handler for history queries, see
+    wos_sondheim_alert.query_handler for the options.
+    """
+    return query_handler(event, context)
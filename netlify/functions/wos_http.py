@@ -0,0 +1,280 @@
+"""
+shared HTTP client layer for all WhatsOnStage requests:
+one pooled keep-alive session with compression, split timeouts and retries,
+admitted by the per-host rate limiter,
+backed by the persistent conditional-GET cache
+"""
+
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Protocol, Tuple
+
+from config import Config
+from .wos_cache import HttpCache
+from .wos_metrics import get_metrics
+from .wos_ratelimit import THROTTLE_STATUS_CODES, get_limiter, retry_after_seconds
+
+if TYPE_CHECKING:
+    import requests
+
+# transient server errors worth another attempt; throttling responses
+# (429, 503) are retried by fetch_text so that the rate limiter sees them
+RETRY_STATUS_CODES: Tuple[int, ...] = (500, 502, 504)
+
+# bytes requested per read when streaming a page into a scanner
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+class PageScanner(Protocol):
+    """Incremental consumer of a streamed page, see wos_parsers.InfoPageScanner."""
+
+    cache_variant: str
+
+    @property
+    def done(self) -> bool:
+        """True once the rest of the page is not needed."""
+
+    def feed(self, data: str) -> None:
+        """Consumes the next chunk of the page."""
+
+    def document(self) -> str:
+        """Returns what was kept of the page."""
+
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+
+def create_session(config: Config) -> "requests.Session":
+    """
+    Builds a session with a connection pool sized for the fetch pipeline.
+
+    Args:
+        config (Config): loaded configuration.
+
+    Returns:
+        requests.Session: session with retrying, pooled adapters mounted.
+    """
+    # imported here: code paths that never fetch do not load requests
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry, make_headers
+
+    retry = Retry(
+        total=config.http_retries,
+        connect=config.http_retries,
+        read=config.http_retries,
+        status=config.http_retries,
+        backoff_factor=config.http_backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        # Retry-After is honoured by the rate limiter, see fetch_text
+        respect_retry_after_header=False,
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    pool_size = max(config.fetch_concurrency, 1)
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # advertises brotli only when a decoder is installed
+    session.headers.update(make_headers(accept_encoding=True, keep_alive=True))
+    return session
+
+
+def get_session() -> "requests.Session":
+    """
+    Returns the process-wide session, creating it on first use.
+    """
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            _session = create_session(Config().load())
+        return _session
+
+
+def reset_session() -> None:
+    """
+    Closes the shared session so the next request picks up fresh settings.
+    """
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_cache(config: Optional[Config] = None) -> Optional[HttpCache]:
+    """
+    Returns the process-wide page cache, or None when HTTP_CACHE_ENABLED is off.
+    """
+    global _cache  # pylint: disable=global-statement
+    config = config or Config().load()
+    if not config.http_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache(
+                config.http_cache_dir,
+                config.http_cache_ttl_seconds,
+                config.http_cache_max_bytes,
+            )
+        return _cache
+
+
+def reset_cache() -> None:
+    """
+    Closes the page cache so the next request reopens it with fresh settings.
+    """
+    global _cache  # pylint: disable=global-statement
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = None
+
+
+def cache_stats() -> Dict[str, int]:
+    """
+    Returns:
+        Dict[str, int]: cache hit/miss/revalidation counts, empty if disabled.
+    """
+    cache = get_cache()
+    return cache.stats() if cache else {}
+
+
+def get_timeout(config: Optional[Config] = None) -> Tuple[float, float]:
+    """
+    Returns:
+        Tuple[float, float]: (connect, read) timeouts in seconds.
+    """
+    config = config or Config().load()
+    return config.http_connect_timeout, config.http_read_timeout
+
+
+def fetch_text(
+    url: str, scanner: Optional[PageScanner] = None, config: Optional[Config] = None
+) -> str:
+    """
+    GETs a page through the shared session and the page cache.
+
+    A fresh cached copy is returned without a request; a stale one is
+    revalidated with its ETag / Last-Modified and reused on 304.
+
+    Requests wait for the host's rate limiter. A 429 / 503 response backs
+    the limiter off and is retried, up to HTTP_RETRIES times, once the
+    host's Retry-After (or the exponential backoff) has passed.
+
+    Args:
+        url (str): page URL.
+        scanner (Optional[PageScanner]): when given, the body is streamed
+            into the scanner and the connection is closed as soon as it is
+            done; the scanner's document is returned (and cached) instead
+            of the full page.
+        config (Optional[Config]): settings of the run, loaded when not given.
+
+    Returns:
+        str: decoded response body, or the scanner's document.
+
+    Raises:
+        requests.RequestException: once retries are exhausted or on a non-2xx
+            status, including a 429 / 503 that persisted through the retries.
+    """
+    config = config or Config().load()
+    cache = get_cache(config)
+    metrics = get_metrics()
+    cache_key = url if scanner is None else f"{url}#{scanner.cache_variant}"
+    entry = cache.lookup(cache_key) if cache else None
+    if entry and cache.is_fresh(entry):
+        cache.record("hits")
+        metrics.record_fetch("hits")
+        return entry.body
+    headers: Dict[str, str] = {}
+    if entry and entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry and entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    status = None
+    try:
+        with _limited_get(url, headers, scanner is not None, config) as response:
+            status = response.status_code
+            if entry and status == 304:
+                cache.touch(cache_key)
+                cache.record("revalidations")
+                metrics.record_fetch("revalidations", status)
+                return entry.body
+            response.raise_for_status()
+            body = response.text if scanner is None else _scan(response, scanner)
+            nbytes = _bytes_received(response)
+    except Exception:
+        metrics.record_fetch("errors", status)
+        raise
+    if cache:
+        cache.store(
+            cache_key,
+            body,
+            response.headers.get("ETag", ""),
+            response.headers.get("Last-Modified", ""),
+        )
+        cache.record("misses")
+    metrics.record_fetch("misses" if cache else "uncached", status, nbytes)
+    return body
+
+
+def _limited_get(
+    url: str, headers: Dict[str, str], stream: bool, config: Config
+) -> "requests.Response":
+    """
+    GETs `url` once the host's limiter admits it, retrying throttled
+    responses; returns the last response.
+    """
+    limiter = get_limiter(url, config)
+    timeout = get_timeout(config)
+    for attempt in range(config.http_retries + 1):
+        limiter.acquire()
+        try:
+            response = get_session().get(
+                url, headers=headers, timeout=timeout, stream=stream
+            )
+        except Exception:
+            limiter.release()
+            raise
+        status = response.status_code
+        if status not in THROTTLE_STATUS_CODES:
+            limiter.release(status)
+            return response
+        cooldown = retry_after_seconds(response.headers.get("Retry-After"))
+        if cooldown is None:
+            cooldown = config.http_backoff_factor * 2**attempt
+        limiter.release(status, cooldown)
+        if attempt == config.http_retries:
+            return response
+        get_metrics().record_throttled(status)
+        response.close()
+    raise AssertionError("unreachable")
+
+
+def _bytes_received(response: "requests.Response") -> int:
+    """Body bytes read off the wire (before decompression) so far."""
+    try:
+        return int(response.raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        pass
+    try:
+        return len(response.content)
+    except RuntimeError:
+        # a streamed body that was partly read can no longer be measured
+        return 0
+
+
+def _scan(response: "requests.Response", scanner: PageScanner) -> str:
+    """Feeds a streamed response to `scanner` until it is done or the body ends."""
+    if response.encoding is None:
+        response.encoding = "utf-8"
+    for chunk in response.iter_content(STREAM_CHUNK_SIZE, decode_unicode=True):
+        scanner.feed(chunk)
+        if scanner.done:
+            break
+    return scanner.document()
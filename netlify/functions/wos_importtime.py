@@ -0,0 +1,132 @@
+"""
+import-time profile of the function, like python -X importtime but recorded
+in-process, so that a deployed function can report what its cold start
+spent importing and which dependencies were loaded lazily afterwards
+"""
+
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+# imports done while the function module itself is being imported
+PHASE_STARTUP = "startup"
+# imports done later, by the code paths that need them
+PHASE_LAZY = "lazy"
+
+_BUILTIN_IMPORT = builtins.__import__
+
+# read here rather than through Config: the hook has to be installed before
+# the function module imports anything, config included
+IMPORT_PROFILE_ENABLED = os.getenv("IMPORT_PROFILE", "0") == "1"
+
+
+class ImportRecord(NamedTuple):
+    """One import statement that loaded at least one new module."""
+
+    module: str
+    # time not spent in nested imports, microseconds
+    self_us: int
+    # time including nested imports, microseconds
+    cumulative_us: int
+    phase: str
+
+
+class ImportProfiler:
+    """
+    Times import statements by wrapping builtins.__import__. Like -X
+    importtime, nested imports are recorded on their own and their time is
+    excluded from the importer's self time. Modules loaded through
+    importlib.import_module are attributed to the enclosing import.
+    """
+
+    def __init__(self) -> None:
+        self.records: List[ImportRecord] = []
+        self.phase = PHASE_STARTUP
+        self.startup_us: Optional[int] = None
+        self._started = 0.0
+        self._local = threading.local()
+        self._original = None
+        self.enabled = False
+
+    def install(self) -> None:
+        """Starts recording; the startup phase runs until end_startup()."""
+        if self._original is None:
+            self.enabled = True
+            self._started = time.perf_counter()
+            self._original = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self) -> None:
+        """Stops recording, keeping the records."""
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def end_startup(self) -> None:
+        """Marks the function module as imported; later imports are lazy."""
+        if self.startup_us is None and self._original is not None:
+            self.startup_us = int((time.perf_counter() - self._started) * 1e6)
+        self.phase = PHASE_LAZY
+
+    def report(self, limit: int = 30) -> dict:
+        """
+        JSON-ready summary: total startup import time and the `limit` most
+        expensive startup and lazy imports, by cumulative time. Only says
+        that profiling is off if the profiler was never installed.
+        """
+        if not self.enabled:
+            return {"enabled": False, "hint": "set IMPORT_PROFILE=1"}
+        by_phase = {}
+        for phase in (PHASE_STARTUP, PHASE_LAZY):
+            records = [record for record in self.records if record.phase == phase]
+            records.sort(key=lambda record: record.cumulative_us, reverse=True)
+            by_phase[phase] = [record._asdict() for record in records[:limit]]
+        return {
+            "enabled": True,
+            "startup_us": self.startup_us,
+            "modules_loaded": len(self.records),
+            **by_phase,
+        }
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # pylint: disable=redefined-builtin
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        loaded = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            original = self._original or _BUILTIN_IMPORT
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if len(sys.modules) > loaded:
+                if stack:
+                    stack[-1] += elapsed
+                self.records.append(
+                    ImportRecord(
+                        _absolute_name(name, globals, level),
+                        int((elapsed - nested) * 1e6),
+                        int(elapsed * 1e6),
+                        self.phase,
+                    )
+                )
+
+
+def _absolute_name(name: str, globals_: Optional[dict], level: int) -> str:
+    if not level:
+        return name
+    package = (globals_ or {}).get("__package__") or ""
+    try:
+        return importlib.util.resolve_name("." * level + name, package)
+    except (ImportError, ValueError):
+        return "." * level + name
+
+
+PROFILER = ImportProfiler()
@@ -0,0 +1,136 @@
+"""
+production lifecycle: the dates shown on an info page parsed into real
+dates, and the refresh interval of the page picked from the production's
+phase, so that incremental runs only refetch pages that can have changed
+"""
+
+import re
+import time
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+
+from .wos_models import normalize_text
+
+# formats of the dates on info pages, after normalize_date_text
+DATE_FORMATS = (
+    "%d %B %Y",
+    "%d %b %Y",
+    "%A %d %B %Y",
+    "%a %d %B %Y",
+    "%a %d %b %Y",
+    "%B %d %Y",
+    "%b %d %Y",
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+)
+
+PHASE_CLOSED = "closed"  # closing night has passed
+PHASE_FAR_FUTURE = "far_future"  # starts more than FAR_FUTURE_DAYS ahead
+PHASE_UPCOMING = "upcoming"  # starts within FAR_FUTURE_DAYS
+PHASE_PREVIEWS = "previews"  # between first preview and opening night
+PHASE_RUNNING = "running"  # opened, not closed
+PHASE_UNKNOWN = "unknown"  # dates missing or unreadable
+
+FAR_FUTURE_DAYS = 30
+DAY_SECONDS = 24 * 3600
+# refresh interval per phase; None: never refetched. Phases not listed
+# (unknown) use SNAPSHOT_TTL_SECONDS.
+REFRESH_INTERVALS: Dict[str, Optional[float]] = {
+    PHASE_CLOSED: None,
+    PHASE_FAR_FUTURE: 7 * DAY_SECONDS,
+    PHASE_UPCOMING: DAY_SECONDS,
+    PHASE_PREVIEWS: DAY_SECONDS,
+    PHASE_RUNNING: DAY_SECONDS,
+}
+# pages are due this much before their interval is up, so that a daily
+# schedule does not skip a page fetched a few seconds later yesterday
+REFRESH_SLACK_SECONDS = 3600
+
+_ORDINAL_RE = re.compile(r"(?<=\d)(st|nd|rd|th)\b", re.IGNORECASE)
+_SEPARATOR_RE = re.compile(r"[,.]")
+
+
+def normalize_date_text(text: str) -> str:
+    """'Tue, 1st July 2025' -> 'Tue 1 July 2025'; "Sept" read as "Sep"."""
+    text = _SEPARATOR_RE.sub(" ", normalize_text(text))
+    text = _ORDINAL_RE.sub("", text)
+    return " ".join(
+        word[:3] if word.lower() == "sept" else word for word in text.split()
+    )
+
+
+@lru_cache(maxsize=4096)
+def parse_show_date(text: Optional[str]) -> Optional[date]:
+    """
+    The date of an info page date field, None if missing or unreadable.
+    Cached: the same few hundred strings come back every run.
+    """
+    if not text:
+        return None
+    text = normalize_date_text(text)
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+class ProductionDates(NamedTuple):
+    """The parsed dates of a production."""
+
+    first_preview: Optional[date]
+    opening_night: Optional[date]
+    closing_night: Optional[date]
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, str]) -> "ProductionDates":
+        """From a parse_info_page / snapshot fields dict."""
+        return cls(
+            parse_show_date(fields.get("first_preview")),
+            parse_show_date(fields.get("opening_night")),
+            parse_show_date(fields.get("closing_night")),
+        )
+
+    def phase(self, today: Optional[date] = None) -> str:
+        """Where the production is in its run on `today` (default: today)."""
+        today = today or date.today()
+        start = self.first_preview or self.opening_night
+        if self.closing_night and self.closing_night < today:
+            return PHASE_CLOSED
+        if start is None:
+            return PHASE_RUNNING if self.closing_night else PHASE_UNKNOWN
+        if start > today:
+            if (start - today).days > FAR_FUTURE_DAYS:
+                return PHASE_FAR_FUTURE
+            return PHASE_UPCOMING
+        if self.opening_night and today < self.opening_night:
+            return PHASE_PREVIEWS
+        return PHASE_RUNNING
+
+
+def refresh_interval(
+    fields: Dict[str, str], default: float, today: Optional[date] = None
+) -> Optional[float]:
+    """
+    Seconds after which a production's info page is refetched, None for
+    never; `default` when its phase is unknown.
+    """
+    phase = ProductionDates.from_fields(fields).phase(today)
+    if phase not in REFRESH_INTERVALS:
+        return default
+    interval = REFRESH_INTERVALS[phase]
+    return None if interval is None else max(interval - REFRESH_SLACK_SECONDS, 0)
+
+
+def is_due(
+    fields: Dict[str, str],
+    fetched_at: float,
+    default: float,
+    now: Optional[float] = None,
+) -> bool:
+    """Whether a page fetched at `fetched_at` is due for a refresh."""
+    now = time.time() if now is None else now
+    interval = refresh_interval(fields, default, date.fromtimestamp(now))
+    return interval is not None and now - fetched_at >= interval
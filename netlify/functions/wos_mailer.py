@@ -0,0 +1,216 @@
+"""
+Mailjet dispatch: one API client per process, messages sent in batches
+through the v3.1 send API's Messages array, transient failures retried,
+duplicate and unchanged reports suppressed per recipient
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import Config
+from .wos_constants import HTML_TEMPLATE, HTML_UNCHANGED_NOTICE
+from .wos_sendlog import SendLog, content_hash
+
+# most messages Mailjet accepts in one v3.1 send call
+MAILJET_BATCH_SIZE = 50
+SENDER_NAME = "Sondheim Alert"
+# Mailjet responses worth another attempt
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# what to send a recipient whose report is unchanged: the report,
+# a short "no changes" notice, or nothing
+UNCHANGED_REPORT_ACTIONS = ("send", "notice", "skip")
+
+
+class OutgoingReport(NamedTuple):
+    """A report for one recipient."""
+
+    email: str
+    name: str
+    subject: str
+    html_body: str
+
+
+class DispatchResult(NamedTuple):
+    """What dispatch_reports did, by recipient."""
+
+    responses: List[Tuple[int, Any]]
+    sent: List[str]
+    notices: List[str]
+    suppressed: List[str]
+
+
+_client: Optional[Any] = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process-wide Mailjet client, creating it on first use.
+    mailjet_rest is only imported here, by runs that send.
+
+    Raises:
+        ValueError: if the Mailjet / email settings are missing.
+    """
+    global _client  # pylint: disable=global-statement
+    with _client_lock:
+        if _client is None:
+            from mailjet_rest import Client
+
+            config = Config().load_and_validate()
+            _client = Client(
+                auth=(config.mailjet_api_key, config.mailjet_secret), version="v3.1"
+            )
+        return _client
+
+
+def reset_client() -> None:
+    """Drops the client so the next send picks up fresh credentials."""
+    global _client  # pylint: disable=global-statement
+    with _client_lock:
+        _client = None
+
+
+def build_message(
+    recipients: Sequence[Tuple[str, str]], subject: str, html_body: str
+) -> Dict[str, Any]:
+    """
+    One entry of the v3.1 Messages array.
+
+    Args:
+        recipients (Sequence[Tuple[str, str]]): (email, name) pairs.
+        subject (str): subject line.
+        html_body (str): HTML content for the email body.
+    """
+    return {
+        "From": {"Email": Config().load().email_sender, "Name": SENDER_NAME},
+        "To": [{"Email": email, "Name": name} for email, name in recipients],
+        "Subject": subject,
+        "HTMLPart": html_body,
+    }
+
+
+def send_messages(messages: List[Dict[str, Any]]) -> List[Tuple[int, Any]]:
+    """
+    Sends messages through the shared client, MAILJET_BATCH_SIZE per call.
+    A call that fails with a connection error or a 429 / 5xx response is
+    retried MAILJET_RETRIES times with exponential backoff.
+
+    Returns:
+        List[Tuple[int, Any]]: (status_code, response_json) per call, the
+            JSON None when the response body is not JSON.
+
+    Raises:
+        requests.RequestException: if a call still fails to connect.
+    """
+    import requests
+
+    config = Config().load()
+    client = get_client() if messages else None
+    responses = []
+    for start in range(0, len(messages), MAILJET_BATCH_SIZE):
+        batch = messages[start : start + MAILJET_BATCH_SIZE]
+        for attempt in range(config.mailjet_retries + 1):
+            last_attempt = attempt == config.mailjet_retries
+            try:
+                response = client.send.create(data={"Messages": batch})
+            except requests.RequestException:
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    break
+            time.sleep(config.mailjet_backoff_seconds * 2**attempt)
+        try:
+            body = response.json()
+        except ValueError:
+            # not JSON, e.g. a proxy error page
+            body = None
+        responses.append((response.status_code, body))
+    return responses
+
+
+def dispatch_reports(
+    reports: Sequence[OutgoingReport], unchanged: Optional[str] = None
+) -> DispatchResult:
+    """
+    Sends each recipient their report, unless it is the one they were last
+    sent within DUPLICATE_SEND_WINDOW_SECONDS (e.g. a retried run); older
+    unchanged reports are sent, replaced by a "no changes" notice or
+    skipped, per `unchanged` (defaults to UNCHANGED_REPORTS).
+
+    The content hash of a report is recorded once Mailjet accepts its
+    message, batch by batch, so a failed send is attempted again by the
+    next run and the ones already accepted are not.
+
+    Raises:
+        ValueError: for an unknown `unchanged` action.
+    """
+    config = Config().load()
+    unchanged = unchanged or config.unchanged_reports
+    if unchanged not in UNCHANGED_REPORT_ACTIONS:
+        raise ValueError(
+            f"Unknown UNCHANGED_REPORTS {unchanged!r},"
+            f" expected one of {UNCHANGED_REPORT_ACTIONS}"
+        )
+    send_log = SendLog(config.state_dir)
+    now = time.time()
+    messages: List[Dict[str, Any]] = []
+    # (email, report hash, is a notice) per message
+    outgoing: List[Tuple[str, str, bool]] = []
+    suppressed: List[str] = []
+    for report in reports:
+        report_hash = content_hash(report.html_body)
+        last = send_log.get(report.email)
+        if last and last.content_hash == report_hash:
+            duplicate = now - last.sent_at < config.duplicate_send_window_seconds
+            if duplicate or unchanged == "skip":
+                suppressed.append(report.email)
+                continue
+            if unchanged == "notice":
+                messages.append(
+                    build_message(
+                        [(report.email, report.name)],
+                        f"{report.subject} (no changes)",
+                        HTML_TEMPLATE.format(content=HTML_UNCHANGED_NOTICE),
+                    )
+                )
+                outgoing.append((report.email, report_hash, True))
+                continue
+        messages.append(
+            build_message(
+                [(report.email, report.name)], report.subject, report.html_body
+            )
+        )
+        outgoing.append((report.email, report_hash, False))
+    responses: List[Tuple[int, Any]] = []
+    sent: List[str] = []
+    notices: List[str] = []
+    try:
+        # one call per batch, logged before the next is sent, so a failing
+        # batch does not cause a retried run to resend the earlier ones
+        for start in range(0, len(messages), MAILJET_BATCH_SIZE):
+            (response,) = send_messages(messages[start : start + MAILJET_BATCH_SIZE])
+            responses.append(response)
+            batch = outgoing[start : start + MAILJET_BATCH_SIZE]
+            for offset, (email, report_hash, notice) in enumerate(batch):
+                if _accepted(response, offset):
+                    send_log.put(email, report_hash, now)
+                    (notices if notice else sent).append(email)
+    finally:
+        send_log.close()
+    return DispatchResult(responses, sent, notices, suppressed)
+
+
+def _accepted(response: Tuple[int, Any], offset: int) -> bool:
+    """
+    Whether Mailjet accepted message `offset` of a batch; a body without
+    its status is not taken as a confirmation.
+    """
+    status_code, body = response
+    if status_code != 200:
+        return False
+    try:
+        return body["Messages"][offset]["Status"] == "success"
+    except (KeyError, IndexError, TypeError):
+        return False
@@ -0,0 +1,104 @@
+"""
+show title matching: search result titles are looked up among all tracked
+shows at once, by normalized title, by main title (without subtitle) and
+finally by trigram similarity, so that e.g. "Sweeney Todd: The Demon
+Barber of Fleet Street" or "Into The Woods (2025)" are recognised
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+# Dice coefficient of the title trigrams above which titles are taken to match
+FUZZY_MATCH_THRESHOLD = 0.8
+
+_BRACKETED_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+# a subtitle follows a colon or a spaced dash
+_SUBTITLE_RE = re.compile(r"\s*(?::|\s[-–—]\s).*$", re.DOTALL)
+_NON_WORD_RE = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_title(title: str) -> str:
+    """
+    Comparison key of a title: lower case without accents, bracketed
+    parts (years, "(Revival)", ...) or punctuation, "&" spelled "and".
+    """
+    text = unicodedata.normalize("NFKD", title)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = _BRACKETED_RE.sub(" ", text.lower().replace("&", " and "))
+    return _NON_WORD_RE.sub(" ", text).strip()
+
+
+def main_title(title: str) -> str:
+    """Comparison key of a title without its subtitle."""
+    return normalize_title(_SUBTITLE_RE.sub("", _BRACKETED_RE.sub(" ", title)))
+
+
+def trigrams(key: str) -> Set[str]:
+    """Character trigrams of a key, padded so that word starts weigh more."""
+    padded = f"  {key} "
+    return {padded[index : index + 3] for index in range(len(padded) - 2)}
+
+
+def _numbers(words: FrozenSet[str]) -> FrozenSet[str]:
+    """Numbers in a title; titles differing in them (sequels, ...) never match."""
+    return frozenset(word for word in words if word.isdigit())
+
+
+class ShowMatcher:
+    """
+    Index of the tracked show titles, built once per run.
+
+    match() finds the show a search result title refers to: an exact or
+    main title key lookup, then the most similar title among the shows
+    sharing trigrams with it, if similar enough. A title made of a whole
+    show title plus more words ("Company In Concert") is a different
+    production and is not matched fuzzily.
+    """
+
+    def __init__(
+        self, shows: Sequence[str], threshold: float = FUZZY_MATCH_THRESHOLD
+    ) -> None:
+        self.shows = list(dict.fromkeys(shows))
+        self.threshold = threshold
+        self._keys: Dict[str, str] = {}
+        self._trigrams: List[Set[str]] = []
+        self._words: List[FrozenSet[str]] = []
+        # trigram -> positions in self.shows of the titles containing it
+        self._index: Dict[str, List[int]] = {}
+        for position, show in enumerate(self.shows):
+            key = normalize_title(show)
+            self._keys.setdefault(key, show)
+            grams = trigrams(key)
+            self._trigrams.append(grams)
+            self._words.append(frozenset(key.split()))
+            for gram in grams:
+                self._index.setdefault(gram, []).append(position)
+
+    def match(self, title: str) -> Optional[str]:
+        """The tracked show `title` refers to, or None."""
+        key = normalize_title(title)
+        if not key:
+            return None
+        show = self._keys.get(key) or self._keys.get(main_title(title))
+        if show:
+            return show
+        grams = trigrams(key)
+        shared = Counter(
+            position for gram in grams for position in self._index.get(gram, ())
+        )
+        words = frozenset(key.split())
+        best: Optional[Tuple[float, int]] = None
+        for position, count in shared.items():
+            score = 2 * count / (len(grams) + len(self._trigrams[position]))
+            show_words = self._words[position]
+            if (
+                score < self.threshold
+                or show_words < words
+                or _numbers(show_words) != _numbers(words)
+            ):
+                continue
+            if best is None or (score, -position) > (best[0], -best[1]):
+                best = (score, position)
+        return self.shows[best[1]] if best else None
@@ -0,0 +1,265 @@
+"""
+run instrumentation: timed spans per pipeline stage, HTTP response and
+cache counts, and an optional cProfile / tracemalloc capture, reported as
+JSON in the handler response
+"""
+
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import cProfile
+
+# the stages timed by the pipeline, in pipeline order
+STAGES = (
+    "search_fetch",
+    "search_parse",
+    "info_fetch",
+    "info_parse",
+    "history",
+    "geocode",
+    "render",
+    "email_send",
+)
+# slowest spans kept, with their attributes
+SLOWEST_SPANS = 10
+# entries in the cProfile / tracemalloc listings
+PROFILE_TOP = 25
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+
+class RunMetrics:
+    """
+    Thread-safe collector for one run, shared by the fetch workers.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._durations: Dict[str, List[float]] = {}
+        # min-heap of (duration, sequence, stage, attributes)
+        self._slowest: List[Tuple[float, int, str, dict]] = []
+        self._sequence = itertools.count()
+        self._outcomes: Counter = Counter()
+        self._statuses: Counter = Counter()
+        self._requests = 0
+        self._bytes = 0
+        self._throttled = 0
+        # degraded but recovered conditions, each reported once
+        self._warnings: Dict[str, None] = {}
+
+    @contextmanager
+    def span(self, stage: str, **attributes) -> Iterator[None]:
+        """Times the enclosed block as one span of `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(stage, time.perf_counter() - start, **attributes)
+
+    def add_span(self, stage: str, seconds: float, **attributes) -> None:
+        """Records a span measured elsewhere."""
+        entry = (seconds, next(self._sequence), stage, attributes)
+        with self._lock:
+            self._durations.setdefault(stage, []).append(seconds)
+            if len(self._slowest) < SLOWEST_SPANS:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+    def record_fetch(
+        self, outcome: str, status: Optional[int] = None, nbytes: int = 0
+    ) -> None:
+        """
+        Counts one fetch_text call: its cache outcome ("hits", "misses",
+        "revalidations", "uncached" or "errors") and, when a request was
+        made, its status code and the bytes received.
+        """
+        with self._lock:
+            self._outcomes[outcome] += 1
+            if status is not None:
+                self._requests += 1
+                self._statuses[str(status)] += 1
+                self._bytes += nbytes
+
+    def record_throttled(self, status: int) -> None:
+        """Counts a throttled response that fetch_text backed off and retried."""
+        with self._lock:
+            self._requests += 1
+            self._throttled += 1
+            self._statuses[str(status)] += 1
+
+    def record_warning(self, message: str) -> None:
+        """Notes something the run worked around, e.g. a fallback taken."""
+        with self._lock:
+            self._warnings[message] = None
+
+    def report(self) -> dict:
+        """JSON-ready summary of the run so far."""
+        with self._lock:
+            warnings = list(self._warnings)
+            durations = {stage: list(d) for stage, d in self._durations.items()}
+            slowest = sorted(self._slowest, reverse=True)
+            http = {
+                "requests": self._requests,
+                "bytes": self._bytes,
+                "status": dict(self._statuses),
+                "outcomes": dict(self._outcomes),
+                "throttled": self._throttled,
+            }
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        stages = {}
+        for stage in sorted(durations, key=lambda s: (order.get(s, len(order)), s)):
+            values = durations[stage]
+            stages[stage] = {
+                "count": len(values),
+                "total_ms": _ms(sum(values)),
+                "mean_ms": _ms(sum(values) / len(values)),
+                "max_ms": _ms(max(values)),
+            }
+        return {
+            "wall_ms": _ms(time.perf_counter() - self._started),
+            "stages": stages,
+            "slowest": [
+                {"stage": stage, "ms": _ms(seconds), **attributes}
+                for seconds, _, stage, attributes in slowest
+            ],
+            "http": http,
+            "warnings": warnings,
+        }
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+_metrics: Optional[RunMetrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> RunMetrics:
+    """Returns the collector of the current run, creating one if needed."""
+    global _metrics  # pylint: disable=global-statement
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = RunMetrics()
+        return _metrics
+
+
+def reset_metrics() -> RunMetrics:
+    """Starts a new collector, e.g. at the start of a handler invocation."""
+    global _metrics  # pylint: disable=global-statement
+    with _metrics_lock:
+        _metrics = RunMetrics()
+        return _metrics
+
+
+class ProfileCapture:
+    """
+    cProfile and/or tracemalloc capture around a run, per RUN_PROFILE.
+
+    tracemalloc traces every thread. cProfile covers every thread from
+    Python 3.12, where it is built on sys.monitoring; on older versions it
+    only sees the thread that started it, so the fetch workers are missing.
+    The profilers are only imported once a mode asks for them.
+    """
+
+    def __init__(self, modes: str):
+        modes_given = [mode.strip() for mode in modes.split(",") if mode.strip()]
+        self.modes = [mode for mode in modes_given if mode in PROFILE_MODES]
+        # unknown modes are ignored and reported, a typo must not cost the run
+        self.warnings = [
+            f"unknown profile mode {mode!r}, expected one of {PROFILE_MODES}"
+            for mode in modes_given
+            if mode not in PROFILE_MODES
+        ]
+        self._profile: Optional["cProfile.Profile"] = None
+        self._started_tracing = False
+
+    def start(self) -> None:
+        """
+        Starts the requested captures. A cProfile capture that cannot start,
+        because another profiler is already active, is skipped and reported
+        in `warnings`.
+        """
+        if "tracemalloc" in self.modes:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+        if "cprofile" in self.modes:
+            import cProfile
+
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                self.warnings.append(f"cprofile capture not started: {e}")
+            else:
+                self._profile = profile
+
+    def stop(self) -> dict:
+        """Stops capturing; returns the JSON-ready profile, empty if disabled."""
+        result: dict = {}
+        if self._profile is not None:
+            self._profile.disable()
+            result["cprofile"] = {
+                "all_threads": sys.version_info >= (3, 12),
+                "functions": _top_functions(self._profile),
+            }
+            self._profile = None
+        if "tracemalloc" in self.modes:
+            import tracemalloc
+
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                statistics = tracemalloc.take_snapshot().statistics("lineno")
+                result["tracemalloc"] = {
+                    "current_bytes": current,
+                    "peak_bytes": peak,
+                    "top": [
+                        {
+                            "location": f"{_short_path(stat.traceback[0].filename)}"
+                            f":{stat.traceback[0].lineno}",
+                            "size_bytes": stat.size,
+                            "count": stat.count,
+                        }
+                        for stat in statistics[:PROFILE_TOP]
+                    ],
+                }
+                if self._started_tracing:
+                    tracemalloc.stop()
+                    self._started_tracing = False
+        return result
+
+
+def _top_functions(profile: "cProfile.Profile") -> List[dict]:
+    """The PROFILE_TOP functions with the most cumulative time."""
+    import pstats
+
+    stats = pstats.Stats(profile).stats  # type: ignore[attr-defined]
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            "function": f"{_short_path(filename)}:{line}({name})",
+            "calls": calls,
+            "total_ms": _ms(total),
+            "cumulative_ms": _ms(cumulative),
+        }
+        for (filename, line, name), (_, calls, total, cumulative, _) in rows[
+            :PROFILE_TOP
+        ]
+    ]
+
+
+def _short_path(filename: str) -> str:
+    """The last two components of a path, enough to tell modules apart."""
+    return os.path.join(*filename.split(os.sep)[-2:]) if filename else filename
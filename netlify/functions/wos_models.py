@@ -0,0 +1,113 @@
+"""
+structured records passed between the scraping, reporting and storage code
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+NOT_AVAILABLE = "N/A"
+
+# the extracted fields, in report order
+DETAIL_FIELDS = (
+    "info_url",
+    "first_preview",
+    "opening_night",
+    "closing_night",
+    "venue_name",
+    "venue_url",
+)
+
+# how a production's details were obtained
+STATUS_FETCHED = "fetched"  # downloaded and parsed
+STATUS_UNCHANGED = "unchanged"  # downloaded, same body as the snapshot
+STATUS_SNAPSHOT = "snapshot"  # not downloaded, snapshot still fresh
+STATUS_ERROR = "error"  # could not be downloaded
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """
+    Cleans a displayed value for comparison: drops the ": " left after the
+    label, collapses whitespace and maps "N/A" / None to "".
+    """
+    if not value or value == NOT_AVAILABLE:
+        return ""
+    return " ".join(value.lstrip(":").split())
+
+
+@dataclass(slots=True)
+class ShowDetails:  # pylint: disable=too-many-instance-attributes
+    """
+    One production of a show as found on its info page.
+
+    The raw fields hold the values as displayed on the site ("N/A" when
+    missing) and are what the reports show; the norm_* fields are derived
+    from them for comparison and downstream use.
+    """
+
+    show_name: str
+    info_url: str = NOT_AVAILABLE
+    first_preview: str = NOT_AVAILABLE
+    opening_night: str = NOT_AVAILABLE
+    closing_night: str = NOT_AVAILABLE
+    venue_name: str = NOT_AVAILABLE
+    venue_url: str = NOT_AVAILABLE
+    status: str = STATUS_FETCHED
+    errors: str = ""
+    norm_first_preview: str = field(init=False, default="")
+    norm_opening_night: str = field(init=False, default="")
+    norm_closing_night: str = field(init=False, default="")
+    norm_venue_name: str = field(init=False, default="")
+
+    def __post_init__(self):
+        self.norm_first_preview = normalize_text(self.first_preview)
+        self.norm_opening_night = normalize_text(self.opening_night)
+        self.norm_closing_night = normalize_text(self.closing_night)
+        self.norm_venue_name = normalize_text(self.venue_name)
+
+    @classmethod
+    def from_fields(
+        cls,
+        show_name: str,
+        fields: Dict[str, str],
+        status: str = STATUS_FETCHED,
+        errors: str = "",
+    ) -> "ShowDetails":
+        """Builds a record from a parse_info_page / snapshot fields dict."""
+        return cls(
+            show_name,
+            **{key: fields.get(key, NOT_AVAILABLE) for key in DETAIL_FIELDS},
+            status=status,
+            errors=errors,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, str]) -> "ShowDetails":
+        """Inverse of to_dict()."""
+        return cls.from_fields(
+            data["show_name"],
+            data,
+            data.get("status", STATUS_FETCHED),
+            data.get("errors", ""),
+        )
+
+    @property
+    def ok(self) -> bool:
+        """False if the info page could not be fetched."""
+        return self.status != STATUS_ERROR
+
+    def fields(self) -> Dict[str, str]:
+        """The raw extracted fields, as stored in snapshots."""
+        return {key: getattr(self, key) for key in DETAIL_FIELDS}
+
+    def to_dict(self) -> Dict[str, str]:
+        """JSON-ready dict with raw and normalized fields."""
+        return {
+            "show_name": self.show_name,
+            **self.fields(),
+            "status": self.status,
+            "errors": self.errors,
+            "norm_first_preview": self.norm_first_preview,
+            "norm_opening_night": self.norm_opening_night,
+            "norm_closing_night": self.norm_closing_night,
+            "norm_venue_name": self.norm_venue_name,
+        }
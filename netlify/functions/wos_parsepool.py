@@ -0,0 +1,187 @@
+"""
+process pool for page parsing: BeautifulSoup work is CPU-bound and holds
+the GIL, so with PARSE_WORKERS set the fetch workers hand raw HTML to
+worker processes, which return the extracted fields instead of soups
+
+Parse requests are batched: the first one of a batch waits up to
+PARSE_BATCH_LINGER_SECONDS for more, and a batch is sent as one task once
+it holds PARSE_CHUNK_SIZE pages, saving a round trip per page.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Tuple
+
+from config import Config
+from .wos_metrics import get_metrics
+
+# longest a parse request waits for others to share its batch
+PARSE_BATCH_LINGER_SECONDS = 0.005
+
+# (parser function, its arguments); functions must be importable by name
+ParseJob = Tuple[Callable[..., Any], tuple]
+
+
+def _warm_up() -> None:
+    """
+    Worker initializer: imports the page parsers and BeautifulSoup backends
+    and parses a tiny page, so that the first real page does not pay for it.
+    """
+    from .wos_parsers import INFO_PAGE_TARGETS, make_soup
+
+    make_soup("<html><head></head></html>", INFO_PAGE_TARGETS)
+
+
+def _ping() -> None:
+    """No-op task, submitted once per worker to start them all up front."""
+
+
+def _run_chunk(jobs: List[ParseJob]) -> List[Tuple[bool, Any]]:
+    """Runs a batch of parse jobs in a worker: (succeeded, result or error)."""
+    results: List[Tuple[bool, Any]] = []
+    for function, args in jobs:
+        try:
+            results.append((True, function(*args)))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            results.append((False, e))
+    return results
+
+
+def _start_method() -> str:
+    """forkserver where available: forking the threaded handler is unsafe."""
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+class ParsePool:
+    """
+    Worker processes shared by the fetch workers of a run, and kept for the
+    next runs of a warm function instance.
+    """
+
+    def __init__(self, workers: int, chunk_size: int) -> None:
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(_start_method()),
+            initializer=_warm_up,
+        )
+        self._lock = threading.Lock()
+        self._batch: List[Tuple[ParseJob, Future]] = []
+        self._timer: Optional[threading.Timer] = None
+        for _ in range(workers):
+            self._executor.submit(_ping)
+
+    def run(self, function: Callable[..., Any], *args) -> Any:
+        """Runs `function(*args)` in a worker and returns its result."""
+        return self.submit(function, *args).result()
+
+    def submit(self, function: Callable[..., Any], *args) -> Future:
+        """Queues `function(*args)` for the next batch."""
+        future: Future = Future()
+        with self._lock:
+            self._batch.append(((function, args), future))
+            if len(self._batch) >= self.chunk_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(PARSE_BATCH_LINGER_SECONDS, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future
+
+    def flush(self) -> None:
+        """Sends the queued jobs to the workers now."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        futures = [future for _, future in batch]
+        try:
+            chunk = self._executor.submit(_run_chunk, [job for job, _ in batch])
+        except (BrokenProcessPool, RuntimeError) as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        def distribute(chunk: Future) -> None:
+            error = chunk.exception()
+            if error is not None:
+                for future in futures:
+                    future.set_exception(error)
+                return
+            for future, (succeeded, result) in zip(futures, chunk.result()):
+                if succeeded:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+
+        chunk.add_done_callback(distribute)
+
+    def shutdown(self) -> None:
+        self.flush()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool: Optional[ParsePool] = None
+# set once starting a pool failed, so that later runs do not retry
+_pool_error: Optional[str] = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool(config: Optional[Config] = None) -> Optional[ParsePool]:
+    """
+    Returns the process-wide parse pool, None when PARSE_WORKERS is 0 or the
+    platform cannot run one (e.g. no /dev/shm for its semaphores, as on
+    AWS Lambda); pages are then parsed by the fetch workers themselves.
+    """
+    global _pool, _pool_error  # pylint: disable=global-statement
+    config = config or Config().load()
+    with _pool_lock:
+        if _pool is not None and (
+            _pool.workers != config.parse_workers
+            or _pool.chunk_size != max(1, config.parse_chunk_size)
+        ):
+            _pool.shutdown()
+            _pool = None
+        if _pool is None and config.parse_workers > 0 and _pool_error is None:
+            try:
+                _pool = ParsePool(config.parse_workers, config.parse_chunk_size)
+            except (OSError, NotImplementedError, ImportError) as e:
+                _pool_error = str(e)
+        if _pool is None and config.parse_workers > 0:
+            get_metrics().record_warning(
+                f"parse pool unavailable, parsing in threads: {_pool_error}"
+            )
+        return _pool
+
+
+def shutdown_parse_pool(error: Optional[str] = None) -> None:
+    """
+    Stops the worker processes; the next get_parse_pool starts new ones,
+    unless `error` (why the pool failed) is given: later runs then parse in
+    threads, as when a pool cannot be started.
+    """
+    global _pool, _pool_error  # pylint: disable=global-statement
+    with _pool_lock:
+        if error is not None:
+            _pool_error = error
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def reset_parse_pool() -> None:
+    """Stops the worker processes and forgets an earlier failure."""
+    global _pool_error  # pylint: disable=global-statement
+    shutdown_parse_pool()
+    with _pool_lock:
+        _pool_error = None
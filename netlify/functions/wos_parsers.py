@@ -0,0 +1,382 @@
+"""
+HTML parser engines for WhatsOnStage pages:
+picks the BeautifulSoup backend and, for the targeted engine,
+builds only the parts of a page that the extractors read;
+scans streamed info pages for those parts; extracts the show articles of
+search results pages and the production details of info pages
+
+BeautifulSoup and its backends are imported on first use, so that code
+paths which never parse (sending, aggregating) do not pay for them.
+"""
+
+import re
+from html import escape
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+    from .wos_matching import ShowMatcher
+
+# engine name -> (BeautifulSoup features, parse only the targeted elements)
+PARSER_ENGINES: Dict[str, Tuple[str, bool]] = {
+    "html.parser": ("html.parser", False),
+    "lxml": ("lxml", False),
+    "lxml-targeted": ("lxml", True),
+}
+DEFAULT_PARSER_ENGINE = "lxml-targeted"
+
+
+def _classes(attrs: dict) -> list:
+    value = attrs.get("class") or ""
+    return value.split() if isinstance(value, str) else list(value)
+
+
+def _is_info_page_target(name: str, attrs: dict) -> bool:
+    """Head link/meta tags plus the dates and location sections."""
+    if name in ("link", "meta"):
+        return True
+    classes = _classes(attrs)
+    return "dates-section" in classes or (
+        name == "div" and "location-section" in classes
+    )
+
+
+def _is_search_page_target(name: str, attrs: dict) -> bool:
+    """The search results container, with all the articles inside it."""
+    return name == "div" and attrs.get("id") == "search-results-container"
+
+
+# (tag name, attributes) -> keep the element, see make_soup
+ElementTargets = Callable[[str, dict], bool]
+INFO_PAGE_TARGETS: ElementTargets = _is_info_page_target
+SEARCH_PAGE_TARGETS: ElementTargets = _is_search_page_target
+
+
+def resolve_engine(engine: Optional[str] = None) -> str:
+    """
+    Returns the engine to use: `engine`, else HTML_PARSER, falling back to
+    html.parser when lxml is not installed.
+
+    Raises:
+        ValueError: for an unknown engine name.
+    """
+    engine = engine or Config().load().html_parser or DEFAULT_PARSER_ENGINE
+    if engine not in PARSER_ENGINES:
+        raise ValueError(
+            f"Unknown parser engine {engine!r}, expected one of {list(PARSER_ENGINES)}"
+        )
+    from bs4.builder import builder_registry
+
+    features, _ = PARSER_ENGINES[engine]
+    if builder_registry.lookup(features) is None:
+        return "html.parser"
+    return engine
+
+
+def make_soup(
+    html_content: str, targets: ElementTargets, engine: Optional[str] = None
+) -> "BeautifulSoup":
+    """
+    Parses a page with the selected engine.
+
+    Args:
+        html_content (str): page HTML.
+        targets (ElementTargets): elements to keep when the engine is targeted.
+        engine (Optional[str]): one of PARSER_ENGINES, defaults to HTML_PARSER.
+
+    Returns:
+        BeautifulSoup: the (possibly partial) document tree.
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    features, targeted = PARSER_ENGINES[resolve_engine(engine)]
+    return BeautifulSoup(
+        html_content, features, parse_only=SoupStrainer(targets) if targeted else None
+    )
+
+
+# elements without an end tag, never pushed on the scanner's stack
+VOID_ELEMENTS = frozenset(
+    {
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "source",
+        "track",
+        "wbr",
+    }
+)
+
+
+class InfoPageScanner(HTMLParser):
+    """
+    Incremental scanner for streamed info pages.
+
+    Fed chunks as they arrive, it keeps only the head canonical link / og:url
+    meta and the markup of the first dates and location sections, and reports
+    `done` as soon as all of them have been seen, so the rest of the page
+    never has to be downloaded. `document()` returns a small HTML page that
+    the info page extractor parses exactly like the full one.
+    """
+
+    # cache key suffix: scanned documents are cached apart from full pages
+    cache_variant = "info-sections"
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self._head: List[str] = []
+        self._sections: List[str] = []
+        self._stack: List[str] = []
+        self._capture: List[str] = []
+        self._canonical_seen = False
+        self._og_url_seen = False
+        self._head_closed = False
+        self._dates_seen = False
+        self._location_seen = False
+
+    @property
+    def done(self) -> bool:
+        """True once everything the extractor reads has been scanned."""
+        url_found = self._canonical_seen or (self._head_closed and self._og_url_seen)
+        return (
+            url_found and self._dates_seen and self._location_seen and not self._stack
+        )
+
+    def document(self) -> str:
+        """Returns the scanned parts as a minimal HTML document."""
+        return (
+            "<html><head>"
+            + "".join(self._head)
+            + "</head><body>"
+            + "".join(self._sections)
+            + "</body></html>"
+        )
+
+    def handle_starttag(self, tag, attrs):
+        raw = self.get_starttag_text() or ""
+        if self._stack:
+            self._capture.append(raw)
+            self._mark_section(tag, dict(attrs))
+            if tag not in VOID_ELEMENTS:
+                self._stack.append(tag)
+            return
+        attributes = dict(attrs)
+        if tag == "link" and not self._canonical_seen:
+            if "canonical" in (attributes.get("rel") or "").split():
+                self._canonical_seen = True
+                self._head.append(raw)
+        elif tag == "meta" and not self._og_url_seen:
+            if attributes.get("property") == "og:url":
+                self._og_url_seen = True
+                self._head.append(raw)
+        elif self._mark_section(tag, attributes) and tag not in VOID_ELEMENTS:
+            self._capture = [raw]
+            self._stack = [tag]
+
+    def handle_startendtag(self, tag, attrs):
+        if self._stack:
+            self._capture.append(self.get_starttag_text() or "")
+        else:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self._head_closed = True
+        if not self._stack or tag not in self._stack:
+            return
+        self._capture.append(f"</{tag}>")
+        while self._stack.pop() != tag:
+            pass
+        if not self._stack:
+            self._sections.append("".join(self._capture))
+            self._capture = []
+
+    def handle_data(self, data):
+        if self._stack:
+            self._capture.append(escape(data, quote=False))
+
+    def handle_comment(self, data):
+        if self._stack:
+            self._capture.append(f"<!--{data}-->")
+
+    def _mark_section(self, tag: str, attrs: dict) -> bool:
+        """Flags the first dates / location section; True if `tag` starts one."""
+        classes = _classes(attrs)
+        if "dates-section" in classes and not self._dates_seen:
+            self._dates_seen = True
+            return True
+        if tag == "div" and "location-section" in classes and not self._location_seen:
+            self._location_seen = True
+            return True
+        return False
+
+
+FIRST_PREVIEW_RE = re.compile("first preview", re.IGNORECASE)
+OPENING_NIGHT_RE = re.compile("opening night", re.IGNORECASE)
+CLOSING_NIGHT_RE = re.compile("closing night", re.IGNORECASE)
+
+
+def _show_articles(
+    html_content: str, parser: Optional[str] = None
+) -> Optional[List[Tuple[str, List[str]]]]:
+    """
+    Title and 'More Info' links of every show article on a search results
+    page, in page order; None when the page has no results container.
+    """
+    soup = make_soup(html_content, SEARCH_PAGE_TARGETS, parser)
+    search_results_container = soup.find("div", id="search-results-container")
+    if not search_results_container:
+        return None
+    articles = search_results_container.find_all("article", class_="col-12")
+    show_articles: List[Tuple[str, List[str]]] = []
+    for article in articles:
+        type_link_tag = article.find("a", class_="text-body-tertiary")
+        if not type_link_tag or type_link_tag.get_text(strip=True).upper() != "SHOW":
+            continue
+        article_title_tag = article.find("h3", class_="fw-bold").find("a")
+        if not article_title_tag:
+            continue
+        more_info_urls: List[str] = []
+        more_info_links_in_article = article.find_all("a", class_="buy-tickets-link")
+        for link in more_info_links_in_article:
+            span_tag = link.find("span", string="More Info")
+            if span_tag:
+                href = link.get("href")
+                if href:
+                    more_info_urls.append(href)
+                break
+        show_articles.append((article_title_tag.get_text(strip=True), more_info_urls))
+    return show_articles
+
+
+def classify_search_results(
+    html_content: str, matcher: "ShowMatcher", parser: Optional[str] = None
+) -> Tuple[Dict[str, List[str]], str]:
+    """
+    Matches every show article of a search results page against all the
+    shows of `matcher` in one pass, so that one broad query (e.g. a
+    composer's name) can stand in for a search per show.
+
+    Args:
+        html_content (str): The HTML content of the search results page.
+        matcher (ShowMatcher): index of the tracked shows.
+        parser (Optional[str]): parser engine, defaults to HTML_PARSER.
+
+    Returns:
+        Dict[str, List[str]]: 'More Info' URLs per matched show, in page order.
+        str: log
+    """
+    show_articles = _show_articles(html_content, parser)
+    if show_articles is None:
+        return {}, "search results container not found"
+    log = ""
+    matches: Dict[str, List[str]] = {}
+    for article_title, more_info_urls in show_articles:
+        show_name = matcher.match(article_title)
+        if show_name is None:
+            log += f"skipping: {article_title}"
+            continue
+        matches.setdefault(show_name, []).extend(more_info_urls)
+    for show_name, more_info_urls in matches.items():
+        if more_info_urls:
+            log += (
+                f"found {len(more_info_urls)} show info links"
+                f" for {show_name}: {more_info_urls} "
+            )
+    if not any(matches.values()):
+        log += "no show info links"
+    return matches, log
+
+
+def parse_info_page(
+    show_info_page_html: str, parser: Optional[str] = None
+) -> Tuple[Dict[str, str], str]:
+    """
+    Extracts the production details from a show's info page HTML.
+
+    Args:
+        show_info_page_html (str): The HTML content of the show's info page.
+        parser (Optional[str]): parser engine, defaults to HTML_PARSER.
+
+    Returns:
+        Dict[str, str]: info_url, first_preview, opening_night, closing_night,
+            venue_name and venue_url, "N/A" where missing.
+        str: parse errors, if any.
+    """
+    from bs4 import FeatureNotFound
+
+    soup = make_soup(show_info_page_html, INFO_PAGE_TARGETS, parser)
+    opening_night = "N/A"
+    closing_night = "N/A"
+    first_preview = "N/A"
+    venue_name = "N/A"
+    venue_url = "N/A"
+    info_url = "N/A"
+    errors = ""
+    try:
+        canonical_link = soup.find("link", rel="canonical")
+        if canonical_link and canonical_link.get("href"):
+            info_url = canonical_link["href"]
+        else:
+            og_url = soup.find("meta", property="og:url")
+            if og_url and og_url.get("content"):
+                info_url = og_url["content"]
+    except FeatureNotFound as e:
+        errors += f"Feature not found: {e}"
+    except Exception:
+        pass
+    try:
+        dates_section = soup.find(class_="dates-section")
+        if dates_section:
+            first_preview_p_tag = dates_section.find("p", string=FIRST_PREVIEW_RE)
+            if first_preview_p_tag:
+                first_preview = first_preview_p_tag.text.strip().replace(
+                    "First Preview", ""
+                )
+            opening_night_p_tag = dates_section.find("p", string=OPENING_NIGHT_RE)
+            if opening_night_p_tag:
+                opening_night = opening_night_p_tag.text.strip().replace(
+                    "Opening Night", ""
+                )
+            closing_night_p_tag = dates_section.find("p", string=CLOSING_NIGHT_RE)
+            if closing_night_p_tag:
+                closing_night = closing_night_p_tag.text.strip().replace(
+                    "Closing Night", ""
+                )
+    except FeatureNotFound as e:
+        errors += f"Feature not found: {e}"
+    except Exception:
+        pass
+    try:
+        location_section = soup.find("div", class_="location-section")
+        if location_section:
+            block_detail_div = location_section.find("div", class_="block-detail")
+            if block_detail_div:
+                venue_link_tag = block_detail_div.find("a")
+                if venue_link_tag:
+                    venue_name = venue_link_tag.get_text(strip=True)
+                    venue_url = venue_link_tag.get("href")
+    except FeatureNotFound as e:
+        errors += f"Feature not found: {e}"
+    except Exception:
+        pass
+    fields = {
+        "info_url": info_url,
+        "first_preview": first_preview,
+        "opening_night": opening_night,
+        "closing_night": closing_night,
+        "venue_name": venue_name,
+        "venue_url": venue_url,
+    }
+    return fields, errors
@@ -0,0 +1,309 @@
+"""
+search run pipeline: the per-show state of a run (search jobs, info page
+slots, which shows are complete) and the scheduler that feeds searches and
+info page fetches, coalesced by URL, to one bounded pool of fetch workers
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from .wos_constants import QUERY_URL_TEMPLATE
+from .wos_models import STATUS_FETCHED, ShowDetails
+from .wos_snapshots import ProductionChange
+
+# (query, indices of the shows it covers, searched by show name)
+SearchJob = Tuple[str, List[int], bool]
+# (progress line, info page URLs per show, log, fetch error or "")
+SearchOutcome = Tuple[str, Dict[str, List[str]], str, str]
+
+
+class InfoPageResult(NamedTuple):
+    """Outcome of one info page job, shared by every show that links to it."""
+
+    fields: Optional[Dict[str, str]]
+    # fetch error when fields is None, parse errors otherwise
+    errors: str = ""
+    change: Optional[ProductionChange] = None
+    status: str = STATUS_FETCHED
+
+
+class ShowSearchRun(NamedTuple):
+    """Everything a search run found, in show order."""
+
+    details: List[ShowDetails]
+    log: List[str]
+    # new / changed / closed productions, incremental runs only
+    changes: List[ProductionChange]
+    incremental: bool
+    # shows not completed before the deadline, in processing order
+    pending: List[str]
+    # "show: error" for shows whose search page could not be fetched
+    errors: List[str]
+
+
+def normalize_info_url(info_url: str) -> str:
+    """
+    Key under which requests for the same production are coalesced:
+    absolute, lower-case scheme and host, no fragment or trailing slash.
+    """
+    parts = urlsplit(urljoin(QUERY_URL_TEMPLATE, info_url))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), path, parts.query, "")
+    )
+
+
+def _details_for(show_name: str, result: InfoPageResult) -> ShowDetails:
+    """The record of an info page job for one of the shows linking to it."""
+    if result.fields is None:
+        return ShowDetails(show_name, status=result.status, errors=result.errors)
+    return ShowDetails.from_fields(
+        show_name, result.fields, result.status, result.errors
+    )
+
+
+class RunState:  # pylint: disable=too-many-instance-attributes
+    """
+    Per-show state of a search run, in the order of `shows`.
+
+    Shows are searched in `priority` order, by name or, with
+    `search_queries`, through those queries first and then by name for the
+    shows none of them found. A show is complete once no search covering
+    it and no info page slot of it is left open; only complete shows are
+    reported.
+    """
+
+    def __init__(
+        self,
+        shows: List[str],
+        priority: Optional[Sequence[str]] = None,
+        search_queries: Sequence[str] = (),
+    ):
+        self.shows = shows
+        self.show_index = {show_name: index for index, show_name in enumerate(shows)}
+        self.search_order = [
+            show_name
+            for show_name in (priority or shows)
+            if show_name in self.show_index
+        ]
+        self.searching = [self.show_index[show_name] for show_name in self.search_order]
+        self.logs: List[List[str]] = [[] for _ in shows]
+        # log lines of the search_queries searches, ahead of the per-show logs
+        self.query_logs: List[str] = []
+        # every search page covering the show was fetched
+        self.searched: List[bool] = [True] * len(shows)
+        self.search_errors: Dict[int, str] = {}
+        self.show_urls: List[List[str]] = [[] for _ in shows]
+        self.details: List[List[Optional[ShowDetails]]] = [[] for _ in shows]
+        self.open_searches: List[int] = [0] * len(shows)
+        self.open_slots: List[int] = [0] * len(shows)
+        # (show index, slot, change), sorted into show order by changes()
+        self.info_changes: List[Tuple[int, int, ProductionChange]] = []
+        self.search_jobs: Deque[SearchJob] = deque()
+        # (show index, slot, info URL)
+        self.info_jobs: Deque[Tuple[int, int, str]] = deque()
+        if search_queries and self.searching:
+            for query in search_queries:
+                self._add_search(query, self.searching, False)
+        else:
+            for index in self.searching:
+                self._add_search(shows[index], [index], True)
+        self.open_queries = len(search_queries) if self.searching else 0
+
+    def _add_search(self, query: str, indices: List[int], by_name: bool) -> None:
+        self.search_jobs.append((query, indices, by_name))
+        for index in indices:
+            self.open_searches[index] += 1
+
+    def add_urls(self, index: int, info_urls: List[str]) -> None:
+        """Opens a slot, and an info page job, per new production of a show."""
+        known = {normalize_info_url(url) for url in self.show_urls[index]}
+        for info_url in info_urls:
+            key = normalize_info_url(info_url)
+            if key in known:
+                continue
+            known.add(key)
+            self.info_jobs.append((index, len(self.show_urls[index]), info_url))
+            self.show_urls[index].append(info_url)
+            self.details[index].append(None)
+            self.open_slots[index] += 1
+
+    def search_done(self, job: SearchJob, outcome: SearchOutcome) -> None:
+        """
+        Records a finished search; once the last query is done, the shows
+        none of the queries found are queued for a search by name.
+        """
+        _, indices, by_name = job
+        progress, matches, log, search_error = outcome
+        for index in indices:
+            self.open_searches[index] -= 1
+            if by_name:
+                self.searched[index] = not search_error
+                self.logs[index] = [progress, log, os.linesep]
+                if search_error:
+                    self.search_errors[index] = search_error
+            elif search_error:
+                self.searched[index] = False
+            self.add_urls(index, matches.get(self.shows[index], []))
+        if by_name:
+            return
+        self.query_logs.extend([progress, log, os.linesep])
+        self.open_queries -= 1
+        if self.open_queries:
+            return
+        for index in self.searching:
+            if not self.show_urls[index]:
+                self._add_search(self.shows[index], [index], True)
+
+    def fill(self, index: int, slot: int, result: InfoPageResult) -> None:
+        """Closes a show's slot with the outcome of its info page job."""
+        self.details[index][slot] = _details_for(self.shows[index], result)
+        self.open_slots[index] -= 1
+
+    def complete(self) -> List[bool]:
+        """Per show, whether all of its searches and info pages completed."""
+        scheduled = set(self.searching)
+        return [
+            index in scheduled
+            and self.open_searches[index] == 0
+            and self.open_slots[index] == 0
+            for index in range(len(self.shows))
+        ]
+
+    def pending(self, complete: List[bool]) -> List[str]:
+        """The shows not completed, in search order."""
+        return [
+            show_name
+            for show_name in self.search_order
+            if not complete[self.show_index[show_name]]
+        ]
+
+    def records(self, complete: List[bool]) -> List[ShowDetails]:
+        """The productions of the complete shows, in show order."""
+        return [
+            record
+            for index, show_details in enumerate(self.details)
+            if complete[index]
+            for record in show_details
+        ]
+
+    def errors(self, complete: List[bool]) -> List[str]:
+        """The search errors of the complete shows, as "show: error"."""
+        return [
+            f"{self.shows[index]}: {error}"
+            for index, error in sorted(self.search_errors.items())
+            if complete[index]
+        ]
+
+    def log_lines(self) -> List[str]:
+        return self.query_logs + [line for show_log in self.logs for line in show_log]
+
+    def changes(self) -> List[ProductionChange]:
+        """New and changed productions, in show order."""
+        return [change for _, _, change in sorted(self.info_changes)]
+
+
+class Pipeline:
+    """
+    Runs the jobs of a RunState on one bounded pool of fetch workers. Info
+    page jobs are scheduled ahead of the remaining searches, so both
+    stages overlap. Info pages are fetched once per normalized URL per run
+    and the result fanned out to every (show, slot) linking to them.
+    """
+
+    def __init__(
+        self,
+        state: RunState,
+        search_task: Callable[[str], SearchOutcome],
+        info_task: Callable[[str, str], InfoPageResult],
+        concurrency: int,
+    ):
+        self.state = state
+        self.search_task = search_task
+        self.info_task = info_task
+        self.concurrency = max(1, concurrency)
+        self.fetches: Dict[str, Future] = {}
+        self.coalesced = 0
+        self._waiters: Dict[Future, List[Tuple[int, int]]] = {}
+        self._searches: Dict[Future, SearchJob] = {}
+        self._in_flight: set = set()
+
+    def run(self, deadline: Optional[float] = None) -> bool:
+        """
+        Runs until all jobs are done or `deadline` (a time.monotonic()
+        value) has passed; returns whether the deadline cut the run short.
+        Requests still in flight at the deadline are abandoned.
+        """
+        timed_out = False
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            while True:
+                if deadline is not None and time.monotonic() >= deadline:
+                    timed_out = bool(
+                        self._in_flight
+                        or self.state.info_jobs
+                        or self.state.search_jobs
+                    )
+                    break
+                self._submit(executor)
+                if not self._in_flight:
+                    break
+                timeout = (
+                    None if deadline is None else max(deadline - time.monotonic(), 0)
+                )
+                done, _ = wait(
+                    self._in_flight, timeout=timeout, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    self._in_flight.discard(future)
+                    if future in self._searches:
+                        self.state.search_done(
+                            self._searches.pop(future), future.result()
+                        )
+                    else:
+                        self._deliver(future)
+        finally:
+            # abandoned requests finish in the background, their results unused
+            executor.shutdown(wait=not timed_out, cancel_futures=True)
+        return timed_out
+
+    def _submit(self, executor: ThreadPoolExecutor) -> None:
+        """Starts jobs until `concurrency` requests are in flight."""
+        state = self.state
+        while len(self._in_flight) < self.concurrency:
+            if state.info_jobs:
+                index, slot, info_url = state.info_jobs.popleft()
+                key = normalize_info_url(info_url)
+                future = self.fetches.get(key)
+                if future is None:
+                    future = executor.submit(
+                        self.info_task, state.shows[index], info_url
+                    )
+                    self.fetches[key] = future
+                    self._waiters[future] = [(index, slot)]
+                    self._in_flight.add(future)
+                    continue
+                self.coalesced += 1
+                if future in self._waiters:
+                    self._waiters[future].append((index, slot))
+                else:
+                    state.fill(index, slot, future.result())
+                continue
+            if not state.search_jobs:
+                return
+            job = state.search_jobs.popleft()
+            future = executor.submit(self.search_task, job[0])
+            self._searches[future] = job
+            self._in_flight.add(future)
+
+    def _deliver(self, future: Future) -> None:
+        result: InfoPageResult = future.result()
+        waiters = self._waiters.pop(future)
+        if result.change:
+            self.state.info_changes.append((*waiters[0], result.change))
+        for index, slot in waiters:
+            self.state.fill(index, slot, result)
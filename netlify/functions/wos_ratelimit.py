@@ -0,0 +1,166 @@
+"""
+per-host request limiting for the shared HTTP client: a token bucket caps
+the request rate and an AIMD window caps the requests in flight; both are
+halved when the host throttles (429 / 503, Retry-After) and ramp back up
+while requests keep succeeding
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config import Config
+
+# responses that mean "slow down": backed off and retried by fetch_text
+THROTTLE_STATUS_CODES: Tuple[int, ...] = (429, 503)
+# the rate is never cut below this fraction of RATE_LIMIT_RPS
+MIN_RATE_FRACTION = 1 / 16
+
+
+class HostLimiter:  # pylint: disable=too-many-instance-attributes
+    """
+    Admission control for one host, shared by the fetch workers.
+
+    acquire() blocks until the host is not cooling down after a throttled
+    response, fewer than `limit` requests are in flight and, with a rate
+    cap, a token is available. release() reports the outcome: a throttled
+    status halves the window and the rate (multiplicative decrease) and
+    starts a cooldown; every `limit` consecutive successes widen the window
+    by one and raise the rate by a tenth of the cap (additive increase).
+    """
+
+    def __init__(self, max_rate: float, max_concurrency: int, max_wait: float):
+        self.max_rate = max_rate
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_wait = max_wait
+        self.rate = max_rate
+        self.limit = float(self.max_concurrency)
+        # a second's worth of requests may go out back to back
+        self._burst = max(1.0, max_rate)
+        self._tokens = self._burst
+        self._refilled = time.monotonic()
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._successes = 0
+        self._cond = threading.Condition()
+        self.throttled = 0
+        self.waited = 0.0
+
+    def acquire(self) -> None:
+        """Waits for a slot for one request."""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    timeout: Optional[float] = self._blocked_until - now
+                elif self._in_flight >= int(self.limit):
+                    timeout = None
+                elif self.max_rate and self._tokens < 1:
+                    timeout = (1 - self._tokens) / self.rate
+                else:
+                    if self.max_rate:
+                        self._tokens -= 1
+                    self._in_flight += 1
+                    self.waited += now - start
+                    return
+                self._cond.wait(timeout)
+
+    def release(
+        self, status: Optional[int] = None, cooldown: Optional[float] = None
+    ) -> None:
+        """
+        Frees the slot of a request that got `status` (None if it failed
+        without a response). A throttled status backs off and blocks the
+        host for `cooldown` seconds, capped at RATE_LIMIT_MAX_WAIT_SECONDS.
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if status in THROTTLE_STATUS_CODES:
+                self.throttled += 1
+                self._successes = 0
+                self.limit = max(1.0, self.limit / 2)
+                if self.max_rate:
+                    self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+                if cooldown:
+                    self._blocked_until = max(
+                        self._blocked_until,
+                        time.monotonic() + min(cooldown, self.max_wait),
+                    )
+            elif status is not None and status < 500:
+                self._successes += 1
+                if self._successes >= int(self.limit):
+                    self._successes = 0
+                    self.limit = min(float(self.max_concurrency), self.limit + 1)
+                    if self.max_rate:
+                        self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        """Current window and rate, and the throttling seen so far."""
+        with self._cond:
+            return {
+                "concurrency_limit": int(self.limit),
+                "rate": round(self.rate, 3),
+                "throttled": self.throttled,
+                "waited_s": round(self.waited, 3),
+            }
+
+    def _refill(self, now: float) -> None:
+        if self.max_rate:
+            self._tokens = min(
+                self._burst, self._tokens + (now - self._refilled) * self.rate
+            )
+        self._refilled = now
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header: delay in seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+_limiters: Dict[str, HostLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url: str, config: Optional[Config] = None) -> HostLimiter:
+    """
+    Returns the process-wide limiter of the host of `url`, created with the
+    settings of `config` (loaded when not given) on the host's first request.
+    """
+    host = urlsplit(url).netloc.lower()
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            config = config or Config().load()
+            limiter = _limiters[host] = HostLimiter(
+                config.rate_limit_rps,
+                config.fetch_concurrency,
+                config.rate_limit_max_wait_seconds,
+            )
+        return limiter
+
+
+def reset_limiters() -> None:
+    """Forgets all hosts, so the next requests start with fresh settings."""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def limiter_stats() -> Dict[str, Dict[str, float]]:
+    """Per-host limiter state, see HostLimiter.stats."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {host: limiter.stats() for host, limiter in limiters.items()}
@@ -0,0 +1,245 @@
+"""
+report engine: a production is rendered as HTML, plain text or JSON from
+the same record, each fragment cached under the record's content so
+that later runs (and each subscriber's report) only render the productions
+that changed
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from .wos_constants import DELTA_SECTIONS, HTML_DELTA_HEADING_TEMPLATE
+from .wos_constants import HTML_FETCH_ERRORS_TEMPLATE, HTML_FULL_LISTING_HEADING
+from .wos_constants import HTML_NO_CHANGES, HTML_PARTIAL_NOTICE_TEMPLATE
+from .wos_constants import HTML_SHOW_TEMPLATE, HTML_TEMPLATE
+from .wos_models import ShowDetails
+from .wos_pipeline import ShowSearchRun
+from .wos_snapshots import DATE_FIELDS, ProductionChange
+
+FORMAT_HTML = "html"
+FORMAT_TEXT = "text"
+FORMAT_JSON = "json"
+
+
+def record_key(record: ShowDetails) -> Tuple[str, ...]:
+    """
+    Everything a production's fragments are rendered from (the name, the
+    DETAIL_FIELDS, status and errors), used as its cache key: hashed by the
+    dict and compared in full, so different records never share a fragment.
+    """
+    return (
+        record.show_name,
+        record.info_url,
+        record.first_preview,
+        record.opening_night,
+        record.closing_night,
+        record.venue_name,
+        record.venue_url,
+        record.status,
+        record.errors,
+    )
+
+
+def _html(record: ShowDetails) -> str:
+    if not record.ok:
+        return (
+            f"<p>Error fetching info page for {record.show_name}: {record.errors}</p>"
+        )
+    return HTML_SHOW_TEMPLATE.format(show_name=record.show_name, **record.fields())
+
+
+def _text(record: ShowDetails) -> str:
+    if not record.ok:
+        return f"Error fetching info page for {record.show_name}: {record.errors}"
+    return (
+        f"{record.errors}show: {record.show_name}"
+        f" first preview: {record.first_preview} "
+        f" date: {record.opening_night} to {record.closing_night}"
+        f" venue: {record.venue_name} url: {record.venue_url} "
+        f" extracted from: {record.info_url}"
+        f" {os.linesep}"
+        f" {os.linesep}"
+    )
+
+
+def _json(record: ShowDetails) -> str:
+    return json.dumps(record.to_dict(), ensure_ascii=False)
+
+
+RENDERERS: Dict[str, Callable[[ShowDetails], str]] = {
+    FORMAT_HTML: _html,
+    FORMAT_TEXT: _text,
+    FORMAT_JSON: _json,
+}
+
+
+class RenderCache:
+    """
+    Rendered fragments by (format, record content), least recently used
+    evicted beyond max_entries. Kept for the next runs of a warm function
+    instance.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._fragments: "OrderedDict[tuple, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def fragment(self, record: ShowDetails, output_format: str) -> str:
+        """
+        The fragment of a production in `output_format`.
+
+        Raises:
+            ValueError: for an unknown format.
+        """
+        render = RENDERERS.get(output_format)
+        if render is None:
+            raise ValueError(
+                f"Unknown report format {output_format!r},"
+                f" expected one of {tuple(RENDERERS)}"
+            )
+        if self.max_entries <= 0:
+            return render(record)
+        key = (output_format, record_key(record))
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        fragment = render(record)
+        with self._lock:
+            self._fragments[key] = fragment
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {len(self._fragments)} kept"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fragments.clear()
+            self.hits = self.misses = 0
+
+
+_cache: Optional[RenderCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """The process-wide render cache, sized by RENDER_CACHE_ENTRIES."""
+    global _cache  # pylint: disable=global-statement
+    max_entries = Config().load().render_cache_entries
+    with _cache_lock:
+        if _cache is None or _cache.max_entries != max_entries:
+            _cache = RenderCache(max_entries)
+        return _cache
+
+
+def render_fragment(record: ShowDetails, output_format: str) -> str:
+    """A production's fragment in `output_format`, from the render cache."""
+    return get_render_cache().fragment(record, output_format)
+
+
+def _delta_fragments(changes: List[ProductionChange], output_format: str) -> List[str]:
+    """
+    The new, changed and closed productions of an incremental run as text
+    or HTML fragments, the HTML without the page wrapper.
+    """
+    if not changes:
+        if output_format == FORMAT_HTML:
+            return [HTML_NO_CHANGES]
+        return [f"no changes since the last run {os.linesep}"]
+    fragments: List[str] = []
+    for kind, title in DELTA_SECTIONS:
+        section = [change for change in changes if change.kind == kind]
+        if not section:
+            continue
+        if output_format == FORMAT_HTML:
+            fragments.append(HTML_DELTA_HEADING_TEMPLATE.format(title=title))
+        for change in section:
+            record = ShowDetails.from_fields(
+                f"{change.show_name} ({kind})", change.fields
+            )
+            fragment = render_fragment(record, output_format)
+            if output_format == FORMAT_HTML:
+                fragments.append(fragment)
+                continue
+            if change.previous:
+                was = ", ".join(
+                    f"{key.replace('_', ' ')}: {change.previous.get(key, 'N/A')}"
+                    for key in DATE_FIELDS
+                )
+                fragment = fragment.rstrip() + f" was: {was} {os.linesep}"
+            fragments.append(f"{kind}: {fragment}")
+    return fragments
+
+
+def render_report(
+    run: ShowSearchRun, report_mode: Optional[str] = None
+) -> Tuple[str, str]:
+    """
+    Renders a search run as the text log and the HTML email report.
+    Productions come from the render cache; the fragments of each document
+    are collected in a list and joined once.
+
+    Args:
+        run (ShowSearchRun): as returned by collect_show_details.
+        report_mode (Optional[str]): full | delta | both for the HTML of
+            incremental runs, defaults to REPORT_MODE.
+
+    Returns:
+        str: text log with every production.
+        str: HTML report.
+    """
+    cache = get_render_cache()
+    text = list(run.log)
+    html: List[str] = []
+    if run.pending:
+        text.append(f"partial report, not processed: {run.pending} {os.linesep}")
+        html.append(HTML_PARTIAL_NOTICE_TEMPLATE.format(pending=", ".join(run.pending)))
+    if run.errors:
+        text.append(f"search errors: {run.errors} {os.linesep}")
+        failed = [error.split(": ", 1)[0] for error in run.errors]
+        html.append(HTML_FETCH_ERRORS_TEMPLATE.format(shows=", ".join(failed)))
+    text.extend(cache.fragment(record, FORMAT_TEXT) for record in run.details)
+    full_listing = True
+    if run.incremental:
+        text.extend(_delta_fragments(run.changes, FORMAT_TEXT))
+        report_mode = report_mode or Config().load().report_mode
+        if report_mode in ("delta", "both"):
+            html.extend(_delta_fragments(run.changes, FORMAT_HTML))
+            full_listing = report_mode == "both"
+            if full_listing:
+                html.append(HTML_FULL_LISTING_HEADING)
+    if full_listing:
+        html.extend(cache.fragment(record, FORMAT_HTML) for record in run.details)
+    return "".join(text), HTML_TEMPLATE.format(content="".join(html))
+
+
+def render_json(run: ShowSearchRun) -> str:
+    """
+    Renders a search run as JSON for downstream tools, the productions from
+    the render cache.
+    """
+    cache = get_render_cache()
+    productions = ", ".join(
+        cache.fragment(record, FORMAT_JSON) for record in run.details
+    )
+    fields = [f'"productions": [{productions}]']
+    for key, value in (
+        ("changes", [change._asdict() for change in run.changes]),
+        ("pending", run.pending),
+        ("errors", run.errors),
+        ("log", run.log),
+    ):
+        fields.append(f"{json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}")
+    return "{" + ", ".join(fields) + "}"
@@ -0,0 +1,62 @@
+"""
+send log: hash of the last report emailed to each recipient, used to
+suppress duplicate and unchanged reports
+"""
+
+import hashlib
+import time
+from typing import NamedTuple, Optional
+
+from .wos_sqlite import SQLiteStore
+
+SEND_LOG_FILE_NAME = "send_log.sqlite3"
+SEND_LOG_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sent_reports (
+        email TEXT PRIMARY KEY,
+        content_hash TEXT NOT NULL,
+        sent_at REAL NOT NULL
+    );
+"""
+
+
+class SentReport(NamedTuple):
+    """The last report sent to a recipient."""
+
+    email: str
+    content_hash: str
+    sent_at: float
+
+
+def content_hash(html_body: str) -> str:
+    """Hash identifying a report's content."""
+    return hashlib.sha256(html_body.encode("utf-8")).hexdigest()
+
+
+class SendLog(SQLiteStore):
+    """
+    Log of the last report sent per recipient.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__(directory, SEND_LOG_FILE_NAME, SEND_LOG_SCHEMA)
+
+    def get(self, email: str) -> Optional[SentReport]:
+        """The last report sent to `email`, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM sent_reports WHERE email = ?", (email.lower(),)
+            ).fetchone()
+        return SentReport(*row) if row else None
+
+    def put(self, email: str, report_hash: str, sent_at: Optional[float] = None):
+        """Records a report as sent to `email`."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sent_reports VALUES (?, ?, ?)",
+                (
+                    email.lower(),
+                    report_hash,
+                    time.time() if sent_at is None else sent_at,
+                ),
+            )
+            self._conn.commit()
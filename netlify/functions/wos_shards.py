@@ -0,0 +1,147 @@
+"""
+sharded runs: selecting a shard's share of the show list and the store
+through which shard invocations hand their results to the aggregator
+"""
+
+import hashlib
+import json
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from .wos_models import ShowDetails
+from .wos_snapshots import ProductionChange
+from .wos_sqlite import SQLiteStore
+
+SHARD_FILE_NAME = "shards.sqlite3"
+SHARD_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS shards (
+        run_id TEXT NOT NULL,
+        shard_key TEXT NOT NULL,
+        shard_index INTEGER NOT NULL,
+        shard_count INTEGER NOT NULL,
+        result TEXT NOT NULL,
+        completed_at REAL NOT NULL,
+        PRIMARY KEY (run_id, shard_key)
+    );
+"""
+
+
+class ShardSpec(NamedTuple):
+    """
+    Which shows an invocation processes: shard `index` of `count`, or an
+    explicit subset when `shows` is given.
+    """
+
+    run_id: str
+    index: int = 0
+    count: int = 1
+    shows: Optional[List[str]] = None
+
+    def select(self, shows: Sequence[str]) -> List[str]:
+        """
+        The shows of this shard: the explicit subset, or every `count`-th
+        show of `shows` starting at `index`, so shards get similar shares.
+        """
+        if self.shows is not None:
+            return list(dict.fromkeys(self.shows))
+        return list(shows[self.index :: self.count])
+
+    @property
+    def key(self) -> str:
+        """
+        Identifies the shard's result within its run: the index, or for an
+        explicit subset a hash of its shows, so that subset shards do not
+        replace each other's results.
+        """
+        if self.shows is None:
+            return str(self.index)
+        names = "\n".join(sorted(set(self.shows)))
+        return "shows:" + hashlib.sha256(names.encode("utf-8")).hexdigest()[:16]
+
+
+class ShardResult(NamedTuple):
+    """What one shard invocation found."""
+
+    run_id: str
+    index: int
+    count: int
+    shows: List[str]
+    details: List[ShowDetails]
+    log: List[str]
+    changes: List[ProductionChange]
+    incremental: bool
+    pending: List[str]
+    errors: List[str]
+    completed_at: float
+    # ShardSpec.key; defaults to the index
+    key: str = ""
+
+
+class ShardStore(SQLiteStore):
+    """
+    Store of shard results, shared by the invocations of a
+    sharded run through the state directory.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__(directory, SHARD_FILE_NAME, SHARD_SCHEMA)
+
+    def put(self, result: ShardResult) -> None:
+        """Stores (or replaces, if the shard was re-run) a shard's result."""
+        payload = {
+            "shows": result.shows,
+            "details": [record.to_dict() for record in result.details],
+            "log": result.log,
+            "changes": [change._asdict() for change in result.changes],
+            "incremental": result.incremental,
+            "pending": result.pending,
+            "errors": result.errors,
+        }
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO shards VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    result.run_id,
+                    result.key or str(result.index),
+                    result.index,
+                    result.count,
+                    json.dumps(payload, ensure_ascii=False),
+                    result.completed_at or time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def results(self, run_id: str) -> List[ShardResult]:
+        """The stored results of a run, by shard index."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM shards WHERE run_id = ?"
+                " ORDER BY shard_index, completed_at",
+                (run_id,),
+            ).fetchall()
+        return [self._to_result(row) for row in rows]
+
+    def delete(self, run_id: str) -> None:
+        """Forgets a run once it has been aggregated."""
+        with self._lock:
+            self._conn.execute("DELETE FROM shards WHERE run_id = ?", (run_id,))
+            self._conn.commit()
+
+    @staticmethod
+    def _to_result(row: tuple) -> ShardResult:
+        run_id, key, index, count, payload, completed_at = row
+        data: Dict = json.loads(payload)
+        return ShardResult(
+            run_id,
+            index,
+            count,
+            data["shows"],
+            [ShowDetails.from_dict(record) for record in data["details"]],
+            data["log"],
+            [ProductionChange(**change) for change in data["changes"]],
+            data["incremental"],
+            data["pending"],
+            data.get("errors", []),
+            completed_at,
+            key,
+        )
@@ -0,0 +1,117 @@
+"""
+persistent snapshots of extracted production details, keyed by info URL,
+used by incremental runs to skip unchanged pages and report what changed
+"""
+
+import hashlib
+import json
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from .wos_sqlite import SQLiteStore
+
+SNAPSHOT_FILE_NAME = "snapshots.sqlite3"
+SNAPSHOT_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS snapshots (
+        info_url TEXT PRIMARY KEY,
+        show_name TEXT NOT NULL,
+        body_hash TEXT NOT NULL,
+        fields TEXT NOT NULL,
+        fetched_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS snapshots_show ON snapshots (show_name);
+"""
+# fields whose change is reported as "changed dates"
+DATE_FIELDS = ("first_preview", "opening_night", "closing_night")
+
+
+class ProductionChange(NamedTuple):
+    """A difference from the previous run: "new", "changed" or "closed"."""
+
+    kind: str
+    show_name: str
+    fields: Dict[str, str]
+    previous: Optional[Dict[str, str]] = None
+
+
+class Snapshot(NamedTuple):
+    """What was extracted from an info page, and when."""
+
+    info_url: str
+    show_name: str
+    body_hash: str
+    fields: Dict[str, str]
+    fetched_at: float
+
+
+def body_hash(html: str) -> str:
+    """Content hash of a fetched page body."""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+class SnapshotStore(SQLiteStore):
+    """
+    Snapshot store shared by the fetch workers of a run.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__(directory, SNAPSHOT_FILE_NAME, SNAPSHOT_SCHEMA)
+
+    def get(self, info_url: str) -> Optional[Snapshot]:
+        """Returns the snapshot of `info_url`, or None if it was never stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM snapshots WHERE info_url = ?", (info_url,)
+            ).fetchone()
+        return self._to_snapshot(row) if row else None
+
+    def for_show(self, show_name: str) -> List[Snapshot]:
+        """All stored productions of a show."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM snapshots WHERE show_name = ? ORDER BY info_url",
+                (show_name,),
+            ).fetchall()
+        return [self._to_snapshot(row) for row in rows]
+
+    def put(
+        self,
+        info_url: str,
+        show_name: str,
+        page_hash: str,
+        fields: Dict[str, str],
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        """Stores (or replaces) the snapshot of `info_url`."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                (
+                    info_url,
+                    show_name,
+                    page_hash,
+                    json.dumps(fields, sort_keys=True),
+                    time.time() if fetched_at is None else fetched_at,
+                ),
+            )
+            self._conn.commit()
+
+    def touch(self, info_url: str) -> None:
+        """Marks an unchanged page as refreshed now."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE snapshots SET fetched_at = ? WHERE info_url = ?",
+                (time.time(), info_url),
+            )
+            self._conn.commit()
+
+    def delete(self, info_url: str) -> None:
+        """Forgets a production, e.g. once its run has closed."""
+        with self._lock:
+            self._conn.execute("DELETE FROM snapshots WHERE info_url = ?", (info_url,))
+            self._conn.commit()
+
+    @staticmethod
+    def _to_snapshot(row: tuple) -> Snapshot:
+        info_url, show_name, page_hash, fields, fetched_at = row
+        return Snapshot(info_url, show_name, page_hash, json.loads(fields), fetched_at)
@@ -3,161 +3,93 @@ search WhatsOnStage.com for all Sondheim shows,
 extract info for each and compile a weekly email report
 """
 
-import os
+# first, so that the imports below are profiled (with IMPORT_PROFILE=1)
+from .wos_importtime import IMPORT_PROFILE_ENABLED, PROFILER
 
-from datetime import datetime
-from typing import List, Tuple
-from bs4 import BeautifulSoup, FeatureNotFound
-import re
-import requests
-from mailjet_rest import Client
+if IMPORT_PROFILE_ENABLED:
+    PROFILER.install()
 
-from .wos_constants import SHOWS, HTML_TEMPLATE, HTML_SHOW_TEMPLATE
-from .wos_constants import QUERY_URL_TEMPLATE
+# pylint: disable=wrong-import-position
+import json
+import os
+import time
+
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from .wos_constants import SHOWS, QUERY_URL_TEMPLATE
+from .wos_checkpoint import RunCheckpoint
+from .wos_http import cache_stats, fetch_text, get_cache
+from .wos_metrics import ProfileCapture, get_metrics, reset_metrics
+from .wos_ratelimit import limiter_stats
+from .wos_mailer import OutgoingReport, build_message, dispatch_reports
+from .wos_mailer import send_messages
+from .wos_subscribers import Subscriber, load_subscribers, shows_for
+from .wos_geo import VenueDistances, make_geocoder
+from .wos_parsers import InfoPageScanner, classify_search_results, parse_info_page
+from .wos_parsers import DEFAULT_PARSER_ENGINE
+from .wos_matching import ShowMatcher
+from .wos_pipeline import InfoPageResult, Pipeline, RunState, ShowSearchRun
+from .wos_pipeline import normalize_info_url
+from .wos_parsepool import get_parse_pool, shutdown_parse_pool
+from .wos_models import STATUS_ERROR, STATUS_SNAPSHOT
+from .wos_models import STATUS_UNCHANGED, ShowDetails
+from .wos_lifecycle import is_due
+from .wos_snapshots import DATE_FIELDS, ProductionChange, SnapshotStore, body_hash
+from .wos_shards import ShardResult, ShardSpec, ShardStore
+from .wos_history import HistoryStore
+from .wos_render import get_render_cache, render_json, render_report
 from config import Config
 
+PROFILER.end_startup()
+
+# yes/no invocation option values, as text (e.g. from a query string)
+TRUE_OPTION_VALUES = ("1", "true", "yes", "on")
+FALSE_OPTION_VALUES = ("0", "false", "no", "off")
 
-def extract_info_links(html_content: str, show_name: str) -> Tuple[List[str], str]:
+
+def extract_info_links(
+    html_content: str, show_name: str, parser: Optional[str] = None
+) -> Tuple[List[str], str]:
     """
     Extracts 'More Info' links for a specific show from WhatsOnStage search results HTML.
 
     Args:
         html_content (str): The HTML content of the search results page.
         show_name (str): The name of the show to filter the results by.
+        parser (Optional[str]): parser engine, defaults to HTML_PARSER.
 
     Returns:
         List[str]: A list of URLs for the 'More Info' buttons related to the specified show.
         str: log
     """
-    log = ""
-    soup = BeautifulSoup(html_content, "html.parser")
-    search_results_container = soup.find("div", id="search-results-container")
-    if not search_results_container:
-        return [], "search results container not found"
-    articles = search_results_container.find_all("article", class_="col-12")
-    more_info_urls: List[str] = []
-    for article in articles:
-        type_link_tag = article.find("a", class_="text-body-tertiary")
-        if not type_link_tag or type_link_tag.get_text(strip=True).upper() != "SHOW":
-            continue
-        article_title_tag = article.find("h3", class_="fw-bold").find("a")
-        if not article_title_tag:
-            continue
-        article_title = article_title_tag.get_text(strip=True)
-        if article_title.strip().lower() != show_name.strip().lower():
-            log += f"skipping: {article_title}"
-            continue
-        more_info_links_in_article = article.find_all("a", class_="buy-tickets-link")
-        for link in more_info_links_in_article:
-            span_tag = link.find("span", string="More Info")
-            if span_tag:
-                href = link.get("href")
-                if href:
-                    more_info_urls.append(href)
-                break
-    if more_info_urls:
-        log += f"found {len(more_info_urls)} show info links: {more_info_urls}"
-    else:
-        log += "no show info links"
-    return more_info_urls, log
+    matches, log = classify_search_results(
+        html_content, ShowMatcher([show_name]), parser
+    )
+    return matches.get(show_name, []), log
 
 
 def extract_details_from_info_page(
-    show_name: str, show_info_page_html: str
-) -> Tuple[str, str]:
+    show_name: str, show_info_page_html: str, parser: Optional[str] = None
+) -> ShowDetails:
     """
-    Formats and returns details for a show from its info page HTML.
+    Extracts the details of a show's production from its info page HTML.
 
     Args:
         show_name (str): The name of the show.
         show_info_page_html (str): The HTML content of the show's info page.
+        parser (Optional[str]): parser engine, defaults to HTML_PARSER.
 
     Returns:
-        Tuple[str, str]: A tuple containing the formatted string and the HTML snippet for the show.
-    """
-    soup = BeautifulSoup(show_info_page_html, "html.parser")
-    opening_night = "N/A"
-    closing_night = "N/A"
-    first_preview = "N/A"
-    venue_name = "N/A"
-    venue_url = "N/A"
-    info_url = "N/A"
-    result = ""
-    try:
-        canonical_link = soup.find("link", rel="canonical")
-        if canonical_link and canonical_link.get("href"):
-            info_url = canonical_link["href"]
-        else:
-            og_url = soup.find("meta", property="og:url")
-            if og_url and og_url.get("content"):
-                info_url = og_url["content"]
-    except FeatureNotFound as e:
-        result += f"Feature not found: {e}"
-    except Exception:
-        pass
-    try:
-        dates_section = soup.find(class_="dates-section")
-        if dates_section:
-            first_preview_p_tag = dates_section.find(
-                "p", string=re.compile("first preview", re.IGNORECASE)
-            )
-            if first_preview_p_tag:
-                first_preview = first_preview_p_tag.text.strip().replace(
-                    "First Preview", ""
-                )
-            opening_night_p_tag = dates_section.find(
-                "p", string=re.compile("opening night", re.IGNORECASE)
-            )
-            if opening_night_p_tag:
-                opening_night = opening_night_p_tag.text.strip().replace(
-                    "Opening Night", ""
-                )
-            closing_night_p_tag = dates_section.find(
-                "p", string=re.compile("closing night", re.IGNORECASE)
-            )
-            if closing_night_p_tag:
-                closing_night = closing_night_p_tag.text.strip().replace(
-                    "Closing Night", ""
-                )
-    except FeatureNotFound as e:
-        result += f"Feature not found: {e}"
-    except Exception:
-        pass
-    try:
-        location_section = soup.find("div", class_="location-section")
-        if location_section:
-            block_detail_div = location_section.find("div", class_="block-detail")
-            if block_detail_div:
-                venue_link_tag = block_detail_div.find("a")
-                if venue_link_tag:
-                    venue_name = venue_link_tag.get_text(strip=True)
-                    venue_url = venue_link_tag.get("href")
-    except FeatureNotFound as e:
-        result += f"Feature not found: {e}"
-    except Exception:
-        pass
-    result += (
-        f"show: {show_name}"
-        + f" first preview: {first_preview} "
-        + f" date: {opening_night} to {closing_night}"
-        + f" venue: {venue_name} url: {venue_url} "
-        + f" extracted from: {info_url}"
-        + f" {os.linesep}"
-        + f" {os.linesep}"
-    )
-    html_result = HTML_SHOW_TEMPLATE.format(
-        show_name=show_name,
-        first_preview=first_preview,
-        opening_night=opening_night,
-        closing_night=closing_night,
-        venue_name=venue_name,
-        venue_url=venue_url,
-        info_url=info_url,
-    )
-    return result, html_result
+        ShowDetails: the production; wos_render renders it.
+    """
+    fields, errors = parse_info_page(show_info_page_html, parser)
+    return ShowDetails.from_fields(show_name, fields, errors=errors)
 
 
-def get_show_page(show_name: str) -> str:
+def get_show_page(show_name: str, config: Optional[Config] = None) -> str:
     """
     Retrieves the HTML content of the search results page for a given show name from WhatsOnStage.
 
@@ -166,22 +98,26 @@ def get_show_page(show_name: str) -> str:
 
     Returns:
         str: The HTML content of the search results page.
-    """
-    query_url = QUERY_URL_TEMPLATE.format(show_name=show_name.replace(" ", "+"))
 
-    try:
-        response = requests.get(query_url, timeout=30)
-        response.raise_for_status()
-        return response.text
-    except requests.RequestException as e:
-        # Handle error appropriately
-        return ""
+    Raises:
+        requests.RequestException: if the page could not be fetched, e.g. the
+            site kept throttling, so that it is reported rather than read as
+            a search without results.
+    """
+    config = config or Config().load()
+    query_url_template = config.wos_query_url_template or QUERY_URL_TEMPLATE
+    query_url = query_url_template.format(show_name=show_name.replace(" ", "+"))
+    return fetch_text(query_url, config=config)
 
 
-def get_info_page(info_url: str) -> Tuple[str, str]:
+def get_info_page(info_url: str, config: Optional[Config] = None) -> Tuple[str, str]:
     """
     Retrieves the HTML content of a show's info page from WhatsOnStage.
 
+    With INFO_PAGE_STREAMING on, the page is streamed and only the parts read
+    by extract_details_from_info_page are kept; the download stops as soon
+    as they have all been seen.
+
     Args:
         info_url (str): The URL of the show's info page.
 
@@ -189,56 +125,263 @@ def get_info_page(info_url: str) -> Tuple[str, str]:
         str: The HTML content of the info page.
         str: An error message if the request fails, otherwise an empty string.
     """
+    import requests
 
+    config = config or Config().load()
+    scanner = InfoPageScanner() if config.info_page_streaming else None
     try:
-        response = requests.get(info_url, timeout=30)
-        response.raise_for_status()
-        return response.text, ""  # Return the HTML content and an empty error message
+        # Return the HTML content and an empty error message
+        return fetch_text(info_url, scanner, config), ""
     except requests.RequestException as e:
         return "", f"Failed to fetch {info_url}: {e}"  # or raise based on requirements
 
 
-def search_shows(shows: List[str]) -> Tuple[str, str]:
+def _parse(function, *args, config: Config):
+    """
+    Runs a page parser in the parse pool when PARSE_WORKERS is set, in the
+    calling fetch worker otherwise, or if the pool's processes died.
+
+    The parser engine of `config` is passed along: workers may have been
+    started by an earlier run, and the fetch workers should not read it
+    from the environment for every page.
+    """
+    args = (*args, config.html_parser or DEFAULT_PARSER_ENGINE)
+    pool = get_parse_pool(config)
+    if pool is not None:
+        try:
+            return pool.run(function, *args)
+        except BrokenProcessPool as e:
+            get_metrics().record_warning(f"parse pool broken, parsing in threads: {e}")
+            shutdown_parse_pool(str(e) or type(e).__name__)
+    return function(*args)
+
+
+def _search_task(
+    query: str, matcher: ShowMatcher, config: Config
+) -> Tuple[str, Dict[str, List[str]], str, str]:
+    """
+    Pipeline stage 1: fetches a search results page and classifies its
+    articles against all the shows of `matcher`.
+
+    Args:
+        query (str): a show name, or a broader query from SEARCH_QUERIES.
+        matcher (ShowMatcher): index of the shows of the run.
+        config (Config): settings of the run.
+
+    Returns:
+        str: timestamped progress line
+        Dict[str, List[str]]: info page URLs found per show
+        str: log
+        str: why the search page could not be fetched, empty on success
+    """
+    import requests
+
+    progress = (
+        f"[{datetime.now().strftime('%H:%M:%S.%f')[:-3]}]" f" searching show {query}..."
+    )
+    metrics = get_metrics()
+    try:
+        with metrics.span("search_fetch", show=query):
+            show_page_html = get_show_page(query, config)
+    except requests.RequestException as e:
+        error = f"search page fetch failed: {e}"
+        return progress, {}, error, error
+    with metrics.span("search_parse", show=query):
+        matches, log = _parse(
+            classify_search_results, show_page_html, matcher, config=config
+        )
+    return progress, matches, log, ""
+
+
+def _info_task(
+    show_name: str,
+    info_url: str,
+    config: Config,
+    snapshots: Optional[SnapshotStore] = None,
+) -> InfoPageResult:
+    """
+    Pipeline stage 2: fetches and parses a single info page.
+
+    With a snapshot store, pages that are not due for a refresh are not
+    fetched: with LIFECYCLE_REFRESH, closed productions never are, those
+    starting more than a month ahead weekly and the others daily (see
+    wos_lifecycle); otherwise, or without readable dates, every
+    SNAPSHOT_TTL_SECONDS. Pages whose body hash is unchanged are not parsed.
+
+    Returns:
+        InfoPageResult: extracted fields or the fetch error, how they were
+            obtained, and the "new" / "changed" difference against the snapshot.
+    """
+    snapshot = snapshots.get(info_url) if snapshots else None
+    if snapshot:
+        if config.lifecycle_refresh:
+            due = is_due(
+                snapshot.fields, snapshot.fetched_at, config.snapshot_ttl_seconds
+            )
+        else:
+            due = time.time() - snapshot.fetched_at >= config.snapshot_ttl_seconds
+        if not due:
+            return InfoPageResult(snapshot.fields, status=STATUS_SNAPSHOT)
+    metrics = get_metrics()
+    with metrics.span("info_fetch", url=info_url):
+        show_info_page_html, errors = get_info_page(info_url, config)
+    if errors:
+        return InfoPageResult(None, errors, status=STATUS_ERROR)
+    if snapshots is None:
+        with metrics.span("info_parse", url=info_url):
+            return InfoPageResult(
+                *_parse(parse_info_page, show_info_page_html, config=config)
+            )
+    page_hash = body_hash(show_info_page_html)
+    if snapshot and snapshot.body_hash == page_hash:
+        snapshots.touch(info_url)
+        return InfoPageResult(snapshot.fields, status=STATUS_UNCHANGED)
+    with metrics.span("info_parse", url=info_url):
+        fields, parse_errors = _parse(
+            parse_info_page, show_info_page_html, config=config
+        )
+    snapshots.put(info_url, show_name, page_hash, fields)
+    change = None
+    if snapshot is None:
+        change = ProductionChange("new", show_name, fields)
+    elif any(snapshot.fields.get(key) != fields[key] for key in DATE_FIELDS):
+        change = ProductionChange("changed", show_name, fields, snapshot.fields)
+    return InfoPageResult(fields, parse_errors, change)
+
+
+def collect_show_details(
+    shows: List[str],
+    concurrency: Optional[int] = None,
+    incremental: Optional[bool] = None,
+    deadline: Optional[float] = None,
+    priority: Optional[List[str]] = None,
+    config: Optional[Config] = None,
+) -> ShowSearchRun:
+    """
+    Searches for each show in the provided list and extracts the details of
+    every production found.
+
+    Search pages and info pages are fetched by one bounded pool of workers.
+    Info page jobs are scheduled ahead of the remaining searches, so both
+    stages overlap; results are assembled in the order of `shows` regardless
+    of completion order.
+
+    Each search page is classified against all `shows` at once. By default
+    every show is searched by name; with SEARCH_QUERIES (e.g. a composer's
+    name), those queries are searched instead, and only the shows none of
+    them found are then searched by name.
+
+    In incremental mode, production details are kept in the snapshot store
+    between runs: recently refreshed pages are not fetched, unchanged pages
+    are not parsed, and new, changed and closed productions are reported.
+
+    With a deadline, no request is started once it has passed and requests
+    still in flight are abandoned; shows whose search or info pages did not
+    all complete are left out of the results and listed as pending.
+
+    Args:
+        shows (List[str]): A list of show names to search for.
+        concurrency (Optional[int]): Maximum number of requests in flight.
+            Defaults to FETCH_CONCURRENCY; 1 fetches sequentially.
+        incremental (Optional[bool]): Defaults to INCREMENTAL_RUNS.
+        deadline (Optional[float]): time.monotonic() value to stop fetching at.
+        priority (Optional[List[str]]): order in which to search `shows`,
+            defaults to their own order.
+        config (Optional[Config]): settings of the run, loaded when not
+            given; the fetch and parse workers read them from here.
+
+    Returns:
+        ShowSearchRun: productions in show order, log lines, changes and
+            pending shows.
+    """
+    config = config or Config().load()
+    if concurrency is None:
+        concurrency = config.fetch_concurrency
+    if incremental is None:
+        incremental = config.incremental_runs
+    snapshots = SnapshotStore(config.state_dir) if incremental else None
+    matcher = ShowMatcher(shows)
+    # starts the parse workers, if any, while the first pages are fetched
+    get_parse_pool(config)
+
+    state = RunState(shows, priority, config.search_queries)
+    pipeline = Pipeline(
+        state,
+        partial(_search_task, matcher=matcher, config=config),
+        partial(_info_task, config=config, snapshots=snapshots),
+        concurrency,
+    )
+    timed_out = pipeline.run(deadline)
+
+    complete = state.complete()
+    pending = state.pending(complete)
+    log_lines = state.log_lines()
+    log_lines.append(
+        f"info pages: {len(pipeline.fetches)} fetched,"
+        f" {pipeline.coalesced} duplicate requests coalesced {os.linesep}"
+    )
+    if pending:
+        log_lines.append(
+            f"deadline reached, {len(pending)} shows pending: {pending} {os.linesep}"
+        )
+    changes = state.changes()
+    if snapshots:
+        changes.extend(_closed_productions(state, complete, snapshots))
+        if not timed_out:
+            snapshots.close()
+    return ShowSearchRun(
+        state.records(complete),
+        log_lines,
+        changes,
+        incremental,
+        pending,
+        state.errors(complete),
+    )
+
+
+def _closed_productions(
+    state: RunState, complete: List[bool], snapshots: SnapshotStore
+) -> List[ProductionChange]:
+    """
+    Productions of completely searched shows that the run no longer found;
+    their snapshots are deleted.
+    """
+    seen = {normalize_info_url(url) for urls in state.show_urls for url in urls}
+    closed = []
+    for index, show_name in enumerate(state.shows):
+        if not (state.searched[index] and complete[index]):
+            continue
+        for snapshot in snapshots.for_show(show_name):
+            if normalize_info_url(snapshot.info_url) not in seen:
+                closed.append(ProductionChange("closed", show_name, snapshot.fields))
+                snapshots.delete(snapshot.info_url)
+    return closed
+
+
+def search_shows(
+    shows: List[str],
+    concurrency: Optional[int] = None,
+    incremental: Optional[bool] = None,
+) -> Tuple[str, str]:
     """
     Searches for each show in the provided list, extracts info URLs, and compiles the information.
 
     Args:
         shows (List[str]): A list of show names to search for.
+        concurrency (Optional[int]): Maximum number of requests in flight.
+        incremental (Optional[bool]): Defaults to INCREMENTAL_RUNS.
 
     Returns:
         str: A compiled string of extracted show information for all shows.
+        str: HTML report.
     """
-    result = ""
-    html_aggregate = ""
-    for show_name in shows:
-        result += (
-            f"[{datetime.now().strftime('%H:%M:%S.%f')[:-3]}]"
-            f" searching show {show_name}..."
-        )
-        show_page_html = get_show_page(show_name)
-        info_urls, log = extract_info_links(show_page_html, show_name)
-        for info_url in info_urls:
-            show_info_page_html, errors = get_info_page(info_url)
-            if not errors:
-                text_result, html_result = extract_details_from_info_page(
-                    show_name, show_info_page_html
-                )
-            else:
-                text_result = f"Error fetching info page for {show_name}: {errors}"
-                html_result = (
-                    f"<p>Error fetching info page for {show_name}: {errors}</p>"
-                )
-            result += text_result
-            html_aggregate += html_result
-    html_report = HTML_TEMPLATE.format(content=html_aggregate)
-    result += log
-    return result, html_report
+    return render_report(collect_show_details(shows, concurrency, incremental))
 
 
 def send_email(subject: str, html_body: str):
     #    def send_email_via_mailjet(api_key, secret_key, recipient_email, html_body):
     """
-    Sends an email using Mailjet API
+    Sends an email using Mailjet API to EMAIL_RECIPIENT (and EMAIL_RECIPIENT_2)
 
     Args:
         subject (str): sibject line
@@ -247,41 +390,495 @@ def send_email(subject: str, html_body: str):
     Returns:
         tuple: (status_code, response_json)
     """
-
     config = Config().load_and_validate()
-    mailjet = Client(
-        auth=(config.mailjet_api_key, config.mailjet_secret), version="v3.1"
+    to_list = [(config.email_recipient, "Recipient")]
+    if getattr(config, "email_recipient_2", ""):
+        to_list.append((config.email_recipient_2, "Recipient"))
+    return send_messages([build_message(to_list, subject, html_body)])[0]
+
+
+def _event_option(event, name: str, default=None):
+    """
+    Reads an invocation option from the event: a top-level key, a query
+    string parameter or a key of a JSON request body.
+    """
+    if not isinstance(event, dict):
+        return default
+    if name in event:
+        return event[name]
+    query = event.get("queryStringParameters") or {}
+    if name in query:
+        return query[name]
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except (TypeError, ValueError):
+        body = {}
+    return body.get(name, default) if isinstance(body, dict) else default
+
+
+def _bool_option(event, name: str, default: bool = False) -> bool:
+    """
+    A yes/no invocation option: a JSON boolean, or 1/true/yes/on and
+    0/false/no/off in any case, as query string values are text.
+
+    Raises:
+        ValueError: for any other value.
+    """
+    value = _event_option(event, name)
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_OPTION_VALUES:
+        return True
+    if text in FALSE_OPTION_VALUES:
+        return False
+    raise ValueError(f"invalid {name} {value!r}, expected true or false")
+
+
+def _int_option(event, name: str, default: Optional[int] = None) -> Optional[int]:
+    """
+    An integer invocation option, `default` when absent or empty.
+
+    Raises:
+        ValueError: if the option is not an integer.
+    """
+    value = _event_option(event, name)
+    if value is None or value == "":
+        return default
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"invalid {name} {value!r}, expected an integer") from None
+
+
+def _deadline(context, config: Config) -> Optional[float]:
+    """
+    time.monotonic() value at which to stop fetching: the remaining time of
+    the invocation (or RUN_BUDGET_SECONDS) less RUN_DEADLINE_MARGIN_SECONDS
+    kept for rendering and sending. None when there is no budget.
+    """
+    get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+    if callable(get_remaining):
+        budget = get_remaining() / 1000
+    elif config.run_budget_seconds > 0:
+        budget = config.run_budget_seconds
+    else:
+        return None
+    return time.monotonic() + max(budget - config.run_deadline_margin_seconds, 0)
+
+
+def merge_shard_results(
+    results: List[ShardResult], shows: Optional[List[str]] = None
+) -> ShowSearchRun:
+    """
+    Merges the results of a sharded run into one search run, productions in
+    the order of `shows` (defaults to SHOWS). Shows of index/count shards
+    that have not stored a result are listed as pending.
+    """
+    shows = SHOWS if shows is None else shows
+    order = {show: index for index, show in enumerate(shows)}
+    details: List[ShowDetails] = []
+    log_lines: List[str] = []
+    changes: List[ProductionChange] = []
+    pending: List[str] = []
+    errors: List[str] = []
+    for result in results:
+        log_lines.append(
+            f"shard {result.index + 1}/{result.count}:"
+            f" {len(result.shows)} shows {os.linesep}"
+        )
+        log_lines.extend(result.log)
+        details.extend(result.details)
+        changes.extend(result.changes)
+        pending.extend(result.pending)
+        errors.extend(result.errors)
+    counts = {result.count for result in results}
+    if len(counts) == 1:
+        count = counts.pop()
+        stored = {result.index for result in results}
+        for index in range(count):
+            if index not in stored:
+                missing = ShardSpec(results[0].run_id, index, count).select(shows)
+                log_lines.append(f"shard {index + 1}/{count}: no result {os.linesep}")
+                pending.extend(missing)
+    details.sort(key=lambda record: order.get(record.show_name, len(order)))
+    return ShowSearchRun(
+        details,
+        log_lines,
+        changes,
+        any(result.incremental for result in results),
+        list(dict.fromkeys(pending)),
+        errors,
     )
 
-    to_list = [{"Email": config.email_recipient, "Name": "Recipient"}]
-    if getattr(config, "email_recipient_2", ""):
-        to_list.append({"Email": config.email_recipient_2, "Name": "Recipient"})
-
-    email_data = {
-        "Messages": [
-            {
-                "From": {
-                    "Email": config.email_sender,
-                    "Name": "Sondheim Alert",
-                },
-                "To": to_list,
-                "Subject": subject,
-                "HTMLPart": html_body,
-            }
-        ]
-    }
 
-    response = mailjet.send.create(data=email_data)
-    return response.status_code, response.json()
+def _shard_spec(event) -> Optional[ShardSpec]:
+    """
+    The shard an invocation is asked to process, from the event options
+    shard_index / shard_count or shows (a list or comma-separated names),
+    with run_id naming the sharded run. None when the event carries no
+    shard options.
+
+    Raises:
+        ValueError: if the options are not a valid shard spec.
+    """
+    index = _int_option(event, "shard_index")
+    count = _int_option(event, "shard_count")
+    shows = _event_option(event, "shows")
+    if index is None and count is None and shows is None:
+        return None
+    if isinstance(shows, str):
+        shows = [show.strip() for show in shows.split(",") if show.strip()]
+    spec = ShardSpec(
+        run_id=_shared_run_id(event),
+        index=0 if index is None else index,
+        count=1 if count is None else count,
+        shows=shows,
+    )
+    if spec.count < 1 or not 0 <= spec.index < spec.count:
+        raise ValueError(f"invalid shard {spec.index} of {spec.count}")
+    return spec
+
+
+def _shared_run_id(event) -> str:
+    """
+    The run_id of a sharded run, which its shards and the aggregating
+    invocation must agree on, so it has no default.
+
+    Raises:
+        ValueError: if the event has no run_id.
+    """
+    run_id = _event_option(event, "run_id")
+    if not run_id:
+        raise ValueError("sharded runs need a run_id, the same for every shard")
+    return str(run_id)
 
 
 def handler(event, context):
     """
     Netlify serverless handler for Sondheim WhatsOnStage report.
+
+    Shows left pending by a previous run that hit its deadline are searched
+    first, then shows that had productions. If this run hits its deadline
+    too, a partial report is sent and the pending shows are checkpointed.
+
+    Sharded runs: an invocation whose event carries shard_index and
+    shard_count (or an explicit list of shows) and a run_id only processes
+    its shard and stores the results in the state directory; a final
+    invocation with "aggregate": true and the same run_id merges them and
+    sends one report.
+
+    With the event option "format": "json", the response also carries the
+    structured report under "report"; with "debug", it carries the import
+    time profile of the function under "imports" (recorded when the function
+    was loaded with IMPORT_PROFILE=1, else a "not enabled" marker). Stage
+    timings, HTTP counts and the per-host rate limiter state are always
+    returned under "metrics", with a cProfile and/or tracemalloc capture
+    under "metrics" / "profile" when RUN_PROFILE is set.
     """
-    result, html_report = search_shows(SHOWS)
-    (status_code, response_json) = send_email(
-        subject=f"Sondheim UK Report For {datetime.now().strftime('%B %d, %Y')}",
-        html_body=html_report,
+    try:
+        debug = _bool_option(event, "debug")
+    except ValueError as e:
+        return {"statusCode": 400, "body": str(e)}
+    metrics = reset_metrics()
+    config = Config().load()
+    capture = ProfileCapture(config.run_profile)
+    capture.start()
+    for warning in capture.warnings:
+        metrics.record_warning(warning)
+    try:
+        response = _handle(event, context, config)
+    finally:
+        profile = capture.stop()
+    response["metrics"] = metrics.report()
+    response["metrics"]["rate_limits"] = limiter_stats()
+    if profile:
+        response["metrics"]["profile"] = profile
+    if debug:
+        response["imports"] = PROFILER.report()
+    return response
+
+
+def _handle(event, context, config: Config) -> dict:
+    deadline = _deadline(context, config)
+    cache = get_cache(config)
+    if cache:
+        cache.reset_stats()
+    try:
+        shard = _shard_spec(event)
+        aggregate = _bool_option(event, "aggregate")
+    except ValueError as e:
+        return {"statusCode": 400, "body": str(e)}
+    subscribers = load_subscribers()
+    # shards only store their results; every other invocation sends reports
+    # and fails up front rather than report success without sending mail
+    if not subscribers and not shard:
+        return {
+            "statusCode": 500,
+            "body": "no recipients: set EMAIL_RECIPIENT or SUBSCRIBERS_FILE",
+        }
+    if _event_option(event, "source") == "history":
+        run = _stored_run(config)
+        if run is None:
+            return {"statusCode": 404, "body": "no run recorded in the history"}
+        return _send_reports(run, event, subscribers, deadline)
+    if aggregate:
+        try:
+            run_id = _shared_run_id(event)
+        except ValueError as e:
+            return {"statusCode": 400, "body": str(e)}
+        store = ShardStore(config.state_dir)
+        results = store.results(run_id)
+        if not results:
+            store.close()
+            return {"statusCode": 404, "body": f"no shard results for run {run_id}"}
+        run = merge_shard_results(results, shows_for(subscribers, SHOWS))
+        _record_history(config, run_id, run)
+        response = _send_reports(run, event, subscribers, deadline)
+        if response["statusCode"] == 200:
+            store.delete(run_id)
+        store.close()
+        return response
+    shows = shows_for(subscribers, SHOWS)
+    if shard:
+        shows = shard.select(shows)
+        run = collect_show_details(shows, deadline=deadline, config=config)
+        store = ShardStore(config.state_dir)
+        store.put(
+            ShardResult(
+                shard.run_id,
+                shard.index,
+                shard.count,
+                shows,
+                *run,
+                completed_at=time.time(),
+                key=shard.key,
+            )
+        )
+        store.close()
+        response = {
+            "statusCode": 200,
+            "body": json.dumps(
+                {
+                    "run_id": shard.run_id,
+                    "shard": shard.index,
+                    "productions": len(run.details),
+                    "pending": run.pending,
+                }
+            ),
+            "log": "".join(run.log),
+        }
+        if _event_option(event, "format") == "json":
+            response["report"] = render_json(run)
+        return response
+    checkpoint = RunCheckpoint(config.state_dir)
+    run = collect_show_details(
+        shows,
+        deadline=deadline,
+        priority=checkpoint.prioritize(shows),
+        config=config,
+    )
+    checkpoint.save(
+        run.pending, list(dict.fromkeys(record.show_name for record in run.details))
+    )
+    # unique by default, so that every run is kept in the history
+    run_id = str(
+        _event_option(event, "run_id") or datetime.now().isoformat(timespec="seconds")
+    )
+    _record_history(config, run_id, run)
+    return _send_reports(run, event, subscribers, deadline)
+
+
+def _record_history(config: Config, run_id: str, run: ShowSearchRun) -> None:
+    """Appends a run's productions to the history store (HISTORY_ENABLED)."""
+    if not config.history_enabled:
+        return
+    history = HistoryStore(config.state_dir)
+    try:
+        with get_metrics().span("history", productions=len(run.details)):
+            history.record_run(run_id, run.details, run.pending, run.errors)
+    finally:
+        history.close()
+
+
+def _stored_run(config: Config) -> Optional[ShowSearchRun]:
+    """The latest recorded run as a search run, None if there is none."""
+    history = HistoryStore(config.state_dir)
+    try:
+        stored = history.latest_run()
+    finally:
+        history.close()
+    if stored is None:
+        return None
+    return ShowSearchRun(
+        stored.details,
+        [f"history: run {stored.run_id} {os.linesep}"],
+        [],
+        False,
+        stored.pending,
+        stored.errors,
+    )
+
+
+def _date_option(event, name: str, default: date) -> date:
+    """
+    Raises:
+        ValueError: if the option is not an ISO date.
+    """
+    value = _event_option(event, name)
+    return date.fromisoformat(str(value)) if value else default
+
+
+def query_handler(event, context):  # pylint: disable=unused-argument
+    """
+    Answers queries over the run history, without scraping:
+
+    - "query": "openings" with "days" (default 30): productions opening
+      from today to that many days ahead
+    - "query": "show" with "show" and "since" (ISO date, default a year
+      ago): the productions of a show running on or after that date
+    - "query": "venues" with "limit" (default 10): venues by number of
+      productions
+    - "query": "report": the latest recorded run, as with "format": "json"
+    """
+    query = _event_option(event, "query")
+    config = Config().load()
+    today = date.today()
+    try:
+        if query == "openings":
+            days = _int_option(event, "days", 30)
+            if days < 0:
+                raise ValueError(f"invalid days {days}")
+        elif query == "show":
+            show_name = _event_option(event, "show")
+            if not show_name:
+                raise ValueError("missing show")
+            since = _date_option(event, "since", today - timedelta(days=365))
+        elif query == "venues":
+            limit = _int_option(event, "limit", 10)
+        elif query != "report":
+            raise ValueError(
+                f"unknown query {query!r}, expected openings, show, venues or report"
+            )
+    except ValueError as e:
+        return {"statusCode": 400, "body": str(e)}
+    if query == "report":
+        run = _stored_run(config)
+        if run is None:
+            return {"statusCode": 404, "body": "no run recorded in the history"}
+        return {"statusCode": 200, "body": render_json(run)}
+    history = HistoryStore(config.state_dir)
+    try:
+        if query == "openings":
+            result = [
+                record.to_dict()
+                for record in history.openings(today, today + timedelta(days=days))
+            ]
+        elif query == "show":
+            result = [
+                record.to_dict() for record in history.show_runs(show_name, since)
+            ]
+        else:
+            result = [
+                {"venue_name": venue, "productions": count}
+                for venue, count in history.venue_counts(limit)
+            ]
+    finally:
+        history.close()
+    return {"statusCode": 200, "body": json.dumps(result, ensure_ascii=False)}
+
+
+def _report_subject(run: ShowSearchRun) -> str:
+    subject = f"Sondheim UK Report For {datetime.now().strftime('%B %d, %Y')}"
+    if run.pending:
+        subject += " (partial)"
+    elif run.errors:
+        subject += " (incomplete)"
+    return subject
+
+
+def _venue_distances(
+    run: ShowSearchRun, subscribers: List[Subscriber], deadline: Optional[float]
+) -> Optional[VenueDistances]:
+    """
+    Distances of the run's venues to the subscribers' locations, None when
+    no subscriber has one. Venues are geocoded until the run's deadline;
+    the ones left unlocated then are not filtered by distance.
+    """
+    origins = [subscriber.location for subscriber in subscribers if subscriber.location]
+    if not origins:
+        return None
+    venues = [(record.venue_name, record.venue_url) for record in run.details]
+    venues.extend(
+        (change.fields.get("venue_name", ""), change.fields.get("venue_url", ""))
+        for change in run.changes
     )
-    return {"statusCode": status_code, "body": response_json, "log": result}
+    geocoder = make_geocoder()
+    try:
+        with get_metrics().span("geocode", venues=len(venues)):
+            distances = VenueDistances(venues, origins, geocoder, deadline)
+    finally:
+        geocoder.close()
+    if distances.skipped:
+        get_metrics().record_warning(
+            f"deadline reached while geocoding, {distances.skipped} venues"
+            " not located and not filtered by distance"
+        )
+    return distances
+
+
+def _send_reports(
+    run: ShowSearchRun,
+    event,
+    subscribers: List[Subscriber],
+    deadline: Optional[float] = None,
+) -> dict:
+    """
+    Renders each subscriber's part of a run, emails the reports in batches
+    and builds the handler response. Subscribers with the same shows and
+    filters share one rendering. Duplicate and unchanged reports are
+    suppressed per recipient, see dispatch_reports.
+    """
+    metrics = get_metrics()
+    distances = _venue_distances(run, subscribers, deadline)
+    with metrics.span("render"):
+        result, html_report = render_report(run)
+    # selection key -> (subject, HTML report)
+    rendered: Dict[tuple, Tuple[str, str]] = {
+        Subscriber("").selection_key(): (_report_subject(run), html_report)
+    }
+    reports = []
+    for subscriber in subscribers:
+        key = subscriber.selection_key()
+        if key not in rendered:
+            selected = subscriber.select(run, distances)
+            with metrics.span("render", subscriber=subscriber.email):
+                _, html = render_report(selected, subscriber.report_mode)
+            rendered[key] = (_report_subject(selected), html)
+        subject, html = rendered[key]
+        reports.append(OutgoingReport(subscriber.email, subscriber.name, subject, html))
+    with metrics.span("email_send", reports=len(reports)):
+        dispatch = dispatch_reports(reports)
+    result += f" http cache: {cache_stats()} render cache: {get_render_cache().stats()}"
+    if distances is not None:
+        result += f" venues located: {distances.located}"
+    result += (
+        f" reports: {len(rendered)} rendered, {len(dispatch.sent)} sent,"
+        f" {len(dispatch.notices)} no-change notices,"
+        f" {len(dispatch.suppressed)} suppressed"
+    )
+    status_code = next(
+        (status for status, _ in dispatch.responses if status != 200), 200
+    )
+    response = {
+        "statusCode": status_code,
+        "body": [body for _, body in dispatch.responses],
+        "log": result,
+    }
+    if _event_option(event, "format") == "json":
+        response["report"] = render_json(run)
+    return response
@@ -0,0 +1,48 @@
+"""
+SQLite databases of the state directory: every store opens its file the
+same way, and shares one connection between the threads of a run
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Tuple
+
+# seconds a connection waits for another process's write lock
+BUSY_TIMEOUT_SECONDS = 30
+
+
+def open_store(
+    state_dir: str, filename: str, schema: str
+) -> Tuple[str, sqlite3.Connection]:
+    """
+    Opens (creating it and `state_dir` if needed) a database of the state
+    directory and applies `schema`, a script of CREATE ... IF NOT EXISTS
+    statements.
+
+    Returns:
+        str: path of the database file.
+        sqlite3.Connection: a connection usable from any thread.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    path = os.path.join(state_dir, filename)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT_SECONDS)
+    conn.executescript(schema)
+    conn.commit()
+    return path, conn
+
+
+class SQLiteStore:
+    """
+    Base of the stores: the connection of open_store, its use serialized by
+    `_lock`.
+    """
+
+    def __init__(self, state_dir: str, filename: str, schema: str):
+        self.path, self._conn = open_store(state_dir, filename, schema)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Closes the underlying database."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,178 @@
+"""
+report subscribers: who gets a report, for which shows and productions
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import Config
+from .wos_geo import Coordinates, VenueDistances, parse_location
+from .wos_models import normalize_text
+
+REPORT_MODES = ("full", "delta", "both")
+
+
+@dataclass(slots=True)
+class Subscriber:
+    """
+    A report recipient. `shows` None means every tracked show; `venues`
+    keeps only productions whose venue name contains one of the given
+    strings (case-insensitive); with a `location`, productions at venues
+    farther than `radius_miles` (default SEARCH_RADIUS_MILES) are left out,
+    those at venues that could not be located are kept; `report_mode`
+    overrides REPORT_MODE.
+    """
+
+    email: str
+    name: str = "Recipient"
+    shows: Optional[List[str]] = None
+    venues: List[str] = field(default_factory=list)
+    report_mode: Optional[str] = None
+    location: Optional[Coordinates] = None
+    radius_miles: Optional[float] = None
+
+    def selection_key(self) -> Tuple:
+        """Subscribers with equal keys get the same report."""
+        return (
+            None if self.shows is None else tuple(self.shows),
+            tuple(venue.lower() for venue in self.venues),
+            self.report_mode,
+            self.location,
+            self.radius_miles if self.location else None,
+        )
+
+    def wants_show(self, show_name: str) -> bool:
+        return self.shows is None or show_name in self.shows
+
+    def wants_venue(self, venue_name: str) -> bool:
+        if not self.venues:
+            return True
+        venue_name = venue_name.lower()
+        return any(venue.lower() in venue_name for venue in self.venues)
+
+    def select(self, run: Any, distances: Optional[VenueDistances] = None) -> Any:
+        """
+        The part of a ShowSearchRun this subscriber is interested in: their
+        shows' productions at their venues within their radius, changes,
+        pending shows and errors.
+        """
+        if distances is None or self.location is None:
+            near = None
+        else:
+            near = self._near(distances)
+        if self.shows is None and not self.venues and near is None:
+            return run
+
+        def wanted(show_name: str, fields: Dict[str, str]) -> bool:
+            venue_name = fields.get("venue_name", "")
+            return (
+                self.wants_show(show_name)
+                and self.wants_venue(normalize_text(venue_name))
+                and (near is None or near(venue_name, fields.get("venue_url", "")))
+            )
+
+        return run._replace(
+            details=[
+                record
+                for record in run.details
+                if wanted(record.show_name, record.fields())
+            ],
+            changes=[
+                change
+                for change in run.changes
+                if wanted(change.show_name, change.fields)
+            ],
+            pending=[show for show in run.pending if self.wants_show(show)],
+            errors=[
+                error
+                for error in run.errors
+                if self.wants_show(error.split(": ", 1)[0])
+            ],
+        )
+
+    def _near(self, distances: VenueDistances) -> Callable[[str, str], bool]:
+        """Whether a venue (name, URL) is within the subscriber's radius."""
+        radius = self.radius_miles
+        if radius is None:
+            radius = Config().load().search_radius_miles
+        location = self.location
+
+        def near(venue_name: str, venue_url: str) -> bool:
+            miles = distances.miles(venue_name, venue_url, location)
+            return miles is None or miles <= radius
+
+        return near
+
+
+def subscriber_from_dict(data: dict) -> Subscriber:
+    """
+    Raises:
+        ValueError: if the entry has no email, an unknown report_mode or an
+            invalid location.
+    """
+    if not data.get("email"):
+        raise ValueError(f"Subscriber without an email: {data}")
+    if data.get("report_mode") not in (None, *REPORT_MODES):
+        raise ValueError(
+            f"Unknown report_mode {data['report_mode']!r}, expected {REPORT_MODES}"
+        )
+    return Subscriber(
+        email=data["email"],
+        name=data.get("name") or "Recipient",
+        shows=list(data["shows"]) if data.get("shows") is not None else None,
+        venues=list(data.get("venues") or []),
+        report_mode=data.get("report_mode"),
+        location=parse_location(data["location"]) if data.get("location") else None,
+        radius_miles=(
+            float(data["radius_miles"])
+            if data.get("radius_miles") is not None
+            else None
+        ),
+    )
+
+
+def load_subscribers(path: Optional[str] = None) -> List[Subscriber]:
+    """
+    Reads the subscribers from `path` (defaults to SUBSCRIBERS_FILE): a JSON
+    list of {"email", "name", "shows", "venues", "report_mode", "location",
+    "radius_miles"} objects, or an object holding it under "subscribers".
+    Without a file, the EMAIL_RECIPIENT / EMAIL_RECIPIENT_2 addresses get
+    every show, within SEARCH_RADIUS_MILES of HOME_LOCATION if set.
+
+    Raises:
+        ValueError: for an invalid subscriber entry or HOME_LOCATION.
+    """
+    config = Config().load()
+    path = path or config.subscribers_file
+    if not path:
+        location = (
+            parse_location(config.home_location) if config.home_location else None
+        )
+        return [
+            Subscriber(email, location=location)
+            for email in (config.email_recipient, config.email_recipient_2)
+            if email
+        ]
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("subscribers", [])
+    return [subscriber_from_dict(entry) for entry in data]
+
+
+def shows_for(subscribers: Sequence[Subscriber], shows: Sequence[str]) -> List[str]:
+    """
+    The union of the subscribers' shows, each once: tracked `shows` in their
+    order, then any others subscribers asked for. Without subscribers, all
+    tracked shows (the run is then only reported in the handler response).
+    """
+    if not subscribers or any(subscriber.shows is None for subscriber in subscribers):
+        wanted = list(shows)
+    else:
+        wanted = []
+    for subscriber in subscribers:
+        wanted.extend(subscriber.shows or [])
+    union = list(dict.fromkeys(wanted))
+    order = {show: index for index, show in enumerate(shows)}
+    return sorted(union, key=lambda show: order.get(show, len(order)))
@@ -0,0 +1,262 @@
+"""
+Offline benchmarks for the scrape/parse/render pipeline.
+
+python -m tests.benchmarks.bench_wos_sondheim_alert --output bench.json
+python -m tests.benchmarks.bench_wos_sondheim_alert --compare bench.json
+
+Every case reports wall time, CPU time and peak traced memory. Results are
+saved as JSON so parser engines and concurrency settings can be compared
+across commits; --compare exits non-zero when a case got slower than the
+given baseline by more than --threshold.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List
+
+from netlify.functions import wos_sondheim_alert
+from netlify.functions.wos_models import ShowDetails
+from netlify.functions.wos_parsers import PARSER_ENGINES, InfoPageScanner
+from netlify.functions.wos_render import get_render_cache
+
+INFO_PAGE_FIXTURE = "tests/inttests/wos_info.html"
+SEARCH_PAGE_SIZES = (10, 100, 1000)
+CONCURRENCY_LEVELS = (1, 4, 16)
+# simulated round trip of a stubbed fetch, in seconds
+STUB_LATENCY = 0.01
+
+ARTICLE_TEMPLATE = """
+  <article class="col-12">
+    <a class="text-body-tertiary">{kind}</a>
+    <h3 class="fw-bold"><a>{title}</a></h3>
+    <p>{filler}</p>
+    <a class="buy-tickets-link" href="https://www.whatsonstage.com/shows/{slug}/"><span>More Info</span></a>
+  </article>
+"""
+
+
+def synthetic_search_page(articles: int, show_name: str = "Company") -> str:
+    """A search results page with `articles` results, every tenth one matching."""
+    parts = ["<html><body><div id='search-results-container'>"]
+    for index in range(articles):
+        matching = index % 10 == 0
+        parts.append(
+            ARTICLE_TEMPLATE.format(
+                kind="SHOW" if index % 3 else "NEWS",
+                title=show_name if matching else f"Other Show {index}",
+                filler="lorem ipsum " * 20,
+                slug=f"production-{index}",
+            )
+        )
+    parts.append("</div></body></html>")
+    return "".join(parts)
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """
+    Runs `fn` `repeat` times for the best wall and CPU time, then once more
+    under tracemalloc for its peak memory.
+    """
+    wall_times: List[float] = []
+    cpu_times: List[float] = []
+    for _ in range(repeat):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        fn()
+        wall_times.append(time.perf_counter() - wall_start)
+        cpu_times.append(time.process_time() - cpu_start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "wall_s": round(min(wall_times), 6),
+        "cpu_s": round(min(cpu_times), 6),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def synthetic_run(productions: int) -> wos_sondheim_alert.ShowSearchRun:
+    """A search run with `productions` distinct productions."""
+    details = [
+        ShowDetails(
+            f"Show {index}",
+            info_url=f"https://example.com/show-{index}",
+            first_preview="1 May 2025",
+            opening_night="5 May 2025",
+            closing_night="1 June 2025",
+            venue_name="Venue",
+            venue_url="https://example.com/venue",
+        )
+        for index in range(productions)
+    ]
+    return wos_sondheim_alert.ShowSearchRun(details, [], [], False, [], [])
+
+
+@contextmanager
+def stubbed_fetchers(search_page: str, info_page: str) -> Iterator[None]:
+    """Replaces the network fetchers with fixed pages after STUB_LATENCY."""
+    original = wos_sondheim_alert.get_show_page, wos_sondheim_alert.get_info_page
+
+    def fake_get_show_page(show_name, config):
+        time.sleep(STUB_LATENCY)
+        return search_page.replace("Company", show_name)
+
+    def fake_get_info_page(info_url, config):
+        time.sleep(STUB_LATENCY)
+        return info_page, ""
+
+    wos_sondheim_alert.get_show_page = fake_get_show_page
+    wos_sondheim_alert.get_info_page = fake_get_info_page
+    try:
+        yield
+    finally:
+        wos_sondheim_alert.get_show_page, wos_sondheim_alert.get_info_page = original
+
+
+def scanned_document(page: str) -> str:
+    """What get_info_page returns for `page` in streaming mode."""
+    scanner = InfoPageScanner()
+    scanner.feed(page)
+    return scanner.document()
+
+
+def run_benchmarks(repeat: int) -> List[Dict[str, object]]:
+    """Runs every case and returns one result record per case."""
+    with open(INFO_PAGE_FIXTURE, "r", encoding="utf-8") as f:
+        info_page = f.read()
+    results: List[Dict[str, object]] = []
+
+    def record(name: str, params: Dict[str, object], fn: Callable[[], object]):
+        results.append({"name": name, "params": params, **measure(fn, repeat)})
+        print(json.dumps(results[-1]))
+
+    for engine in PARSER_ENGINES:
+        for articles in SEARCH_PAGE_SIZES:
+            page = synthetic_search_page(articles)
+            record(
+                "extract_info_links",
+                {"engine": engine, "articles": articles},
+                lambda: wos_sondheim_alert.extract_info_links(page, "Company", engine),
+            )
+        record(
+            "extract_details_from_info_page",
+            {"engine": engine, "page": "full"},
+            lambda: wos_sondheim_alert.extract_details_from_info_page(
+                "Company", info_page, engine
+            ),
+        )
+        document = scanned_document(info_page)
+        record(
+            "extract_details_from_info_page",
+            {"engine": engine, "page": "scanned"},
+            lambda: wos_sondheim_alert.extract_details_from_info_page(
+                "Company", document, engine
+            ),
+        )
+    record("scan_info_page", {}, lambda: scanned_document(info_page))
+
+    cache = get_render_cache()
+    for productions in (10, 100, 1000):
+        run = synthetic_run(productions)
+        # cold: every production rendered; warm: all from the render cache
+        for warm in (False, True):
+
+            def render(run=run, warm=warm):
+                if not warm:
+                    cache.clear()
+                return wos_sondheim_alert.render_report(run)
+
+            record(
+                "render_report",
+                {"productions": productions, "cache": "warm" if warm else "cold"},
+                render,
+            )
+
+    with stubbed_fetchers(synthetic_search_page(30), info_page):
+        shows = wos_sondheim_alert.SHOWS
+        for concurrency in CONCURRENCY_LEVELS:
+            record(
+                "search_shows",
+                {"shows": len(shows), "concurrency": concurrency},
+                lambda: wos_sondheim_alert.search_shows(shows, concurrency),
+            )
+    return results
+
+
+def git_revision() -> str:
+    """Current commit, or "unknown" outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def case_key(result: Dict[str, object]) -> str:
+    """Identifies a case across result files."""
+    return f"{result['name']} {json.dumps(result['params'], sort_keys=True)}"
+
+
+def compare(
+    results: List[Dict[str, object]], baseline_path: str, threshold: float
+) -> bool:
+    """
+    Prints wall-time ratios against a baseline file.
+
+    Returns:
+        bool: True if no case regressed by more than `threshold` (e.g. 0.2 = 20%).
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {case_key(r): r for r in json.load(f)["results"]}
+    ok = True
+    for result in results:
+        before = baseline.get(case_key(result))
+        if not before or not before["wall_s"]:
+            continue
+        ratio = result["wall_s"] / before["wall_s"]
+        regressed = ratio > 1 + threshold
+        ok = ok and not regressed
+        flag = "REGRESSION" if regressed else "ok"
+        print(f"{flag:10} {ratio:6.2f}x  {case_key(result)}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat)
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"results saved to {args.output}")
+    if args.compare and not compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Load test of search_shows against the local stand-in server.
+
+python -m tests.loadtest.run_load_test --scale 10 --concurrency 1,8,32
+python -m tests.loadtest.run_load_test --scale 100 --latency-ms 50 --throttle-rate 0.05
+
+The show list is SHOWS repeated `--scale` times (with numbered titles). Each
+concurrency level runs twice, with a cold and then a warm page cache, and
+reports wall time, productions found, cache counts and server-side counts.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from netlify.functions import wos_http, wos_sondheim_alert
+from netlify.functions.wos_ratelimit import limiter_stats, reset_limiters
+from netlify.functions.wos_constants import SHOWS
+from tests.loadtest.wos_stub_server import (
+    StubSettings,
+    query_url_template,
+    start_server,
+)
+
+
+def scaled_shows(scale: int) -> List[str]:
+    """SHOWS repeated `scale` times, numbered after the first copy."""
+    if scale <= 1:
+        return list(SHOWS)
+    return [f"{show} {copy}" for copy in range(scale) for show in SHOWS]
+
+
+def server_counts(server) -> Dict[str, int]:
+    with server.state.lock:
+        return dict(server.state.counts)
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, object]]:
+    settings = StubSettings(
+        mode=args.mode,
+        archive=args.archive,
+        productions=args.productions,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    server = start_server(settings)
+    os.environ["WOS_QUERY_URL_TEMPLATE"] = query_url_template(server)
+    shows = scaled_shows(args.scale)
+    results: List[Dict[str, object]] = []
+    try:
+        for concurrency in args.concurrency:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                os.environ["HTTP_CACHE_DIR"] = cache_dir
+                wos_http.reset_session()
+                wos_http.reset_cache()
+                reset_limiters()
+                for cache in ("cold", "warm"):
+                    before = server_counts(server)
+                    start = time.perf_counter()
+                    text, _ = wos_sondheim_alert.search_shows(shows, concurrency)
+                    wall = time.perf_counter() - start
+                    after = server_counts(server)
+                    results.append(
+                        {
+                            "shows": len(shows),
+                            "concurrency": concurrency,
+                            "cache": cache,
+                            "wall_s": round(wall, 3),
+                            "productions": text.count("show: "),
+                            "http_cache": wos_http.cache_stats(),
+                            "rate_limits": limiter_stats(),
+                            "server": {k: after[k] - before[k] for k in after},
+                        }
+                    )
+                    print(json.dumps(results[-1]))
+                    wos_http.get_cache().reset_stats()
+                wos_http.reset_cache()
+    finally:
+        server.shutdown()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=("synthetic", "replay"), default="synthetic")
+    parser.add_argument("--archive", default="wos_archive.jsonl.gz")
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 8, 32],
+    )
+    parser.add_argument("--productions", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+    results = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
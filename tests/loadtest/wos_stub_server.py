@@ -0,0 +1,327 @@
+"""
+Local WhatsOnStage stand-in server for load testing.
+
+python -m tests.loadtest.wos_stub_server --mode synthetic --port 8765
+python -m tests.loadtest.wos_stub_server --mode record --archive wos.jsonl.gz
+python -m tests.loadtest.wos_stub_server --mode replay --archive wos.jsonl.gz
+
+Point the scraper at it with
+WOS_QUERY_URL_TEMPLATE="http://127.0.0.1:8765/?s={show_name}".
+
+Modes:
+    synthetic: search pages list `--productions` matching productions per
+        query; info pages are tests/inttests/wos_info.html with the URL,
+        dates and venue substituted.
+    record: proxies every request to `--upstream` and appends the
+        responses to a gzip-compressed JSON-lines archive.
+    replay: serves the archive back; unknown paths get a 404.
+
+Every mode can add latency and inject errors and 429s (with Retry-After).
+Faults are drawn from a seeded RNG, so runs are repeatable. Synthetic and
+replayed pages carry an ETag and answer If-None-Match with 304.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+INFO_PAGE_FIXTURE = "tests/inttests/wos_info.html"
+FIXTURE_INFO_URL = (
+    "https://www.whatsonstage.com/shows/inner-london-theatre/"
+    "national-youth-dance-companyboy-blue-nydc-24-25_278715782/"
+)
+FIXTURE_VENUE = "Sadler's Wells Theatre"
+FIXTURE_FIRST_PREVIEW = "First Preview: 19 July 2025"
+FIXTURE_CLOSING_NIGHT = "Closing Night: 19 July 2025"
+UPSTREAM = "https://www.whatsonstage.com"
+
+SEARCH_PAGE_TEMPLATE = """<html><head><title>Search</title></head><body>
+<div id="search-results-container">{articles}</div>
+</body></html>"""
+
+ARTICLE_TEMPLATE = """
+  <article class="col-12">
+    <a class="text-body-tertiary">{kind}</a>
+    <h3 class="fw-bold"><a>{title}</a></h3>
+    <a class="buy-tickets-link" href="{info_url}"><span>More Info</span></a>
+  </article>"""
+
+
+@dataclass
+class StubSettings:  # pylint: disable=too-many-instance-attributes
+    """Behaviour of a stand-in server."""
+
+    mode: str = "synthetic"
+    archive: str = ""
+    upstream: str = UPSTREAM
+    productions: int = 2
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+    seed: int = 0
+
+
+class StubState:
+    """Shared, lock-protected server state: RNG, archive and counters."""
+
+    def __init__(self, settings: StubSettings):
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.random = random.Random(settings.seed)
+        self.counts: Dict[str, int] = {
+            "requests": 0,
+            "errors": 0,
+            "throttled": 0,
+            "not_modified": 0,
+        }
+        self.archive: Dict[str, dict] = {}
+        self.info_page = ""
+        if settings.mode == "synthetic":
+            with open(INFO_PAGE_FIXTURE, "r", encoding="utf-8") as f:
+                self.info_page = f.read()
+        if settings.mode == "replay":
+            self.archive = load_archive(settings.archive)
+
+    def draw_fault(self) -> Tuple[float, Optional[int]]:
+        """Returns (delay in seconds, injected status or None) for one request."""
+        settings = self.settings
+        with self.lock:
+            self.counts["requests"] += 1
+            delay = settings.latency_ms + self.random.uniform(
+                -settings.jitter_ms, settings.jitter_ms
+            )
+            roll = self.random.random()
+            status = None
+            if roll < settings.throttle_rate:
+                status = 429
+                self.counts["throttled"] += 1
+            elif roll < settings.throttle_rate + settings.error_rate:
+                status = self.random.choice((500, 502, 503))
+                self.counts["errors"] += 1
+        return max(delay, 0.0) / 1000, status
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.counts[key] += 1
+
+    def append_to_archive(self, path: str, entry: dict) -> None:
+        """Appends one recorded response as a gzip member of the archive."""
+        with self.lock:
+            self.archive[path] = entry
+            with gzip.open(self.settings.archive, "at", encoding="utf-8") as f:
+                f.write(json.dumps({"path": path, **entry}) + "\n")
+
+
+def load_archive(path: str) -> Dict[str, dict]:
+    """Reads a recorded archive into {path: response}; later entries win."""
+    archive: Dict[str, dict] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            archive[entry.pop("path")] = entry
+    return archive
+
+
+def slugify(text: str) -> str:
+    return "-".join("".join(c if c.isalnum() else " " for c in text.lower()).split())
+
+
+def synthetic_search_page(query: str, base_url: str, productions: int) -> str:
+    """Search results for `query`: matching productions plus some noise."""
+    articles = []
+    for index in range(productions):
+        articles.append(
+            ARTICLE_TEMPLATE.format(
+                kind="SHOW",
+                title=query,
+                info_url=f"{base_url}/shows/{slugify(query)}_{index}/",
+            )
+        )
+    articles.append(
+        ARTICLE_TEMPLATE.format(
+            kind="NEWS", title=query, info_url=f"{base_url}/news/{slugify(query)}/"
+        )
+    )
+    articles.append(
+        ARTICLE_TEMPLATE.format(
+            kind="SHOW",
+            title=f"{query} In Concert",
+            info_url=f"{base_url}/shows/{slugify(query)}-in-concert/",
+        )
+    )
+    return SEARCH_PAGE_TEMPLATE.format(articles="".join(articles))
+
+
+def synthetic_info_page(fixture: str, info_url: str, slug: str) -> str:
+    """The info page fixture with this production's URL, dates and venue."""
+    day = int(hashlib.sha1(slug.encode()).hexdigest(), 16) % 28 + 1
+    return (
+        fixture.replace(FIXTURE_INFO_URL, info_url)
+        .replace(FIXTURE_VENUE, f"Venue {slug}")
+        .replace(FIXTURE_FIRST_PREVIEW, f"First Preview: {day} March 2026")
+        .replace(FIXTURE_CLOSING_NIGHT, f"Closing Night: {day} June 2026")
+    )
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves one request according to the server's StubState."""
+
+    server_version = "WosStub/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state  # type: ignore[attr-defined]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path == "/__stats":
+            with self.state.lock:
+                body = json.dumps(self.state.counts)
+            self.respond(200, body, {"Content-Type": "application/json"})
+            return
+        delay, fault = self.state.draw_fault()
+        if delay:
+            time.sleep(delay)
+        if fault == 429:
+            self.respond(429, "", {"Retry-After": str(self.state.settings.retry_after)})
+            return
+        if fault:
+            self.respond(fault, "")
+            return
+        mode = self.state.settings.mode
+        if mode == "synthetic":
+            status, body = self.synthetic_response()
+        elif mode == "record":
+            status, body = self.recorded_response()
+        else:
+            entry = self.state.archive.get(self.path)
+            status, body = (entry["status"], entry["body"]) if entry else (404, "")
+        body = body.replace(self.state.settings.upstream, self.base_url)
+        etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.state.count("not_modified")
+            self.respond(304, "", {"ETag": etag})
+            return
+        self.respond(status, body, {"ETag": etag} if status == 200 else {})
+
+    def synthetic_response(self) -> Tuple[int, str]:
+        parts = urlsplit(self.path)
+        if parts.path == "/" and "s" in parse_qs(parts.query):
+            query = parse_qs(parts.query)["s"][0]
+            return 200, synthetic_search_page(
+                query, self.base_url, self.state.settings.productions
+            )
+        if parts.path.startswith("/shows/"):
+            slug = parts.path.strip("/").split("/")[-1]
+            return 200, synthetic_info_page(
+                self.state.info_page, self.base_url + parts.path, slug
+            )
+        return 404, ""
+
+    def recorded_response(self) -> Tuple[int, str]:
+        response = requests.get(self.state.settings.upstream + self.path, timeout=30)
+        entry = {"status": response.status_code, "body": response.text}
+        self.state.append_to_archive(self.path, entry)
+        return entry["status"], entry["body"]
+
+    def respond(self, status: int, body: str, headers: Optional[dict] = None):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        headers = {"Content-Type": "text/html; charset=utf-8", **(headers or {})}
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded server that ignores clients hanging up mid-response."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_server(
+    settings: StubSettings, host: str = "127.0.0.1", port: int = 0
+) -> StubServer:
+    """
+    Starts a stand-in server on a daemon thread; port 0 picks a free port.
+    Stop it with server.shutdown().
+    """
+    server = StubServer((host, port), StubHandler)
+    server.state = StubState(settings)  # type: ignore[attr-defined]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def query_url_template(server: StubServer) -> str:
+    """WOS_QUERY_URL_TEMPLATE value that targets `server`."""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/?s={{show_name}}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--mode", choices=("synthetic", "record", "replay"), default="synthetic"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--archive", default="wos_archive.jsonl.gz")
+    parser.add_argument("--upstream", default=UPSTREAM)
+    parser.add_argument("--productions", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    settings = StubSettings(
+        mode=args.mode,
+        archive=args.archive,
+        upstream=args.upstream,
+        productions=args.productions,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    server = start_server(settings, args.host, args.port)
+    print(f"{args.mode} server on WOS_QUERY_URL_TEMPLATE={query_url_template(server)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
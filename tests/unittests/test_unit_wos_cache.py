@@ -0,0 +1,39 @@
+"""
+pytest -v tests/unittests/test_unit_wos_cache.py
+"""
+
+import os
+
+from netlify.functions.wos_cache import HttpCache
+
+
+def test_store_and_lookup_survive_reopen(tmp_path):
+    cache = HttpCache(str(tmp_path), ttl_seconds=60, max_bytes=1024 * 1024)
+    cache.store("https://example.com/a", "<html>a</html>", '"etag-a"', "")
+    cache.close()
+    entry = HttpCache(str(tmp_path), 60, 1024 * 1024).lookup("https://example.com/a")
+    assert entry.body == "<html>a</html>"
+    assert entry.etag == '"etag-a"'
+
+
+def test_ttl_freshness(tmp_path):
+    cache = HttpCache(str(tmp_path), ttl_seconds=60, max_bytes=1024 * 1024)
+    cache.store("https://example.com/a", "a")
+    entry = cache.lookup("https://example.com/a")
+    assert cache.is_fresh(entry)
+    cache.ttl_seconds = 0
+    assert not cache.is_fresh(entry)
+
+
+def test_lru_eviction(tmp_path):
+    # same poorly compressible body for every URL, so entries are equal in size
+    body = os.urandom(512).hex()
+    cache = HttpCache(str(tmp_path), ttl_seconds=60, max_bytes=10**9)
+    cache.store("a", body)
+    cache.store("b", body)
+    cache.lookup("a")  # b is now the least recently used
+    cache.max_bytes = cache.total_bytes()
+    cache.store("c", body)
+    assert cache.lookup("b") is None
+    assert cache.lookup("a") is not None
+    assert cache.lookup("c") is not None
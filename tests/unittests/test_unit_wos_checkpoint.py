@@ -0,0 +1,22 @@
+"""
+pytest -v tests/unittests/test_unit_wos_checkpoint.py
+"""
+
+from netlify.functions.wos_checkpoint import RunCheckpoint
+
+
+def test_prioritize_without_checkpoint_keeps_order(tmp_path):
+    checkpoint = RunCheckpoint(str(tmp_path))
+    assert checkpoint.load() == {"pending": [], "productive": []}
+    assert checkpoint.prioritize(["Company", "Follies"]) == ["Company", "Follies"]
+
+
+def test_prioritize_puts_pending_then_productive_first(tmp_path):
+    checkpoint = RunCheckpoint(str(tmp_path))
+    checkpoint.save(pending=["Passion", "Gone"], productive=["Follies", "Passion"])
+    assert checkpoint.prioritize(["Company", "Follies", "Passion", "Assassins"]) == [
+        "Passion",
+        "Follies",
+        "Company",
+        "Assassins",
+    ]
@@ -0,0 +1,113 @@
+"""
+pytest -v tests/unittests/test_unit_wos_geo.py
+"""
+
+import json
+import time
+
+import pytest
+
+from netlify.functions import wos_geo
+from netlify.functions.wos_geo import (
+    GeocodeCache,
+    Geocoder,
+    LocalResolver,
+    VenueDistances,
+    haversine_miles,
+    parse_location,
+)
+
+LONDON = (51.5074, -0.1278)
+MANCHESTER = (53.4808, -2.2426)
+
+
+def test_parse_location():
+    assert parse_location("51.5074, -0.1278") == LONDON
+    assert parse_location([53.4808, -2.2426]) == MANCHESTER
+    for value in ("London", "1,2,3", [91, 0], None):
+        with pytest.raises(ValueError):
+            parse_location(value)
+
+
+def test_haversine_miles_without_numpy(monkeypatch):
+    monkeypatch.setattr(wos_geo, "_numpy", lambda: None)
+    [[to_london, to_manchester]] = haversine_miles([MANCHESTER], [LONDON, MANCHESTER])
+    assert to_london == pytest.approx(163, abs=1)
+    assert to_manchester == 0
+    assert haversine_miles([], [LONDON]) == []
+    assert haversine_miles([LONDON], []) == [[]]
+
+
+def test_haversine_miles_with_numpy(monkeypatch):
+    pytest.importorskip("numpy")
+    points = [LONDON, MANCHESTER, (48.8566, 2.3522)]
+    vectorised = haversine_miles(points, [LONDON, MANCHESTER])
+    monkeypatch.setattr(wos_geo, "_numpy", lambda: None)
+    for row, expected in zip(vectorised, haversine_miles(points, [LONDON, MANCHESTER])):
+        assert row == pytest.approx(expected)
+
+
+def test_geocoder_caches_resolved_and_unknown_venues(tmp_path):
+    path = tmp_path / "venues.json"
+    path.write_text(
+        json.dumps(
+            {
+                "https://venue.example.com/royal-exchange": "53.4830,-2.2446",
+                "Gielgud Theatre": [51.5117, -0.1324],
+            }
+        )
+    )
+    lookups = []
+    local = LocalResolver(str(path))
+
+    def resolver(venue_name, venue_url):
+        lookups.append(venue_name)
+        return local(venue_name, venue_url)
+
+    geocoder = Geocoder(GeocodeCache(str(tmp_path)), resolver)
+    venues = [
+        ("Royal Exchange", "https://venue.example.com/Royal-Exchange"),
+        ("Gielgud  Theatre", "N/A"),
+        ("Nowhere Playhouse", "N/A"),
+    ]
+    assert [geocoder.locate(*venue) for venue in venues] == [
+        (53.4830, -2.2446),
+        (51.5117, -0.1324),
+        None,
+    ]
+    assert [geocoder.locate(*venue) for venue in venues][2] is None
+    assert len(lookups) == 3
+    assert geocoder.locate("N/A", "N/A") is None
+    geocoder.close()
+
+
+def test_venue_distances(tmp_path):
+    geocoder = Geocoder(
+        GeocodeCache(str(tmp_path)),
+        lambda name, url: {"Royal Exchange": MANCHESTER, "Gielgud": LONDON}.get(name),
+    )
+    venues = [("Royal Exchange", ""), ("Gielgud", ""), ("Gielgud", ""), ("Hut", "")]
+    distances = VenueDistances(venues, [LONDON, LONDON, MANCHESTER], geocoder)
+    assert distances.located == 2
+    assert distances.miles("Royal Exchange", "", LONDON) == pytest.approx(163, abs=1)
+    assert distances.miles("Gielgud", "", MANCHESTER) == pytest.approx(163, abs=1)
+    assert distances.miles("Gielgud", "", LONDON) == 0
+    assert distances.miles("Hut", "", LONDON) is None
+
+
+def test_venue_distances_stop_geocoding_at_the_deadline(tmp_path):
+    lookups = []
+
+    def resolver(venue_name, venue_url):
+        lookups.append(venue_name)
+        return MANCHESTER
+
+    geocoder = Geocoder(GeocodeCache(str(tmp_path)), resolver)
+    geocoder.locate("Royal Exchange", "")
+    venues = [("Royal Exchange", ""), ("Gielgud", ""), ("Hut", "")]
+    distances = VenueDistances(venues, [LONDON], geocoder, deadline=time.monotonic())
+    # cached venues are still located, the others are not looked up
+    assert lookups == ["Royal Exchange"]
+    assert (distances.located, distances.skipped) == (1, 2)
+    assert distances.miles("Gielgud", "", LONDON) is None
+    geocoder.close()
@@ -0,0 +1,76 @@
+"""
+pytest -v tests/unittests/test_unit_wos_history.py
+"""
+
+from datetime import date
+
+from netlify.functions.wos_history import HistoryStore
+from netlify.functions.wos_models import STATUS_ERROR, ShowDetails
+
+
+def production(show_name, slug, opening_night, closing_night="N/A", venue="Gielgud"):
+    return ShowDetails(
+        show_name,
+        info_url=f"https://example.com/{slug}",
+        opening_night=opening_night,
+        closing_night=closing_night,
+        venue_name=venue,
+    )
+
+
+def test_history_queries_latest_productions(tmp_path):
+    history = HistoryStore(str(tmp_path))
+    history.record_run(
+        "2024-03-01",
+        [
+            production("Company", "company-2024", ": 1 March 2024", "1 June 2024"),
+            production("Follies", "follies", "2024-04-01", venue="Bridge"),
+        ],
+    )
+    history.record_run(
+        "2025-07-01",
+        [
+            production("Company", "company-2025", "5 July 2025", venue="Bridge"),
+            # re-seen with a new opening night: only the latest record counts
+            production("Follies", "follies", "20 July 2025", venue="Bridge"),
+            ShowDetails("Passion", "https://example.com/p", status=STATUS_ERROR),
+        ],
+        pending=["Assassins"],
+        run_date=date(2025, 7, 1),
+    )
+
+    openings = history.openings(date(2025, 7, 1), date(2025, 7, 31))
+    assert [record.info_url.rsplit("/", 1)[1] for record in openings] == [
+        "company-2025",
+        "follies",
+    ]
+    assert history.openings(date(2024, 3, 1), date(2024, 4, 30)) == [
+        production("Company", "company-2024", ": 1 March 2024", "1 June 2024")
+    ]
+    assert len(history.show_runs("Company", date(2024, 1, 1))) == 2
+    assert len(history.show_runs("Company", date(2024, 7, 1))) == 1
+    assert history.venue_counts() == [("Bridge", 2), ("Gielgud", 1)]
+    assert history.venue_counts(limit=1) == [("Bridge", 2)]
+
+    latest = history.latest_run()
+    assert (latest.run_id, latest.run_date) == ("2025-07-01", "2025-07-01")
+    assert [record.show_name for record in latest.details] == [
+        "Company",
+        "Follies",
+        "Passion",
+    ]
+    assert latest.pending == ["Assassins"]
+    history.close()
+
+
+def test_history_replaces_a_rerecorded_run(tmp_path):
+    history = HistoryStore(str(tmp_path))
+    assert history.latest_run() is None
+    history.record_run("r1", [production("Company", "company", "5 July 2025")])
+    history.record_run("r1", [production("Follies", "follies", "5 July 2025")])
+    history.close()
+
+    history = HistoryStore(str(tmp_path))
+    assert [record.show_name for record in history.latest_run().details] == ["Follies"]
+    assert history.show_runs("Company", date(2025, 1, 1)) == []
+    history.close()
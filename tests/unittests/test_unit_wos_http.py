@@ -0,0 +1,185 @@
+"""
+pytest -v tests/unittests/test_unit_wos_http.py
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from config import Config
+from netlify.functions import wos_http
+from netlify.functions.wos_metrics import reset_metrics
+from netlify.functions.wos_ratelimit import get_limiter, reset_limiters
+from netlify.functions.wos_parsers import InfoPageScanner
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch, tmp_path):
+    monkeypatch.setenv("HTTP_RETRIES", "2")
+    monkeypatch.setenv("HTTP_BACKOFF_FACTOR", "0")
+    monkeypatch.setenv("HTTP_CACHE_DIR", str(tmp_path))
+    wos_http.reset_session()
+    wos_http.reset_cache()
+    reset_limiters()
+    yield
+    wos_http.reset_session()
+    wos_http.reset_cache()
+    reset_limiters()
+
+
+@pytest.fixture
+def flaky_server():
+    """Serves 503 (or `failure_status`) for the first `failures` requests, then a page."""
+    state = {"failures": 1, "requests": 0, "headers": [], "etag": ""}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            state["requests"] += 1
+            state["headers"].append(dict(self.headers))
+            if state["requests"] <= state["failures"]:
+                self.send_response(state.get("failure_status", 503))
+                if state.get("retry_after"):
+                    self.send_header("Retry-After", state["retry_after"])
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if state["etag"] and self.headers.get("If-None-Match") == state["etag"]:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = state.get("body", b"<html>ok</html>")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            if state["etag"]:
+                self.send_header("ETag", state["etag"])
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/", state
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_is_shared():
+    assert wos_http.get_session() is wos_http.get_session()
+    assert "gzip" in wos_http.get_session().headers["Accept-Encoding"]
+
+
+def test_timeout_is_split(monkeypatch):
+    monkeypatch.setenv("HTTP_CONNECT_TIMEOUT", "2")
+    monkeypatch.setenv("HTTP_READ_TIMEOUT", "7")
+    assert wos_http.get_timeout() == (2.0, 7.0)
+
+
+def test_fetch_text_retries_transient_errors(flaky_server):
+    url, state = flaky_server
+    assert wos_http.fetch_text(url) == "<html>ok</html>"
+    assert state["requests"] == 2
+
+
+def test_fetch_text_raises_after_retries(flaky_server):
+    url, state = flaky_server
+    state["failures"] = 10
+    with pytest.raises(requests.HTTPError):
+        wos_http.fetch_text(url)
+    assert state["requests"] == 3
+
+
+def test_fetch_text_honours_retry_after(flaky_server):
+    url, state = flaky_server
+    state["failure_status"] = 429
+    state["retry_after"] = "1"
+    start = time.monotonic()
+    assert wos_http.fetch_text(url) == "<html>ok</html>"
+    assert time.monotonic() - start >= 1
+    assert state["requests"] == 2
+    stats = get_limiter(url).stats()
+    assert stats["throttled"] == 1
+    assert stats["concurrency_limit"] < Config().load().fetch_concurrency
+
+
+def test_fetch_text_serves_fresh_entries_from_cache(flaky_server):
+    url, state = flaky_server
+    state["failures"] = 0
+    assert wos_http.fetch_text(url) == wos_http.fetch_text(url)
+    assert state["requests"] == 1
+    assert wos_http.cache_stats() == {"hits": 1, "misses": 1, "revalidations": 0}
+
+
+def test_fetch_text_revalidates_stale_entries(monkeypatch, flaky_server):
+    url, state = flaky_server
+    state["failures"] = 0
+    state["etag"] = '"v1"'
+    monkeypatch.setenv("HTTP_CACHE_TTL_SECONDS", "0")
+    wos_http.reset_cache()
+    assert wos_http.fetch_text(url) == "<html>ok</html>"
+    assert wos_http.fetch_text(url) == "<html>ok</html>"
+    assert state["headers"][1]["If-None-Match"] == '"v1"'
+    assert wos_http.cache_stats() == {"hits": 0, "misses": 1, "revalidations": 1}
+
+
+def test_fetch_text_records_metrics(monkeypatch, flaky_server):
+    url, state = flaky_server
+    state["failures"] = 0
+    state["etag"] = '"v1"'
+    monkeypatch.setenv("HTTP_CACHE_TTL_SECONDS", "0")
+    wos_http.reset_cache()
+    metrics = reset_metrics()
+    wos_http.fetch_text(url)
+    wos_http.fetch_text(url)
+    state["failures"] = 10
+    with pytest.raises(requests.HTTPError):
+        wos_http.fetch_text(url + "missing")
+    http = metrics.report()["http"]
+    assert http == {
+        "requests": 5,
+        "bytes": len(b"<html>ok</html>"),
+        "status": {"200": 1, "304": 1, "503": 3},
+        "outcomes": {"misses": 1, "revalidations": 1, "errors": 1},
+        # the first two 503s were backed off and retried
+        "throttled": 2,
+    }
+
+
+def test_fetch_text_without_cache(monkeypatch, flaky_server):
+    url, state = flaky_server
+    state["failures"] = 0
+    monkeypatch.setenv("HTTP_CACHE_ENABLED", "0")
+    wos_http.fetch_text(url)
+    wos_http.fetch_text(url)
+    assert state["requests"] == 2
+    assert wos_http.cache_stats() == {}
+
+
+def test_fetch_text_streams_into_scanner(flaky_server):
+    url, state = flaky_server
+    state["failures"] = 0
+    state["body"] = (
+        b'<html><head><link rel="canonical" href="https://example.com/show" />'
+        b'</head><body><div class="dates-section"><p>First Preview: 1 May</p></div>'
+        b'<div class="location-section"></div>' + b"<p>filler</p>" * 100000
+    )
+    document = wos_http.fetch_text(url, InfoPageScanner())
+    assert 'href="https://example.com/show"' in document
+    assert "First Preview: 1 May" in document
+    assert "filler" not in document
+    # the scanned document is cached apart from the full page
+    assert wos_http.fetch_text(url, InfoPageScanner()) == document
+    assert state["requests"] == 1
+    assert "filler" in wos_http.fetch_text(url)
+
+
+def test_bytes_received_of_a_partly_read_stream():
+    response = requests.Response()
+    response.raw = object()
+    response._content = False  # pylint: disable=protected-access
+    response._content_consumed = True  # pylint: disable=protected-access
+    assert wos_http._bytes_received(response) == 0  # pylint: disable=protected-access
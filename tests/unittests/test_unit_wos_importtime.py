@@ -0,0 +1,71 @@
+"""
+pytest -v tests/unittests/test_unit_wos_importtime.py
+"""
+
+import os
+import subprocess
+import sys
+
+from netlify.functions.wos_importtime import ImportProfiler
+
+
+def test_profiler_times_nested_imports_by_phase(tmp_path, monkeypatch):
+    (tmp_path / "wos_it_outer.py").write_text(
+        "import time\ntime.sleep(0.02)\nimport wos_it_inner\n"
+    )
+    (tmp_path / "wos_it_inner.py").write_text("import time\ntime.sleep(0.05)\n")
+    (tmp_path / "wos_it_lazy.py").write_text("")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    profiler = ImportProfiler()
+    profiler.install()
+    try:
+        __import__("wos_it_outer")
+
+        profiler.end_startup()
+        __import__("wos_it_lazy")
+    finally:
+        profiler.uninstall()
+        for name in ("wos_it_outer", "wos_it_inner", "wos_it_lazy"):
+            sys.modules.pop(name, None)
+    report = profiler.report()
+    inner, outer = sorted(report["startup"], key=lambda record: record["module"])
+    assert (inner["module"], outer["module"]) == ("wos_it_inner", "wos_it_outer")
+    assert inner["cumulative_us"] >= 50000
+    assert outer["cumulative_us"] >= inner["cumulative_us"] + 20000
+    assert 20000 <= outer["self_us"] < inner["cumulative_us"]
+    assert [record["module"] for record in report["lazy"]] == ["wos_it_lazy"]
+    assert report["startup_us"] >= outer["cumulative_us"]
+
+
+def test_import_hook_is_only_installed_with_import_profile():
+    code = (
+        "import builtins, json;"
+        "original = builtins.__import__;"
+        "from netlify.functions import wos_sondheim_alert as m;"
+        "report = m.PROFILER.report();"
+        "print(json.dumps([builtins.__import__ is original, report['enabled'],"
+        " (report.get('startup_us') or 0) > 0]))"
+    )
+    for value, expected in (
+        ("0", "[true, false, false]"),
+        ("1", "[false, true, true]"),
+    ):
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "IMPORT_PROFILE": value},
+        )
+        assert result.stdout.strip() == expected
+
+
+def test_heavy_dependencies_are_not_imported_at_startup():
+    code = (
+        "import sys, netlify.functions.wos_sondheim_alert;"
+        "print(sorted({'bs4', 'lxml', 'mailjet_rest', 'requests'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,70 @@
+"""
+pytest -v tests/unittests/test_unit_wos_lifecycle.py
+"""
+
+from datetime import date
+
+import pytest
+
+from netlify.functions.wos_lifecycle import (
+    DAY_SECONDS,
+    REFRESH_SLACK_SECONDS,
+    ProductionDates,
+    is_due,
+    parse_show_date,
+    refresh_interval,
+)
+
+TODAY = date(2025, 7, 10)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (": 19 July 2025", date(2025, 7, 19)),
+        ("Tue, 1st July 2025", date(2025, 7, 1)),
+        ("19 Sept 2025", date(2025, 9, 19)),
+        ("July 19, 2025", date(2025, 7, 19)),
+        (" 2025-07-01", date(2025, 7, 1)),
+        ("19/07/2025", date(2025, 7, 19)),
+        ("N/A", None),
+        ("TBC", None),
+        (None, None),
+    ],
+)
+def test_parse_show_date(text, expected):
+    assert parse_show_date(text) == expected
+
+
+@pytest.mark.parametrize(
+    "first_preview, opening_night, closing_night, phase",
+    [
+        ("1 June 2025", "5 June 2025", "9 July 2025", "closed"),
+        ("1 July 2025", "15 July 2025", "1 Sept 2025", "previews"),
+        ("1 July 2025", "5 July 2025", "N/A", "running"),
+        ("N/A", "N/A", "1 Sept 2025", "running"),
+        ("1 August 2025", "5 August 2025", "N/A", "upcoming"),
+        ("1 October 2025", "N/A", "N/A", "far_future"),
+        ("N/A", "N/A", "N/A", "unknown"),
+    ],
+)
+def test_phase(first_preview, opening_night, closing_night, phase):
+    fields = {
+        "first_preview": first_preview,
+        "opening_night": opening_night,
+        "closing_night": closing_night,
+    }
+    assert ProductionDates.from_fields(fields).phase(TODAY) == phase
+
+
+def test_refresh_interval_and_is_due():
+    closed = {"first_preview": "1 June 2025", "closing_night": "9 July 2025"}
+    running = {"first_preview": "1 July 2025"}
+    unknown = {"first_preview": "TBC"}
+    assert refresh_interval(closed, 3600, TODAY) is None
+    assert refresh_interval(running, 3600, TODAY) == DAY_SECONDS - REFRESH_SLACK_SECONDS
+    assert refresh_interval(unknown, 3600, TODAY) == 3600
+    now = 1_752_141_600.0  # 2025-07-10 10:00 UTC
+    assert not is_due(closed, now - 365 * DAY_SECONDS, 3600, now)
+    assert is_due(running, now - DAY_SECONDS + 60, 3600, now)
+    assert not is_due(running, now - 3600, 3600, now)
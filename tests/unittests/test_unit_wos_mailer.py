@@ -0,0 +1,144 @@
+"""
+pytest -v tests/unittests/test_unit_wos_mailer.py
+"""
+
+import pytest
+import requests
+
+from netlify.functions import wos_mailer
+from netlify.functions.wos_mailer import OutgoingReport, dispatch_reports
+
+
+class FakeClient:
+    """Mailjet client stand-in: answers each call with the next outcome."""
+
+    def __init__(self, outcomes=()):
+        self.batches = []
+        self.outcomes = list(outcomes)
+        self.send = self
+
+    def create(self, data):
+        self.batches.append(data["Messages"])
+        outcome = self.outcomes.pop(0) if self.outcomes else 200
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome == "no statuses":
+            # a 200 whose body lists no message statuses
+            return FakeResponse(200, 0)
+        return FakeResponse(outcome, len(data["Messages"]))
+
+
+class FakeResponse:
+    def __init__(self, status_code, count):
+        self.status_code = status_code
+        self.count = count
+
+    def json(self):
+        if self.status_code == 502:
+            raise ValueError("Expecting value: line 1 column 1 (char 0)")
+        return {"Messages": [{"Status": "success"}] * self.count}
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    fake = FakeClient()
+    monkeypatch.setattr(wos_mailer, "_client", fake)
+    monkeypatch.setenv("EMAIL_SENDER", "alerts@example.com")
+    monkeypatch.setenv("MAILJET_BACKOFF_SECONDS", "0")
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    return fake
+
+
+def test_send_messages_batches_through_one_client(client):
+    messages = [
+        wos_mailer.build_message([(f"{index}@example.com", "R")], "subject", "<p/>")
+        for index in range(wos_mailer.MAILJET_BATCH_SIZE + 1)
+    ]
+    responses = wos_mailer.send_messages(messages)
+    assert [status for status, _ in responses] == [200, 200]
+    assert [len(batch) for batch in client.batches] == [
+        wos_mailer.MAILJET_BATCH_SIZE,
+        1,
+    ]
+    assert client.batches[1][0] == {
+        "From": {"Email": "alerts@example.com", "Name": "Sondheim Alert"},
+        "To": [{"Email": "50@example.com", "Name": "R"}],
+        "Subject": "subject",
+        "HTMLPart": "<p/>",
+    }
+    assert wos_mailer.send_messages([]) == []
+
+
+def test_send_messages_retries_transient_failures(client, monkeypatch):
+    client.outcomes = [requests.ConnectionError("reset"), 503, 200]
+    message = wos_mailer.build_message([("a@example.com", "A")], "subject", "<p/>")
+    assert wos_mailer.send_messages([message])[0][0] == 200
+    assert len(client.batches) == 3
+    client.outcomes = [400]
+    assert wos_mailer.send_messages([message])[0][0] == 400
+    assert len(client.batches) == 4
+    monkeypatch.setenv("MAILJET_RETRIES", "1")
+    client.outcomes = [requests.ConnectionError("reset")] * 2
+    with pytest.raises(requests.ConnectionError):
+        wos_mailer.send_messages([message])
+
+
+def test_dispatch_suppresses_duplicate_and_unchanged_reports(client, monkeypatch):
+    reports = [
+        OutgoingReport("a@example.com", "A", "Report", "<p>one</p>"),
+        OutgoingReport("b@example.com", "B", "Report", "<p>two</p>"),
+    ]
+    assert dispatch_reports(reports).sent == ["a@example.com", "b@example.com"]
+    # a retried run: identical reports just sent are not sent again
+    result = dispatch_reports(reports, unchanged="send")
+    assert result.suppressed == ["a@example.com", "b@example.com"]
+    assert len(client.batches) == 1
+
+    monkeypatch.setenv("DUPLICATE_SEND_WINDOW_SECONDS", "0")
+    changed = [reports[0], reports[1]._replace(html_body="<p>three</p>")]
+    result = dispatch_reports(changed, unchanged="notice")
+    assert (result.sent, result.notices) == (["b@example.com"], ["a@example.com"])
+    notice = client.batches[-1][0]
+    assert notice["Subject"] == "Report (no changes)"
+    assert "No changes since your last report" in notice["HTMLPart"]
+    assert dispatch_reports(changed, unchanged="skip").suppressed == [
+        "a@example.com",
+        "b@example.com",
+    ]
+    assert dispatch_reports(changed, unchanged="send").sent == [
+        "a@example.com",
+        "b@example.com",
+    ]
+    with pytest.raises(ValueError):
+        dispatch_reports(changed, unchanged="maybe")
+
+
+def test_dispatch_records_only_accepted_messages(client):
+    client.outcomes = [400]
+    report = OutgoingReport("a@example.com", "A", "Report", "<p>one</p>")
+    assert dispatch_reports([report]).sent == []
+    assert dispatch_reports([report]).sent == ["a@example.com"]
+
+
+def test_dispatch_records_each_batch_before_sending_the_next(client, monkeypatch):
+    monkeypatch.setenv("MAILJET_RETRIES", "0")
+    reports = [
+        OutgoingReport(f"{index}@example.com", "R", "Report", f"<p>{index}</p>")
+        for index in range(wos_mailer.MAILJET_BATCH_SIZE + 1)
+    ]
+    client.outcomes = [200, requests.ConnectionError("reset")]
+    with pytest.raises(requests.ConnectionError):
+        dispatch_reports(reports)
+    # the retried run only sends the message of the failed batch
+    assert dispatch_reports(reports).sent == ["50@example.com"]
+    assert [len(batch) for batch in client.batches] == [50, 1, 1]
+
+
+def test_dispatch_does_not_record_unconfirmed_messages(client, monkeypatch):
+    monkeypatch.setenv("MAILJET_RETRIES", "0")
+    report = OutgoingReport("a@example.com", "A", "Report", "<p>one</p>")
+    # a proxy error page, then a 200 without message statuses
+    client.outcomes = [502, "no statuses"]
+    assert wos_mailer.send_messages([{}]) == [(502, None)]
+    assert dispatch_reports([report]).sent == []
+    assert dispatch_reports([report]).sent == ["a@example.com"]
@@ -0,0 +1,49 @@
+"""
+pytest -v tests/unittests/test_unit_wos_matching.py
+"""
+
+import pytest
+
+from netlify.functions.wos_constants import SHOWS
+from netlify.functions.wos_matching import ShowMatcher, main_title, normalize_title
+
+
+def test_normalize_title():
+    assert normalize_title("  Into The Woods (2025) ") == "into the woods"
+    assert normalize_title("Do I Hear a Waltz?") == "do i hear a waltz"
+    assert normalize_title("Side By Side & Sondheim") == "side by side and sondheim"
+    assert normalize_title("Candide – Théâtre") == "candide theatre"
+    assert main_title("Sweeney Todd: The Demon Barber of Fleet Street") == (
+        "sweeney todd"
+    )
+    assert main_title("Gypsy - A Musical Fable") == "gypsy"
+
+
+@pytest.mark.parametrize(
+    "title, show",
+    [
+        ("Company", "Company"),
+        ("COMPANY", "Company"),
+        ("Sweeney Todd: The Demon Barber of Fleet Street", "Sweeney Todd"),
+        ("Into The Woods (2025)", "Into the Woods"),
+        ("Merrily We Roll Along!", "Merrily We Roll Along"),
+        ("Little Night Music", "A Little Night Music"),
+        ("Assassin", "Assassins"),
+        ("Company In Concert", None),
+        ("Sunday in the Park with George In Concert", None),
+        ("Passion Play", None),
+        ("Company 2", None),
+        ("Hamilton", None),
+        ("", None),
+    ],
+)
+def test_match(title, show):
+    assert ShowMatcher(SHOWS).match(title) == show
+
+
+def test_match_prefers_the_closest_show():
+    matcher = ShowMatcher(["Company", "Company 2", "Follies"])
+    assert matcher.match("Company (Revival)") == "Company"
+    assert matcher.match("Company 2") == "Company 2"
+    assert matcher.match("Folies") == "Follies"
+    assert ShowMatcher(["Follies"], threshold=1.0).match("Folies") is None
@@ -0,0 +1,64 @@
+"""
+pytest -v tests/unittests/test_unit_wos_metrics.py
+"""
+
+import time
+
+import pytest
+
+from netlify.functions.wos_metrics import (
+    SLOWEST_SPANS,
+    ProfileCapture,
+    RunMetrics,
+)
+
+
+def test_spans_are_summarized_per_stage():
+    metrics = RunMetrics()
+    for index in range(SLOWEST_SPANS + 5):
+        metrics.add_span("info_fetch", index / 1000, url=f"/shows/{index}")
+    metrics.add_span("render", 0.5)
+    with metrics.span("search_fetch", show="Company"):
+        time.sleep(0.01)
+    report = metrics.report()
+    assert list(report["stages"]) == ["search_fetch", "info_fetch", "render"]
+    assert report["stages"]["info_fetch"] == {
+        "count": SLOWEST_SPANS + 5,
+        "total_ms": pytest.approx(sum(range(SLOWEST_SPANS + 5))),
+        "mean_ms": pytest.approx((SLOWEST_SPANS + 4) / 2),
+        "max_ms": SLOWEST_SPANS + 4,
+    }
+    assert report["stages"]["search_fetch"]["total_ms"] >= 10
+    slowest = report["slowest"]
+    assert len(slowest) == SLOWEST_SPANS
+    assert slowest[0] == {"stage": "render", "ms": 500.0}
+    # render, search_fetch (over 10 ms) and info_fetch 14 ms down to 7 ms
+    assert slowest[-1]["url"] == "/shows/7"
+
+
+def test_profile_capture():
+    capture = ProfileCapture("cprofile, tracemalloc")
+    capture.start()
+    data = [bytes(1000) for _ in range(100)]
+    profile = capture.stop()
+    assert data
+    assert profile["cprofile"]["functions"]
+    assert profile["tracemalloc"]["peak_bytes"] >= 100 * 1000
+    assert ProfileCapture("").stop() == {}
+    capture = ProfileCapture("perf, tracemalloc")
+    assert capture.modes == ["tracemalloc"]
+    assert "'perf'" in capture.warnings[0]
+
+
+def test_profile_capture_skips_cprofile_when_another_profiler_is_active(monkeypatch):
+    class ActiveProfiler:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr("cProfile.Profile", ActiveProfiler)
+    capture = ProfileCapture("cprofile")
+    capture.start()
+    assert capture.stop() == {}
+    assert capture.warnings == [
+        "cprofile capture not started: Another profiling tool is already active"
+    ]
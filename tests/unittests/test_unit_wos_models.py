@@ -0,0 +1,29 @@
+"""
+pytest -v tests/unittests/test_unit_wos_models.py
+"""
+
+import pickle
+
+from netlify.functions.wos_models import STATUS_ERROR, ShowDetails
+
+
+def test_show_details_is_slotted_and_normalized():
+    details = ShowDetails(
+        "Company", first_preview=": 19 July 2025", venue_name="  Gielgud  Theatre "
+    )
+    assert not hasattr(details, "__dict__")
+    assert details.norm_first_preview == "19 July 2025"
+    assert details.norm_opening_night == ""
+    assert details.norm_venue_name == "Gielgud Theatre"
+
+
+def test_show_details_round_trips():
+    details = ShowDetails("Company", info_url="https://example.com/company")
+    assert ShowDetails.from_dict(details.to_dict()) == details
+    assert pickle.loads(pickle.dumps(details)) == details
+    assert ShowDetails.from_fields("Company", details.fields()) == details
+
+
+def test_show_details_error_status():
+    details = ShowDetails("Company", status=STATUS_ERROR, errors="timeout")
+    assert not details.ok
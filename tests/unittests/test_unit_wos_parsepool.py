@@ -0,0 +1,112 @@
+"""
+pytest -v tests/unittests/test_unit_wos_parsepool.py
+"""
+
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from config import Config
+from netlify.functions import wos_parsepool, wos_sondheim_alert
+from netlify.functions.wos_matching import normalize_title
+from netlify.functions.wos_metrics import reset_metrics
+from netlify.functions.wos_parsepool import ParsePool, get_parse_pool
+from netlify.functions.wos_parsers import parse_info_page
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    wos_parsepool.reset_parse_pool()
+    yield
+    wos_parsepool.reset_parse_pool()
+
+
+def test_parse_pool_runs_batches():
+    pool = ParsePool(workers=2, chunk_size=3)
+    try:
+        titles = [f"Company ({year})" for year in range(7)]
+        futures = [pool.submit(normalize_title, title) for title in titles]
+        failed = pool.submit(normalize_title, None)
+        assert [future.result(timeout=60) for future in futures] == ["company"] * 7
+        with pytest.raises(TypeError):
+            failed.result(timeout=60)
+        assert pool.run(normalize_title, "Follies!") == "follies"
+    finally:
+        pool.shutdown()
+
+
+def test_get_parse_pool_follows_settings(monkeypatch):
+    monkeypatch.setenv("PARSE_WORKERS", "0")
+    assert get_parse_pool() is None
+    monkeypatch.setenv("PARSE_WORKERS", "1")
+    pool = get_parse_pool()
+    assert pool is not None and get_parse_pool() is pool
+    monkeypatch.setenv("PARSE_CHUNK_SIZE", "2")
+    assert get_parse_pool() is not pool
+
+
+def test_unavailable_pool_is_reported_in_metrics(monkeypatch):
+    def unavailable(*args):
+        raise OSError("no /dev/shm")
+
+    monkeypatch.setattr(wos_parsepool, "ParsePool", unavailable)
+    monkeypatch.setenv("PARSE_WORKERS", "2")
+    metrics = reset_metrics()
+    assert get_parse_pool() is None
+    assert get_parse_pool() is None
+    assert metrics.report()["warnings"] == [
+        "parse pool unavailable, parsing in threads: no /dev/shm"
+    ]
+
+
+def test_broken_pool_is_not_restarted(monkeypatch):
+    monkeypatch.setenv("PARSE_WORKERS", "1")
+    metrics = reset_metrics()
+    pool = get_parse_pool()
+
+    def broken(*args):
+        raise BrokenProcessPool("worker died")
+
+    monkeypatch.setattr(pool, "run", broken)
+    fields, _ = wos_sondheim_alert._parse(
+        parse_info_page, INFO_PAGE, config=Config().load()
+    )
+    assert fields["venue_name"] == "Frogs Theatre"
+    assert get_parse_pool() is None
+    assert metrics.report()["warnings"] == [
+        "parse pool broken, parsing in threads: worker died",
+        "parse pool unavailable, parsing in threads: worker died",
+    ]
+
+
+SEARCH_PAGE = """
+<div id="search-results-container">
+  <article class="col-12">
+    <a class="text-body-tertiary">SHOW</a>
+    <h3 class="fw-bold"><a>The Frogs (2025)</a></h3>
+    <a class="buy-tickets-link" href="/show/the-frogs"><span>More Info</span></a>
+  </article>
+</div>
+"""
+INFO_PAGE = """
+<html><head><link rel="canonical" href="https://example.com/show/the-frogs" /></head>
+<body><div class="location-section"><div class="block-detail">
+<a href="https://venue.example.com">Frogs Theatre</a>
+</div></div></body></html>
+"""
+
+
+def test_collect_show_details_parses_in_workers(monkeypatch, tmp_path):
+    monkeypatch.setenv("PARSE_WORKERS", "2")
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_show_page", lambda name, config: SEARCH_PAGE
+    )
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (INFO_PAGE, "")
+    )
+    run = wos_sondheim_alert.collect_show_details(["The Frogs"], concurrency=2)
+    assert get_parse_pool() is not None
+    assert [(record.show_name, record.venue_name) for record in run.details] == [
+        ("The Frogs", "Frogs Theatre")
+    ]
@@ -0,0 +1,62 @@
+"""
+pytest -v tests/unittests/test_unit_wos_parsers.py
+"""
+
+import pytest
+from netlify.functions import wos_sondheim_alert
+from netlify.functions.wos_parsers import InfoPageScanner
+
+
+@pytest.fixture
+def fixture_info_page():
+    with open("tests/inttests/wos_info.html", "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def scan(page, chunk_size):
+    scanner = InfoPageScanner()
+    position = 0
+    while position < len(page) and not scanner.done:
+        scanner.feed(page[position : position + chunk_size])
+        position += chunk_size
+    return scanner, position
+
+
+@pytest.mark.parametrize("chunk_size", [1, 333, 16 * 1024])
+def test_scanner_document_extracts_like_full_page(fixture_info_page, chunk_size):
+    scanner, position = scan(fixture_info_page, chunk_size)
+    assert scanner.done
+    assert position < len(fixture_info_page)
+    assert len(scanner.document()) < len(fixture_info_page) // 10
+    assert wos_sondheim_alert.extract_details_from_info_page(
+        "The Frogs", scanner.document()
+    ) == wos_sondheim_alert.extract_details_from_info_page(
+        "The Frogs", fixture_info_page
+    )
+
+
+def test_scanner_falls_back_to_og_url():
+    page = """
+    <html><head><meta property="og:url" content="https://example.com/og" /></head>
+    <body>
+      <div class="dates-section"><p>Opening Night: 1 May 2025</p><br></div>
+      <div class="location-section"><div class="block-detail">
+        <a href="https://example.com/venue">Venue &amp; Bar</a></div></div>
+      <p>footer</p>
+    </body></html>
+    """
+    scanner, position = scan(page, 10)
+    assert scanner.done
+    assert position < len(page)
+    details = wos_sondheim_alert.extract_details_from_info_page("X", scanner.document())
+    assert details.info_url == "https://example.com/og"
+    assert details.venue_name == "Venue & Bar"
+    assert details.opening_night == ": 1 May 2025"
+    assert details == wos_sondheim_alert.extract_details_from_info_page("X", page)
+
+
+def test_scanner_reads_to_end_without_sections():
+    scanner, _ = scan("<html><head></head><body><p>nothing</p></body></html>", 8)
+    assert not scanner.done
+    details = wos_sondheim_alert.extract_details_from_info_page("X", scanner.document())
+    assert details.venue_name == "N/A"
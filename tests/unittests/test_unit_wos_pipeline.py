@@ -0,0 +1,59 @@
+"""
+pytest -v tests/unittests/test_unit_wos_pipeline.py
+"""
+
+import threading
+
+from netlify.functions.wos_pipeline import InfoPageResult, Pipeline, RunState
+
+SHOWS = ["Company", "Follies", "Passion"]
+
+
+def test_queries_fall_back_to_searches_by_name():
+    state = RunState(SHOWS, priority=["Passion", "Company"], search_queries=["q"])
+    assert state.search_order == ["Passion", "Company"]
+    assert list(state.search_jobs) == [("q", [2, 0], False)]
+    job = state.search_jobs.popleft()
+    state.search_done(job, ("progress", {"Company": ["/c", "/c/"]}, "log", ""))
+    # Passion was not found by the query; Company's URLs are coalesced
+    assert list(state.search_jobs) == [("Passion", [2], True)]
+    assert list(state.info_jobs) == [(0, 0, "/c")]
+    assert state.query_logs[:2] == ["progress", "log"]
+    assert state.complete() == [False, False, False]
+
+    state.fill(0, 0, InfoPageResult({"venue_name": "Gielgud"}))
+    state.search_done(state.search_jobs.popleft(), ("", {}, "", "fetch failed"))
+    complete = state.complete()
+    # Follies was never scheduled
+    assert complete == [True, False, True]
+    assert state.pending(complete) == []
+    assert [record.venue_name for record in state.records(complete)] == ["Gielgud"]
+    assert state.errors(complete) == ["Passion: fetch failed"]
+
+
+def test_pipeline_fetches_shared_info_pages_once():
+    fetched = []
+    lock = threading.Lock()
+
+    def search_task(query):
+        return "", {show: ["https://example.com/shared"] for show in SHOWS}, "", ""
+
+    def info_task(show_name, info_url):
+        with lock:
+            fetched.append(info_url)
+        return InfoPageResult({"venue_name": "Gielgud"})
+
+    state = RunState(SHOWS, search_queries=["Sondheim"])
+    pipeline = Pipeline(state, search_task, info_task, concurrency=4)
+    assert pipeline.run() is False
+    assert fetched == ["https://example.com/shared"]
+    assert pipeline.coalesced == 2
+    complete = state.complete()
+    assert [record.show_name for record in state.records(complete)] == SHOWS
+
+
+def test_pipeline_stops_at_deadline():
+    state = RunState(SHOWS)
+    pipeline = Pipeline(state, lambda query: None, lambda *args: None, 2)
+    assert pipeline.run(deadline=0) is True
+    assert state.pending(state.complete()) == SHOWS
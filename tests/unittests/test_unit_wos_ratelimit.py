@@ -0,0 +1,60 @@
+"""
+pytest -v tests/unittests/test_unit_wos_ratelimit.py
+"""
+
+import threading
+import time
+
+from netlify.functions.wos_ratelimit import HostLimiter, retry_after_seconds
+
+
+def test_window_halves_on_throttling_and_ramps_up_on_success():
+    limiter = HostLimiter(max_rate=0, max_concurrency=8, max_wait=60)
+    limiter.acquire()
+    limiter.release(429)
+    limiter.acquire()
+    limiter.release(503)
+    assert limiter.stats()["concurrency_limit"] == 2
+    for _ in range(2 + 3):
+        limiter.acquire()
+        limiter.release(200)
+    assert limiter.stats()["concurrency_limit"] == 4
+    assert limiter.stats()["throttled"] == 2
+
+
+def test_window_caps_requests_in_flight():
+    limiter = HostLimiter(max_rate=0, max_concurrency=2, max_wait=60)
+    limiter.acquire()
+    limiter.acquire()
+    admitted = threading.Event()
+
+    def third():
+        limiter.acquire()
+        admitted.set()
+
+    threading.Thread(target=third, daemon=True).start()
+    assert not admitted.wait(0.1)
+    limiter.release(200)
+    assert admitted.wait(1)
+
+
+def test_token_bucket_caps_rate_and_cooldown_blocks():
+    limiter = HostLimiter(max_rate=20, max_concurrency=100, max_wait=0.2)
+    start = time.monotonic()
+    for _ in range(20 + 10):  # a one-second burst, then 20 per second
+        limiter.acquire()
+        limiter.release(200)
+    assert 0.4 <= time.monotonic() - start < 1
+    limiter.acquire()
+    limiter.release(429, cooldown=3600)  # capped at max_wait
+    assert limiter.stats()["rate"] == 10
+    start = time.monotonic()
+    limiter.acquire()
+    assert 0.15 <= time.monotonic() - start < 1
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds("120") == 120
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0
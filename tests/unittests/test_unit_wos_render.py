@@ -0,0 +1,59 @@
+"""
+pytest -v tests/unittests/test_unit_wos_render.py
+"""
+
+import json
+
+import pytest
+
+from netlify.functions import wos_render
+from netlify.functions.wos_constants import HTML_SHOW_TEMPLATE
+from netlify.functions.wos_models import STATUS_ERROR, ShowDetails
+from netlify.functions.wos_render import RenderCache, record_key
+
+COMPANY = ShowDetails(
+    "Company",
+    info_url="https://example.com/company",
+    opening_night="5 July 2025",
+    venue_name="Gielgud",
+)
+
+
+def test_formats_render_the_same_record():
+    cache = RenderCache(16)
+    assert cache.fragment(COMPANY, "html") == HTML_SHOW_TEMPLATE.format(
+        show_name="Company", **COMPANY.fields()
+    )
+    assert "show: Company" in cache.fragment(COMPANY, "text")
+    assert json.loads(cache.fragment(COMPANY, "json")) == COMPANY.to_dict()
+    failed = ShowDetails("Passion", status=STATUS_ERROR, errors="timeout")
+    assert cache.fragment(failed, "html") == (
+        "<p>Error fetching info page for Passion: timeout</p>"
+    )
+    with pytest.raises(ValueError):
+        cache.fragment(COMPANY, "pdf")
+
+
+def test_render_cache_only_renders_changed_records(monkeypatch):
+    rendered = []
+    renderers = dict(wos_render.RENDERERS)
+    monkeypatch.setitem(
+        wos_render.RENDERERS,
+        "html",
+        lambda record: rendered.append(record.show_name) or renderers["html"](record),
+    )
+    cache = RenderCache(2)
+    changed = ShowDetails.from_fields(
+        "Company", {**COMPANY.fields(), "opening_night": "6 July 2025"}
+    )
+    assert record_key(changed) != record_key(COMPANY)
+    assert record_key(ShowDetails.from_dict(COMPANY.to_dict())) == record_key(COMPANY)
+    for record in (COMPANY, COMPANY, changed, COMPANY):
+        cache.fragment(record, "html")
+    assert rendered == ["Company", "Company"]
+    assert (cache.hits, cache.misses) == (2, 2)
+    # least recently used fragments are evicted
+    cache.fragment(ShowDetails("Follies"), "html")
+    cache.fragment(changed, "html")
+    assert len(rendered) == 4
+    assert RenderCache(0).fragment(COMPANY, "html") == cache.fragment(COMPANY, "html")
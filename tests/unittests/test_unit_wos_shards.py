@@ -0,0 +1,64 @@
+"""
+pytest -v tests/unittests/test_unit_wos_shards.py
+"""
+
+from netlify.functions.wos_models import ShowDetails
+from netlify.functions.wos_shards import ShardResult, ShardSpec, ShardStore
+from netlify.functions.wos_snapshots import ProductionChange
+
+SHOWS = ["Company", "Follies", "Passion", "Assassins", "Sweeney Todd"]
+
+
+def test_shards_partition_the_show_list():
+    selected = [ShardSpec("run", index, 2).select(SHOWS) for index in range(2)]
+    assert selected == [
+        ["Company", "Passion", "Sweeney Todd"],
+        ["Follies", "Assassins"],
+    ]
+    assert ShardSpec("run", shows=["Passion", "Passion"]).select(SHOWS) == ["Passion"]
+    assert ShardSpec("run", 1, 2).key == "1"
+    subset = ShardSpec("run", shows=["Passion", "Company"])
+    assert subset.key == ShardSpec("run", shows=["Company", "Passion"]).key
+    assert subset.key != ShardSpec("run", shows=["Company"]).key
+
+
+def test_store_round_trips_results(tmp_path):
+    store = ShardStore(str(tmp_path))
+    details = [ShowDetails("Follies", venue_name="Gielgud", errors="no dates")]
+    change = ProductionChange("new", "Follies", {"venue_name": "Gielgud"})
+    for completed_at in (1.0, 2.0):  # a re-run shard replaces its result
+        store.put(
+            ShardResult(
+                "run",
+                1,
+                2,
+                ["Follies"],
+                details,
+                ["log"],
+                [change],
+                True,
+                ["Assassins"],
+                ["Passion: search page fetch failed"],
+                completed_at,
+            )
+        )
+    store.put(ShardResult("other", 0, 1, [], [], [], [], False, [], [], 1.0))
+    (result,) = store.results("run")
+    assert result == ShardResult(
+        "run",
+        1,
+        2,
+        ["Follies"],
+        details,
+        ["log"],
+        [change],
+        True,
+        ["Assassins"],
+        ["Passion: search page fetch failed"],
+        2.0,
+        "1",
+    )
+    store.delete("run")
+    assert store.results("run") == []
+    assert len(store.results("other")) == 1
+    store.close()
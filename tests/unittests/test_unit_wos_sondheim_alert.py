@@ -2,8 +2,40 @@
 pytest -v tests/unittests/test_unit_wos_sondheim_alert.py
 """
 
+import json
+from datetime import date, datetime
+
 import pytest
+import requests
+from config import Config
+from netlify.functions import wos_history_query, wos_mailer, wos_render
 from netlify.functions import wos_sondheim_alert
+from netlify.functions.wos_history import HistoryStore
+
+
+def search_page_for(*names, links=None):
+    """A search results page listing `names`, linked to `links[name]` if given."""
+    links = links or {}
+    articles = "".join(f"""
+      <article class="col-12">
+        <a class="text-body-tertiary">SHOW</a>
+        <h3 class="fw-bold"><a>{name}</a></h3>
+        <a class="buy-tickets-link" href="{links.get(name, f'/show/{name}')}"><span>More Info</span></a>
+      </article>""" for name in names)
+    return f"""
+    <div id="search-results-container">{articles}
+    </div>
+    """
+
+
+def search_page_stub(query, config):
+    """A get_show_page stub: the search page lists `query` itself."""
+    return search_page_for(query)
+
+
+def mailjet_accepts(messages):
+    """The send_messages outcome of a batch Mailjet accepted in full."""
+    return [(200, {"Messages": [{"Status": "success"}] * len(messages)})]
 
 
 @pytest.fixture
@@ -13,15 +45,20 @@ def show_name():
 
 @pytest.fixture
 def html_with_link():
-    return """
-    <div id="search-results-container">
-      <article class="col-12">
-        <a class="text-body-tertiary">SHOW</a>
-        <h3 class="fw-bold"><a>The Frogs</a></h3>
-        <a class="buy-tickets-link" href="/show/the-frogs-info"><span>More Info</span></a>
-      </article>
-    </div>
-    """
+    return search_page_for("The Frogs", links={"The Frogs": "/show/the-frogs-info"})
+
+
+@pytest.fixture
+def sent_messages(monkeypatch):
+    """The messages handed to Mailjet, which accepts them all."""
+    sent = []
+
+    def send_messages(messages):
+        sent.extend(messages)
+        return mailjet_accepts(messages)
+
+    monkeypatch.setattr(wos_mailer, "send_messages", send_messages)
+    return sent
 
 
 @pytest.fixture
@@ -54,10 +91,28 @@ def test_extract_info_links(html_with_link, show_name):
     assert "found" in log or "no show info links" in log
 
 
+def test_extract_info_links_matches_title_variants(html_with_link):
+    page = html_with_link.replace("The Frogs", "The Frogs (2025)")
+    assert wos_sondheim_alert.extract_info_links(page, "The Frogs")[0] == [
+        "/show/the-frogs-info"
+    ]
+    page = html_with_link.replace("The Frogs", "The Frogs: A Comedy")
+    assert wos_sondheim_alert.extract_info_links(page, "The Frogs")[0] == [
+        "/show/the-frogs-info"
+    ]
+    page = html_with_link.replace("The Frogs", "The Frogs In Concert")
+    assert wos_sondheim_alert.extract_info_links(page, "The Frogs")[0] == []
+
+
 def test_extract_details_from_info_page(html_info_page, show_name):
-    text_result, html_result = wos_sondheim_alert.extract_details_from_info_page(
+    details = wos_sondheim_alert.extract_details_from_info_page(
         show_name, html_info_page
     )
+    assert details.venue_name == "Frogs Theatre"
+    assert details.norm_first_preview == "2025-07-01"
+    assert details.info_url == "https://www.whatsonstage.com/show/the-frogs-info"
+    text_result = wos_render.render_fragment(details, "text")
+    html_result = wos_render.render_fragment(details, "html")
     assert isinstance(text_result, str)
     assert "The Frogs" in text_result
     assert "First Preview" in html_result
@@ -66,10 +121,10 @@ def test_extract_details_from_info_page(html_info_page, show_name):
 
 def test_search_shows(monkeypatch, show_name, html_with_link, html_info_page):
     # Patch network calls to use our HTML fixtures
-    def fake_get_show_page(name):
+    def fake_get_show_page(name, config):
         return html_with_link
 
-    def fake_get_info_page(url):
+    def fake_get_info_page(url, config):
         return html_info_page, ""
 
     monkeypatch.setattr(wos_sondheim_alert, "get_show_page", fake_get_show_page)
@@ -79,3 +134,638 @@ def test_search_shows(monkeypatch, show_name, html_with_link, html_info_page):
     assert isinstance(html_report, str)
     assert "The Frogs" in result
     assert "The Frogs" in html_report
+
+
+def test_search_shows_concurrent_keeps_show_order(monkeypatch, html_info_page):
+    import time
+
+    shows = ["Company", "Follies", "Passion"]
+
+    def fake_get_show_page(name, config):
+        # the first show finishes last
+        time.sleep(0.05 if name == "Company" else 0)
+        return search_page_for(name)
+
+    def fake_get_info_page(url, config):
+        return html_info_page, ""
+
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", fake_get_show_page)
+    monkeypatch.setattr(wos_sondheim_alert, "get_info_page", fake_get_info_page)
+    result, html_report = wos_sondheim_alert.search_shows(shows, concurrency=3)
+    sequential, _ = wos_sondheim_alert.search_shows(shows, concurrency=1)
+    positions = [html_report.index(f"🎭 {name} 🎶") for name in shows]
+    assert positions == sorted(positions)
+    positions = [result.index(f"show: {name}") for name in shows]
+    assert positions == sorted(positions)
+    assert result.count("show: ") == sequential.count("show: ") == 3
+
+
+@pytest.mark.parametrize("engine", ["lxml", "lxml-targeted"])
+def test_parser_engines_match_html_parser(engine, html_with_link, html_info_page):
+    with open("tests/inttests/wos_info.html", "r", encoding="utf-8") as f:
+        fixture_info_page = f.read()
+    for page in (html_info_page, fixture_info_page):
+        assert wos_sondheim_alert.extract_details_from_info_page(
+            "The Frogs", page, engine
+        ) == wos_sondheim_alert.extract_details_from_info_page(
+            "The Frogs", page, "html.parser"
+        )
+    assert wos_sondheim_alert.extract_info_links(
+        html_with_link, "The Frogs", engine
+    ) == wos_sondheim_alert.extract_info_links(
+        html_with_link, "The Frogs", "html.parser"
+    )
+
+
+def test_unknown_parser_engine(html_info_page):
+    with pytest.raises(ValueError):
+        wos_sondheim_alert.extract_details_from_info_page("X", html_info_page, "regex")
+
+
+def test_search_shows_incremental(
+    monkeypatch, tmp_path, show_name, html_with_link, html_info_page
+):
+    pages = {"search": html_with_link, "info": html_info_page}
+    calls = {"fetch": 0, "parse": 0}
+
+    def fake_get_info_page(url, config):
+        calls["fetch"] += 1
+        return pages["info"], ""
+
+    parse_info_page = wos_sondheim_alert.parse_info_page
+
+    def counting_parse_info_page(html, parser=None):
+        calls["parse"] += 1
+        return parse_info_page(html, parser)
+
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_show_page", lambda name, config: pages["search"]
+    )
+    monkeypatch.setattr(wos_sondheim_alert, "get_info_page", fake_get_info_page)
+    monkeypatch.setattr(wos_sondheim_alert, "parse_info_page", counting_parse_info_page)
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    monkeypatch.setenv("SNAPSHOT_TTL_SECONDS", "0")
+    monkeypatch.setenv("LIFECYCLE_REFRESH", "0")
+    monkeypatch.setenv("REPORT_MODE", "delta")
+
+    def run():
+        return wos_sondheim_alert.search_shows([show_name], incremental=True)
+
+    result, html_report = run()
+    assert "new: show: The Frogs (new)" in result
+    assert "New Productions" in html_report
+
+    result, html_report = run()
+    assert calls == {"fetch": 2, "parse": 1}
+    assert "No changes since the last run" in html_report
+
+    pages["info"] = html_info_page.replace("2025-08-01", "2025-09-01")
+    result, html_report = run()
+    assert "Changed Dates" in html_report
+    assert "closing night:  2025-08-01" in result
+
+    monkeypatch.setenv("SNAPSHOT_TTL_SECONDS", "3600")
+    run()
+    assert calls["fetch"] == 3
+
+    pages["search"] = '<div id="search-results-container"></div>'
+    result, html_report = run()
+    assert "Closed Runs" in html_report
+    assert "The Frogs (closed)" in html_report
+
+
+def test_incremental_runs_refresh_by_lifecycle(monkeypatch, tmp_path, html_info_page):
+    import sqlite3
+    from datetime import date, timedelta
+
+    today = date.today()
+    dates = {
+        "Company": (today - timedelta(days=90), today - timedelta(days=1)),
+        "Follies": (today - timedelta(days=10), today + timedelta(days=60)),
+        "Passion": (today + timedelta(days=90), today + timedelta(days=150)),
+    }
+    fetched = []
+
+    def fake_get_info_page(url, config):
+        name = url.rsplit("/", 1)[-1]
+        fetched.append(name)
+        first, last = dates[name]
+        return (
+            html_info_page.replace("2025-07-01", first.isoformat())
+            .replace("2025-07-05", first.isoformat())
+            .replace("2025-08-01", last.strftime("%d %B %Y")),
+            "",
+        )
+
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", search_page_stub)
+    monkeypatch.setattr(wos_sondheim_alert, "get_info_page", fake_get_info_page)
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    monkeypatch.setenv("SNAPSHOT_TTL_SECONDS", "0")
+
+    def run():
+        fetched.clear()
+        wos_sondheim_alert.collect_show_details(list(dates), incremental=True)
+        return sorted(fetched)
+
+    assert run() == ["Company", "Follies", "Passion"]
+    assert run() == []
+
+    def age_snapshots(days):
+        with sqlite3.connect(tmp_path / "snapshots.sqlite3") as conn:
+            conn.execute(
+                "UPDATE snapshots SET fetched_at = fetched_at - ?", (days * 86400,)
+            )
+
+    # a day later only the running production is due, a week later also
+    # the one opening in three months; the closed one never is
+    age_snapshots(1)
+    assert run() == ["Follies"]
+    age_snapshots(7)
+    assert run() == ["Follies", "Passion"]
+
+
+def test_normalize_info_url():
+    assert (
+        wos_sondheim_alert.normalize_info_url("/shows/marry-me-a-little/#cast")
+        == wos_sondheim_alert.normalize_info_url(
+            "HTTPS://www.WhatsOnStage.com/shows/marry-me-a-little"
+        )
+        == "https://www.whatsonstage.com/shows/marry-me-a-little"
+    )
+
+
+def test_search_shows_coalesces_shared_info_pages(monkeypatch, html_info_page):
+    shows = ["Marry Me a Little", "Side by Side by Sondheim"]
+    links = {
+        shows[0]: "/shows/sondheim-double-bill/",
+        shows[1]: "https://www.whatsonstage.com/shows/sondheim-double-bill",
+    }
+    fetched = []
+
+    def fake_get_show_page(name, config):
+        return search_page_for(name, links=links)
+
+    def fake_get_info_page(url, config):
+        fetched.append(url)
+        return html_info_page, ""
+
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", fake_get_show_page)
+    monkeypatch.setattr(wos_sondheim_alert, "get_info_page", fake_get_info_page)
+    result, html_report = wos_sondheim_alert.search_shows(shows, concurrency=4)
+    assert len(fetched) == 1
+    assert "1 fetched, 1 duplicate requests coalesced" in result
+    for name in shows:
+        assert f"show: {name}" in result
+        assert f"🎭 {name} 🎶" in html_report
+
+
+def test_collect_show_details_keeps_every_log_and_renders_json(
+    monkeypatch, html_info_page
+):
+    shows = ["The Frogs", "Passion"]
+
+    def fake_get_show_page(name, config):
+        if name == "Passion":
+            return ""
+        return search_page_for(name)
+
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", fake_get_show_page)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    run = wos_sondheim_alert.collect_show_details(shows, concurrency=2)
+    result, _ = wos_sondheim_alert.render_report(run)
+    assert "found 1 show info links" in result
+    assert "search results container not found" in result
+    report = json.loads(wos_sondheim_alert.render_json(run))
+    assert wos_sondheim_alert.render_json(run) == json.dumps(report, ensure_ascii=False)
+    assert [p["show_name"] for p in report["productions"]] == ["The Frogs"]
+    assert report["productions"][0]["venue_name"] == "Frogs Theatre"
+    assert report["productions"][0]["status"] == "fetched"
+
+
+def test_search_queries_replace_per_show_searches(monkeypatch, html_info_page):
+    searched = []
+
+    def fake_get_show_page(query, config):
+        searched.append(query)
+        if query == "Sondheim":
+            return search_page_for(
+                "Sweeney Todd: The Demon Barber", "Company", "Hamilton"
+            )
+        return search_page_for(query)
+
+    monkeypatch.setenv("SEARCH_QUERIES", "Sondheim")
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", fake_get_show_page)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    run = wos_sondheim_alert.collect_show_details(
+        ["Company", "Follies", "Sweeney Todd"], concurrency=2
+    )
+    # Follies was not among the query results, so it is searched by name
+    assert searched == ["Sondheim", "Follies"]
+    assert [(record.show_name, record.status) for record in run.details] == [
+        ("Company", "fetched"),
+        ("Follies", "fetched"),
+        ("Sweeney Todd", "fetched"),
+    ]
+    assert "skipping: Hamilton" in "".join(run.log)
+    assert not run.pending and not run.errors
+
+
+def test_collect_show_details_loads_the_config_once(
+    monkeypatch, tmp_path, html_info_page
+):
+    loads = []
+    load = Config.load
+
+    def counting_load(self):
+        loads.append(self)
+        return load(self)
+
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    monkeypatch.setenv("INCREMENTAL_RUNS", "1")
+    monkeypatch.setattr(Config, "load", counting_load)
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", search_page_stub)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    shows = ["Company", "Follies", "Sweeney Todd"]
+    wos_sondheim_alert.collect_show_details(shows, concurrency=2)
+    run = wos_sondheim_alert.collect_show_details(shows, concurrency=2)
+    assert [record.status for record in run.details] == ["snapshot"] * 3
+    assert len(loads) == 2
+
+
+def test_collect_show_details_stops_at_deadline(monkeypatch, html_info_page):
+    import time
+
+    def fake_get_show_page(name, config):
+        if name == "Follies":
+            time.sleep(1)
+        return search_page_for(name)
+
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", fake_get_show_page)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    started = time.monotonic()
+    run = wos_sondheim_alert.collect_show_details(
+        ["Company", "Follies", "Passion"],
+        concurrency=1,
+        deadline=started + 0.3,
+        priority=["Passion", "Follies", "Company"],
+    )
+    assert time.monotonic() - started < 0.9
+    assert [record.show_name for record in run.details] == ["Passion"]
+    assert run.pending == ["Follies", "Company"]
+    result, html_report = wos_sondheim_alert.render_report(run)
+    assert "Partial report" in html_report
+    assert "partial report, not processed: ['Follies', 'Company']" in result
+
+
+def test_handler_checkpoints_and_resumes(
+    monkeypatch, tmp_path, html_info_page, sent_messages
+):
+    class Context:
+        remaining_ms = 100
+
+        def get_remaining_time_in_millis(self):
+            return self.remaining_ms
+
+    searched = []
+
+    def fake_get_show_page(name, config):
+        searched.append(name)
+        return search_page_for(name)
+
+    monkeypatch.setattr(wos_sondheim_alert, "SHOWS", ["Company", "Follies"])
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", fake_get_show_page)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    monkeypatch.setenv("EMAIL_RECIPIENT", "fan@example.com")
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    monkeypatch.setenv("RUN_DEADLINE_MARGIN_SECONDS", "1")
+
+    # no time left: nothing is fetched, everything is checkpointed
+    context = Context()
+    wos_sondheim_alert.handler({}, context)
+    assert sent_messages[-1]["Subject"].endswith("(partial)")
+    assert searched == []
+
+    context.remaining_ms = 60000
+    response = wos_sondheim_alert.handler({"format": "json"}, context)
+    assert not sent_messages[-1]["Subject"].endswith("(partial)")
+    assert searched == ["Company", "Follies"]
+    assert len(json.loads(response["report"])["productions"]) == 2
+
+
+def test_handler_runs_shards_and_aggregates(
+    monkeypatch, tmp_path, html_info_page, sent_messages
+):
+    searched = []
+
+    def fake_get_show_page(name, config):
+        searched.append(name)
+        return search_page_for(name)
+
+    monkeypatch.setattr(wos_sondheim_alert, "SHOWS", ["Company", "Follies", "Passion"])
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", fake_get_show_page)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    monkeypatch.setenv("EMAIL_RECIPIENT", "fan@example.com")
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+
+    shard = {"run_id": "r1", "shard_count": 2}
+    wos_sondheim_alert.handler({**shard, "shard_index": 1}, None)
+    assert searched == ["Follies"]
+    # shard 0 has not reported yet: its shows are pending
+    response = wos_sondheim_alert.handler(
+        {"run_id": "r1", "aggregate": True, "format": "json"}, None
+    )
+    assert sent_messages[-1]["Subject"].endswith("(partial)")
+    assert "Company, Passion" in sent_messages[-1]["HTMLPart"]
+    report = json.loads(response["report"])
+    assert [p["show_name"] for p in report["productions"]] == ["Follies"]
+
+    wos_sondheim_alert.handler({**shard, "shard_index": 1}, None)
+    wos_sondheim_alert.handler(
+        {"queryStringParameters": {**shard, "shard_index": "0"}}, None
+    )
+    assert sorted(searched) == ["Company", "Follies", "Follies", "Passion"]
+    assert len(sent_messages) == 1
+    response = wos_sondheim_alert.handler(
+        {"run_id": "r1", "aggregate": True, "format": "json"}, None
+    )
+    assert len(sent_messages) == 2 and not sent_messages[-1]["Subject"].endswith(
+        "(partial)"
+    )
+    report = json.loads(response["report"])
+    assert [p["show_name"] for p in report["productions"]] == [
+        "Company",
+        "Follies",
+        "Passion",
+    ]
+    # aggregated runs are removed from the store
+    response = wos_sondheim_alert.handler({"run_id": "r1", "aggregate": True}, None)
+    assert response["statusCode"] == 404
+    response = wos_sondheim_alert.handler({**shard, "shard_index": 2}, None)
+    assert response["statusCode"] == 400
+    # shards and the aggregating invocation only meet through an explicit run_id
+    for event in ({"shard_index": 0, "shard_count": 2}, {"aggregate": True}):
+        response = wos_sondheim_alert.handler(event, None)
+        assert response["statusCode"] == 400 and "run_id" in response["body"]
+
+
+def test_handler_fails_without_recipients(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_RECIPIENT", "")
+    monkeypatch.delenv("SUBSCRIBERS_FILE", raising=False)
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", None)
+    response = wos_sondheim_alert.handler({}, None)
+    assert response["statusCode"] == 500
+    assert "EMAIL_RECIPIENT" in response["body"]
+
+
+def test_handler_aggregates_explicit_subset_shards(
+    monkeypatch, tmp_path, html_info_page, sent_messages
+):
+    monkeypatch.setattr(wos_sondheim_alert, "SHOWS", ["Company", "Follies"])
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", search_page_stub)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    monkeypatch.setenv("EMAIL_RECIPIENT", "fan@example.com")
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+
+    wos_sondheim_alert.handler({"run_id": "r", "shows": "Company"}, None)
+    wos_sondheim_alert.handler({"run_id": "r", "shows": "Follies"}, None)
+    response = wos_sondheim_alert.handler(
+        {"run_id": "r", "aggregate": True, "format": "json"}, None
+    )
+    report = json.loads(response["report"])
+    assert [p["show_name"] for p in report["productions"]] == ["Company", "Follies"]
+    assert not sent_messages[-1]["Subject"].endswith("(partial)")
+
+
+def test_handler_records_history_and_answers_queries(
+    monkeypatch, tmp_path, html_info_page, sent_messages
+):
+    monkeypatch.setattr(wos_sondheim_alert, "SHOWS", ["Company", "Follies"])
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", search_page_stub)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    monkeypatch.setenv("EMAIL_RECIPIENT", "fan@example.com")
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    monkeypatch.setenv("DUPLICATE_SEND_WINDOW_SECONDS", "0")
+    query = wos_history_query.handler
+
+    assert query({"query": "report"}, None)["statusCode"] == 404
+    wos_sondheim_alert.handler({"run_id": "r1"}, None)
+    report = json.loads(query({"query": "report"}, None)["body"])
+    assert [p["show_name"] for p in report["productions"]] == ["Company", "Follies"]
+    response = query(
+        {"queryStringParameters": {"query": "show", "show": "Follies"}}, None
+    )
+    assert response["statusCode"] == 200
+    # the fixture production closed on 1 August 2025
+    assert json.loads(response["body"]) == []
+    response = query({"query": "show", "show": "Follies", "since": "2025-01-01"}, None)
+    assert len(json.loads(response["body"])) == 1
+    assert json.loads(query({"query": "venues"}, None)["body"]) == [
+        {"venue_name": "Frogs Theatre", "productions": 1}
+    ]
+    assert json.loads(query({"query": "openings"}, None)["body"]) == []
+    assert query({"query": "show"}, None)["statusCode"] == 400
+    assert (
+        query({"query": "show", "show": "x", "since": "x"}, None)["statusCode"] == 400
+    )
+    assert query({"query": "everything"}, None)["statusCode"] == 400
+
+    # a run without a run_id is recorded under its start time
+    wos_sondheim_alert.handler({}, None)
+    history = HistoryStore(str(tmp_path))
+    latest = history.latest_run()
+    history.close()
+    assert datetime.fromisoformat(latest.run_id).date() == date.today()
+    assert latest.run_date == date.today().isoformat()
+
+    # a report re-sent from the history does not scrape
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", None)
+    response = wos_sondheim_alert.handler({"source": "history"}, None)
+    assert response["statusCode"] == 200
+    assert sent_messages[-1]["HTMLPart"] == sent_messages[0]["HTMLPart"]
+
+
+def test_handler_debug_reports_import_times(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_RECIPIENT", "fan@example.com")
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    event = {"run_id": "none", "aggregate": True}
+    assert "imports" not in wos_sondheim_alert.handler(event, None)
+    response = wos_sondheim_alert.handler({**event, "debug": True}, None)
+    assert response["statusCode"] == 404
+    # the module was imported without IMPORT_PROFILE
+    assert response["imports"]["enabled"] is False
+    # an unknown RUN_PROFILE mode is reported, not fatal
+    monkeypatch.setenv("RUN_PROFILE", "cprofil")
+    response = wos_sondheim_alert.handler(event, None)
+    assert response["statusCode"] == 404
+    assert "'cprofil'" in response["metrics"]["warnings"][0]
+
+
+def test_handler_parses_query_string_options(monkeypatch, tmp_path):
+    monkeypatch.setenv("EMAIL_RECIPIENT", "fan@example.com")
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    handler = wos_sondheim_alert.handler
+
+    def query(**options):
+        return {"queryStringParameters": {"run_id": "none", **options}}
+
+    response = handler(query(aggregate="yes", debug="false"), None)
+    assert response["statusCode"] == 404 and "imports" not in response
+    assert "imports" in handler(query(aggregate="1", debug="TRUE"), None)
+    for options in ({"aggregate": "maybe"}, {"debug": "2"}, {"shard_count": "two"}):
+        response = handler(query(**options), None)
+        assert response["statusCode"] == 400
+        assert next(iter(options)) in response["body"]
+    # an empty value is an absent option
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", None)
+    response = handler(query(aggregate="1", shard_count=""), None)
+    assert response["statusCode"] == 404
+    response = wos_sondheim_alert.query_handler(
+        {"query": "openings", "days": "x"}, None
+    )
+    assert response["statusCode"] == 400
+
+
+def test_handler_stops_geocoding_at_the_deadline(
+    monkeypatch, tmp_path, html_info_page, sent_messages
+):
+    class Context:
+        def get_remaining_time_in_millis(self):
+            return 0
+
+    venues = tmp_path / "venues.json"
+    venues.write_text(json.dumps({"Frogs Theatre": "53.4808,-2.2426"}))
+    monkeypatch.setattr(wos_sondheim_alert, "SHOWS", ["Company"])
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", search_page_stub)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    monkeypatch.setenv("EMAIL_RECIPIENT", "fan@example.com")
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    monkeypatch.setenv("VENUE_LOCATIONS_FILE", str(venues))
+    monkeypatch.setenv("DUPLICATE_SEND_WINDOW_SECONDS", "0")
+    wos_sondheim_alert.handler({}, None)
+
+    # the venue, 163 miles away, is not located once the deadline has passed
+    monkeypatch.setenv("HOME_LOCATION", "51.5074,-0.1278")
+    response = wos_sondheim_alert.handler({"source": "history"}, Context())
+    assert "🎭 Company 🎶" in sent_messages[-1]["HTMLPart"]
+    assert response["metrics"]["warnings"] == [
+        "deadline reached while geocoding, 1 venues not located"
+        " and not filtered by distance"
+    ]
+    wos_sondheim_alert.handler({"source": "history"}, None)
+    assert "🎭 Company 🎶" not in sent_messages[-1]["HTMLPart"]
+
+
+def test_handler_reports_stage_metrics(
+    monkeypatch, tmp_path, html_info_page, sent_messages
+):
+    monkeypatch.setattr(wos_sondheim_alert, "SHOWS", ["Company", "Follies"])
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", search_page_stub)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    monkeypatch.setenv("EMAIL_RECIPIENT", "fan@example.com")
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    monkeypatch.setenv("RUN_PROFILE", "tracemalloc")
+    response = wos_sondheim_alert.handler({}, None)
+    metrics = json.loads(json.dumps(response["metrics"]))
+    assert {stage: timing["count"] for stage, timing in metrics["stages"].items()} == {
+        "search_fetch": 2,
+        "search_parse": 2,
+        "info_fetch": 2,
+        "info_parse": 2,
+        "history": 1,
+        "render": 1,
+        "email_send": 1,
+    }
+    assert metrics["profile"]["tracemalloc"]["peak_bytes"] > 0
+
+
+def test_failed_searches_are_reported(monkeypatch, html_info_page):
+    def fake_get_show_page(name, config):
+        if name == "Follies":
+            raise requests.HTTPError("429 Client Error: Too Many Requests")
+        return search_page_for(name)
+
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", fake_get_show_page)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    run = wos_sondheim_alert.collect_show_details(["Company", "Follies"])
+    assert [record.show_name for record in run.details] == ["Company"]
+    assert run.errors == [
+        "Follies: search page fetch failed: 429 Client Error: Too Many Requests"
+    ]
+    result, html_report = wos_sondheim_alert.render_report(run)
+    assert "search page could not be fetched for Follies" in html_report
+    assert "search errors:" in result
+
+
+def test_handler_sends_each_subscriber_their_shows(
+    monkeypatch, tmp_path, html_info_page, sent_messages
+):
+    searched = []
+
+    def fake_get_show_page(name, config):
+        searched.append(name)
+        return search_page_for(name)
+
+    subscribers = tmp_path / "subscribers.json"
+    subscribers.write_text(
+        json.dumps(
+            [
+                {"email": "a@example.com", "shows": ["Company", "Follies"]},
+                {"email": "b@example.com", "shows": ["Follies", "Passion"]},
+                {"email": "c@example.com", "shows": ["Follies", "Passion"]},
+                {"email": "d@example.com", "venues": ["Gielgud"]},
+            ]
+        )
+    )
+    monkeypatch.setattr(
+        wos_sondheim_alert, "SHOWS", ["Company", "Follies", "Passion", "Assassins"]
+    )
+    monkeypatch.setattr(wos_sondheim_alert, "get_show_page", fake_get_show_page)
+    monkeypatch.setattr(
+        wos_sondheim_alert, "get_info_page", lambda url, config: (html_info_page, "")
+    )
+    monkeypatch.setenv("SUBSCRIBERS_FILE", str(subscribers))
+    monkeypatch.setenv("WOS_STATE_DIR", str(tmp_path))
+    response = wos_sondheim_alert.handler({}, None)
+    # every show is searched once however many subscribers follow it
+    assert sorted(searched) == ["Assassins", "Company", "Follies", "Passion"]
+    messages = list(sent_messages)
+    assert [message["To"][0]["Email"] for message in messages] == [
+        "a@example.com",
+        "b@example.com",
+        "c@example.com",
+        "d@example.com",
+    ]
+    reports = [message["HTMLPart"] for message in messages]
+    assert "🎭 Company 🎶" in reports[0] and "🎭 Passion 🎶" not in reports[0]
+    assert "🎭 Passion 🎶" in reports[1] and "🎭 Company 🎶" not in reports[1]
+    assert reports[1] == reports[2]
+    # the fixture's venue is Frogs Theatre, not the Gielgud
+    assert "🎭" not in reports[3]
+    assert "reports: 4 rendered, 4 sent" in response["log"]
+    # a retried run sends nothing again
+    response = wos_sondheim_alert.handler({}, None)
+    assert len(sent_messages) == 4
+    assert "0 sent, 0 no-change notices, 4 suppressed" in response["log"]
@@ -0,0 +1,76 @@
+"""
+pytest -v tests/unittests/test_unit_wos_stub_server.py
+"""
+
+import gzip
+import json
+
+import pytest
+from netlify.functions import wos_http, wos_sondheim_alert
+from tests.loadtest.wos_stub_server import (
+    StubSettings,
+    query_url_template,
+    start_server,
+)
+
+
+@pytest.fixture
+def use_server(monkeypatch, tmp_path):
+    servers = []
+
+    def start(settings):
+        server = start_server(settings)
+        servers.append(server)
+        monkeypatch.setenv("WOS_QUERY_URL_TEMPLATE", query_url_template(server))
+        monkeypatch.setenv("HTTP_CACHE_DIR", str(tmp_path))
+        monkeypatch.setenv("HTTP_BACKOFF_FACTOR", "0")
+        wos_http.reset_session()
+        wos_http.reset_cache()
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+    wos_http.reset_session()
+    wos_http.reset_cache()
+
+
+def test_search_shows_against_synthetic_server(use_server):
+    server = use_server(StubSettings(productions=3))
+    result, html_report = wos_sondheim_alert.search_shows(["Company", "Passion"], 4)
+    assert result.count("show: Company") == 3
+    assert result.count("show: Passion") == 3
+    assert "Venue company_2" in html_report
+    assert server.state.counts["requests"] == 8
+
+
+def test_synthetic_server_answers_revalidation(use_server, monkeypatch):
+    server = use_server(StubSettings(productions=1))
+    monkeypatch.setenv("HTTP_CACHE_TTL_SECONDS", "0")
+    wos_http.reset_cache()
+    wos_sondheim_alert.search_shows(["Company"], 1)
+    wos_sondheim_alert.search_shows(["Company"], 1)
+    assert server.state.counts["not_modified"] == 2
+    assert wos_http.cache_stats()["revalidations"] == 2
+
+
+def test_replay_server_serves_archive(use_server, tmp_path):
+    archive = tmp_path / "archive.jsonl.gz"
+    search_page = """<div id="search-results-container"><article class="col-12">
+        <a class="text-body-tertiary">SHOW</a><h3 class="fw-bold"><a>Follies</a></h3>
+        <a class="buy-tickets-link" href="https://www.whatsonstage.com/shows/follies/">
+        <span>More Info</span></a></article></div>"""
+    info_page = """<html><head><link rel="canonical" href="https://www.whatsonstage.com/shows/follies/"></head>
+        <body><div class="location-section"><div class="block-detail">
+        <a href="https://www.whatsonstage.com/venue/nt/">National Theatre</a></div></div></body></html>"""
+    with gzip.open(archive, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"path": "/?s=Follies", "status": 200, "body": search_page}))
+        f.write("\n")
+        f.write(
+            json.dumps({"path": "/shows/follies/", "status": 200, "body": info_page})
+        )
+        f.write("\n")
+    use_server(StubSettings(mode="replay", archive=str(archive)))
+    result, _ = wos_sondheim_alert.search_shows(["Follies"], 2)
+    assert "venue: National Theatre" in result
@@ -0,0 +1,88 @@
+"""
+pytest -v tests/unittests/test_unit_wos_subscribers.py
+"""
+
+import json
+
+import pytest
+
+from netlify.functions.wos_geo import GeocodeCache, Geocoder, VenueDistances
+from netlify.functions.wos_models import ShowDetails
+from netlify.functions.wos_sondheim_alert import ShowSearchRun
+from netlify.functions.wos_subscribers import (
+    Subscriber,
+    load_subscribers,
+    shows_for,
+    subscriber_from_dict,
+)
+
+
+def test_load_subscribers_from_file(tmp_path):
+    path = tmp_path / "subscribers.json"
+    path.write_text(
+        json.dumps(
+            {
+                "subscribers": [
+                    {"email": "a@example.com", "name": "A", "shows": ["Follies"]},
+                    {"email": "b@example.com", "venues": ["Gielgud"]},
+                ]
+            }
+        )
+    )
+    assert load_subscribers(str(path)) == [
+        Subscriber("a@example.com", "A", ["Follies"]),
+        Subscriber("b@example.com", venues=["Gielgud"]),
+    ]
+    path.write_text(json.dumps([{"name": "no email"}]))
+    with pytest.raises(ValueError):
+        load_subscribers(str(path))
+
+
+def test_load_subscribers_defaults_to_recipients(monkeypatch):
+    monkeypatch.delenv("SUBSCRIBERS_FILE", raising=False)
+    monkeypatch.setenv("EMAIL_RECIPIENT", "a@example.com")
+    monkeypatch.setenv("EMAIL_RECIPIENT_2", "")
+    assert load_subscribers() == [Subscriber("a@example.com")]
+
+
+def test_shows_for_is_the_ordered_union():
+    shows = ["Company", "Follies", "Passion"]
+    subscribers = [
+        Subscriber("a@example.com", shows=["Passion", "Saturday Night"]),
+        Subscriber("b@example.com", shows=["Passion", "Company"]),
+    ]
+    assert shows_for(subscribers, shows) == ["Company", "Passion", "Saturday Night"]
+    assert shows_for([*subscribers, Subscriber("c@example.com")], shows) == [
+        "Company",
+        "Follies",
+        "Passion",
+        "Saturday Night",
+    ]
+    assert shows_for([], shows) == shows
+
+
+def test_select_keeps_productions_within_the_radius(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEARCH_RADIUS_MILES", "50")
+    london, manchester = (51.5074, -0.1278), (53.4808, -2.2426)
+    locations = {"Gielgud Theatre": london, "Royal Exchange": manchester}
+    details = [
+        ShowDetails("Company", venue_name=venue)
+        for venue in ("Gielgud Theatre", "Royal Exchange", "Unknown Hall")
+    ]
+    run = ShowSearchRun(details, [], [], False, [], [])
+    geocoder = Geocoder(
+        GeocodeCache(str(tmp_path)), lambda name, url: locations.get(name)
+    )
+    subscriber = subscriber_from_dict(
+        {"email": "a@example.com", "location": "51.5074,-0.1278"}
+    )
+    venues = [(record.venue_name, record.venue_url) for record in details]
+    distances = VenueDistances(venues, [subscriber.location], geocoder)
+    selected = subscriber.select(run, distances)
+    assert [record.venue_name for record in selected.details] == [
+        "Gielgud Theatre",
+        "Unknown Hall",
+    ]
+    subscriber.radius_miles = 200
+    assert len(subscriber.select(run, distances).details) == 3
+    assert Subscriber("b@example.com").select(run, distances) is run